@@ -1,81 +1,221 @@
-from helper.data import atomic_congestion_indexer, cost_sharing_indexer, dictator_indexer, social_context_indexer
-from helper.data import prisonner_dilemma
-from helper.data.non_atomic_indexer import NonAtomicIndexer
-from helper.data.prisonner_dilemma import PrisonersDilemmaIndexer
-from helper.data.social_context_indexer import SocialContextIndexer
+import hashlib
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from helper.data.bootstrap import indexer_ci
+from helper.data.metrics import GAMES, default_source
+from helper.data.partitions import resolve_sources
+from helper.data.timeseries import ROUND_ROWS, combine_timeseries, game_timeseries
 
 import pandas as pd
 
-# Dictionary to collect results across all indexers
-results = {}
+# Restrict the index to these run ids (None = every run that is not archived)
+RUNS = None
 
-# ----------------------------
-# Non-Atomic Congestion Indexer
-# ----------------------------
-print("=== Non-Atomic Congestion Indexer ===")
-non_atomic_indexer = NonAtomicIndexer(csv_file="data/non_atomic_results.csv")
-for llm, value in non_atomic_indexer.altruism.items():
-    results.setdefault(llm, {})["Non-Atomic Congestion"] = value
+# Keep per-file running aggregates under .cache/ and only read newly appended rows.
+# Ignored while BOOTSTRAP_RESAMPLES is set: CIs need every row (see below).
+INCREMENTAL = True
 
-# ----------------------------
-# Social Context Indexer
-# ----------------------------
-print("=== Social Context Indexer ===")
-social_context_indexer = SocialContextIndexer("data/social_context_results.csv")
-for llm, value in social_context_indexer.altruism.items():
-    results.setdefault(llm, {})["Social Context"] = value
+# Indexer outputs are cached here, keyed by the content of their inputs and parameters
+CACHE_DIR = os.path.join(".cache", "derive_index")
 
-# ----------------------------
-# Dictator Game Indexer
-# ----------------------------
-print("=== Dictator Game Indexer ===")
-dictator_indexer_obj = dictator_indexer.DictatorGameIndexer("data/dictator_game_results.csv")
-for llm, value in dictator_indexer_obj.altruism.items():
-    results.setdefault(llm, {})["Dictator Game"] = value
+# Worker processes (None = one per CPU)
+MAX_WORKERS = None
 
-# ----------------------------
-# Atomic Congestion Indexer
-# ----------------------------
-print("=== Atomic Congestion Indexer ===")
-atomic_congestion_indexer_obj = atomic_congestion_indexer.AtomicCongestionIndexer("data/atomic_congestion_all.csv")
-for llm, measures in atomic_congestion_indexer_obj.altruism.items():
-    results.setdefault(llm, {})["Atomic Congestion"] = measures
+# Bootstrap CIs next to every cell (0 = bare means). CIs need the rows, so a
+# non-zero value wins over INCREMENTAL: indexers are then built in full mode.
+BOOTSTRAP_RESAMPLES = 0
+CONFIDENCE = 0.95
+BOOTSTRAP_JOBS = 1  # processes per indexer; indexers already run in parallel
 
-# ----------------------------
-# Cost Sharing Scheduler Indexer
-# ----------------------------
-print("=== Cost Sharing Scheduler Indexer ===")
-cost_sharing_indexer_obj = cost_sharing_indexer.CostSharingSchedulerIndexer("data/cost_sharing_game_results.csv")
-for llm, value in cost_sharing_indexer_obj.altruism.items():
-    results.setdefault(llm, {})["Cost Sharing"] = value
+# Long-format per-round / rolling / EWM series of the multi-round games (None = skip)
+TIMESERIES_FILE = "altruism_timeseries.csv"
+TIMESERIES_WINDOW = 5
+TIMESERIES_SPAN = 5
+
+# (table column, registered game; see helper.data.metrics for indexers and parameters)
+INDEXERS = [
+    ("Non-Atomic Congestion", "non_atomic"),
+    ("Social Context", "social_context"),
+    ("Dictator Game", "dictator_game"),
+    ("Atomic Congestion", "atomic_congestion"),
+    ("Cost Sharing", "cost_sharing_game"),
+    ("Prisoner's Dilemma", "prisoner_dilemma"),
+]
 
-# ----------------------------
-# Prisoner's Dilemma Indexer
-# ----------------------------
-print("=== Prisoner's Dilemma Indexer ===")
-prisonner_dilemma_indexer_obj = PrisonersDilemmaIndexer("data/prisoner_dilemma.csv")
-for llm, measures in prisonner_dilemma_indexer_obj.altruism.items():
-    results.setdefault(llm, {})["Prisoner's Dilemma"] = measures
 
 # ----------------------------
-# Convert Results to Table
-# ----------------------------
-# Build DataFrame (rows = metrics, columns = LLMs)
-df = pd.DataFrame(results).T  # transpose so rows = LLMs
-print("\n=== Aggregated Table ===")
-print(df)
+# Content hashing
+# ----------------------------
+def file_digest(path, memo):
+    """sha256 of a file, re-hashed only when its size or mtime changed since the memo entry."""
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    entry = memo.get(path)
+    if entry is None or entry[0] != key:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        entry = memo[path] = (key, h.hexdigest())
+    return entry[1]
+
+
+def task_key(cls, params, paths, memo, settings):
+    """:param settings: module settings the task's output depends on"""
+    payload = {
+        "indexer": cls.__name__,
+        "params": params,
+        "settings": settings,
+        "inputs": [(p, file_digest(p, memo)) for p in paths],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _load_pickle(path, default):
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return default
+
+
+def _dump_pickle(path, obj):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+
 
 # ----------------------------
-# Export to LaTeX Table
+# Indexer tasks
 # ----------------------------
-latex_table = df.to_latex(
-    index=True,
-    caption="Comparison of altruism-related indexes across LLMs and games.",
-    label="tab:altruism_indexes",
-    float_format="%.3f"
-)
+def run_indexer(cls, source, params):
+    """Worker entry point: returns ({llm: measures}, {llm: {measure: (low, high)}} or None)."""
+    if not BOOTSTRAP_RESAMPLES:
+        return cls(source, incremental=INCREMENTAL, **params).altruism, None
+    indexer = cls(source, **params)
+    cis = indexer_ci(indexer, n_resamples=BOOTSTRAP_RESAMPLES, confidence=CONFIDENCE,
+                     n_jobs=BOOTSTRAP_JOBS)
+    return indexer.altruism, cis
+
+
+def run_timeseries(game, source):
+    """Worker entry point: the long-format time series of one multi-round game."""
+    return game_timeseries(game, source, window=TIMESERIES_WINDOW, span=TIMESERIES_SPAN)
+
+
+def with_ci(measures, cis):
+    """{measure: value} -> {measure: "value [low, high]"} when CIs are available."""
+    if not cis:
+        return measures
+
+    def fmt(x):
+        return "nan" if x is None or pd.isna(x) else f"{x:.3f}"
+
+    return {
+        m: f"{fmt(v)} [{fmt(cis[m][0])}, {fmt(cis[m][1])}]" if m in cis else v
+        for m, v in measures.items()
+    }
+
+
+def cache_path(label):
+    slug = "".join(c if c.isalnum() else "_" for c in label.lower())
+    return os.path.join(CACHE_DIR, slug + ".pkl")
+
+
+def compute_all():
+    """
+    Run the stale indexers (and time series) concurrently; up-to-date ones come from the cache.
+
+    :return: {label: (altruism, cis)}, {label: time series frame} of the multi-round games
+    """
+    memo_path = os.path.join(CACHE_DIR, "file_hashes.pkl")
+    memo = _load_pickle(memo_path, {})
+
+    if INCREMENTAL and BOOTSTRAP_RESAMPLES:
+        print(f"BOOTSTRAP_RESAMPLES={BOOTSTRAP_RESAMPLES}: indexers are built in full mode, INCREMENTAL is ignored")
+
+    # (outputs, label, cache entry, key, worker, args) of every task
+    tasks = []
+    outputs, series = {}, {}
+    for label, game in INDEXERS:
+        cls, params = GAMES[game].indexer, GAMES[game].params
+        source = default_source(game, runs=RUNS)
+        paths = [p for p in resolve_sources(source) if os.path.exists(p)]
+        if not paths:
+            print(f"=== {label}: no results, skipped ===")
+            continue
+        key = task_key(cls, params, paths, memo, {"incremental": INCREMENTAL,
+                                                  "bootstrap": [BOOTSTRAP_RESAMPLES, CONFIDENCE]})
+        tasks.append((outputs, label, label, key, run_indexer, (cls, source, params)))
+        if TIMESERIES_FILE and game in ROUND_ROWS:
+            key = task_key(cls, params, paths, memo, {"timeseries": [TIMESERIES_WINDOW, TIMESERIES_SPAN]})
+            tasks.append((series, label, label + " time series", key, run_timeseries, (game, source)))
+    _dump_pickle(memo_path, memo)
+
+    stale = []
+    for out, label, entry, key, worker, args in tasks:
+        cached = _load_pickle(cache_path(entry), None)
+        if cached is not None and cached[0] == key:
+            print(f"=== {entry}: up to date ===")
+            out[label] = cached[1]
+        else:
+            stale.append((out, label, entry, key, worker, args))
+
+    if stale:
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            futures = [(out, label, entry, key, pool.submit(worker, *args))
+                       for out, label, entry, key, worker, args in stale]
+            for out, label, entry, key, future in futures:
+                print(f"=== {entry} ===")
+                out[label] = future.result()
+                _dump_pickle(cache_path(entry), (key, out[label]))
+    return outputs, series
+
+
+def main():
+    outputs, series = compute_all()
+
+    # Dictionary to collect results across all indexers, in INDEXERS order
+    results = {}
+    for label, *_ in INDEXERS:
+        altruism, cis = outputs.get(label, ({}, None))
+        for llm, value in altruism.items():
+            results.setdefault(llm, {})[label] = with_ci(value, (cis or {}).get(llm))
+
+    # ----------------------------
+    # Convert Results to Table
+    # ----------------------------
+    # Build DataFrame (rows = metrics, columns = LLMs)
+    df = pd.DataFrame(results).T  # transpose so rows = LLMs
+    print("\n=== Aggregated Table ===")
+    print(df)
+
+    # ----------------------------
+    # Export to LaTeX Table
+    # ----------------------------
+    latex_table = df.to_latex(
+        index=True,
+        caption="Comparison of altruism-related indexes across LLMs and games.",
+        label="tab:altruism_indexes",
+        float_format="%.3f"
+    )
+
+    with open("altruism_indexes.tex", "w") as f:
+        f.write(latex_table)
+
+    print("\nLaTeX table saved to altruism_indexes.tex")
 
-with open("altruism_indexes.tex", "w") as f:
-    f.write(latex_table)
+    # ----------------------------
+    # Export Time Series
+    # ----------------------------
+    if TIMESERIES_FILE:
+        combine_timeseries([series[label] for label, _ in INDEXERS if label in series]).to_csv(
+            TIMESERIES_FILE, index=False)
+        print(f"Time series saved to {TIMESERIES_FILE}")
 
-print("\nLaTeX table saved to altruism_indexes.tex")
+if __name__ == "__main__":
+    main()
@@ -1,106 +1,135 @@
-import csv
-from collections import defaultdict
-import math
+import numpy as np
+import pandas as pd
+from helper.data.base_indexer import BaseIndexer
+from helper.data.loader import load_results
+from helper.data.incremental import IncrementalIndex, key_order
 
-class AtomicCongestionIndexer:
-    def __init__(self, csv_file, alpha_sw=0.5, alpha_fs=0.3, beta_fs=0.2):
+class AtomicCongestionIndexer(BaseIndexer):
+    GAME = "atomic_congestion"
+    MEASURES = ["social_welfare", "inequity_aversion", "svo_angle"]
+
+    def __init__(self, csv_file, alpha_sw=0.5, alpha_fs=0.3, beta_fs=0.2, incremental=False, streaming=False):
         """
-        :param csv_file: path to CSV
+        :param csv_file: path to CSV (or a list of partition paths)
         :param alpha_sw: alpha for Social Welfare weighting (0=selfish, 1=utilitarian)
         :param alpha_fs: alpha for Fehr-Schmidt disadvantage aversion
         :param beta_fs: beta for Fehr-Schmidt advantageous inequity aversion
+        :param incremental: keep each (LLM, round)'s latest cost next to each file and only
+                            read the rows appended since the last refresh
+        :param streaming: compute the same aggregates in bounded memory, one chunk of
+                          numeric columns at a time, without persisting them
         """
         self.csv_file = csv_file
         self.alpha_sw = alpha_sw
         self.alpha_fs = alpha_fs
         self.beta_fs = beta_fs
 
-        self.llm_to_index = {}
-        self.index_to_llm = {}
-        self.data = []
+        self._index_models([])
+        self.df = None
 
         # final altruism index per LLM
         self.altruism = {}
 
+        if incremental or streaming:
+            self._build_from_summary(persist=incremental)
+            return
+
         self._build_index()
-        self._compute_altruism()
+        self._set_altruism(self.row_means(self.measure_rows()))
 
     def _build_index(self):
-        """Reads CSV and stores numeric fields."""
-        with open(self.csv_file, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                llm = row['llm'].strip()
-                if llm not in self.llm_to_index:
-                    idx = len(self.llm_to_index)
-                    self.llm_to_index[llm] = idx
-                    self.index_to_llm[idx] = llm
-
-                try:
-                    row['round'] = int(row['round'])
-                    row['travel_time'] = float(row['travel_time'])
-                    row['cumulative_time'] = float(row['cumulative_time'])
-                    self.data.append(row)
-                except ValueError:
-                    continue  # skip malformed rows
-
-    def _compute_altruism(self):
-        """Compute all three altruism measures per LLM averaged across rounds."""
-        # group by round
-        rounds = defaultdict(list)
-        for r in self.data:
-            rounds[r['round']].append(r)
-
-        # temporary containers to collect per-round measures
-        sw_scores = defaultdict(list)
-        fs_scores = defaultdict(list)
-        svo_angles = defaultdict(list)
-
-        for rnd, round_data in rounds.items():
-            # prepare costs for each player
-            costs = {r['llm']: r['travel_time'] for r in round_data}
-            llms = list(costs.keys())
-
-            # compute Social Welfare weighting
-            total_cost = sum(costs.values())
-            for llm in llms:
-                ci = costs[llm]
-                others_cost = total_cost - ci
-                Ui_sw = - (1 - self.alpha_sw) * ci - self.alpha_sw * (ci + others_cost)
-                sw_scores[llm].append(Ui_sw)
-
-            # compute Fehr-Schmidt inequity aversion
-            for llm in llms:
-                ui = -costs[llm]  # transform to payoff
-                disadvantage = sum(max(uj - ui, 0) for other, uj in zip(llms, [-costs[l] for l in llms]) if other != llm)
-                advantage = sum(max(ui - uj, 0) for other, uj in zip(llms, [-costs[l] for l in llms]) if other != llm)
-                Ui_fs = ui - self.alpha_fs * disadvantage - self.beta_fs * advantage
-                fs_scores[llm].append(Ui_fs)
-
-            # compute SVO angle
-            for llm in llms:
-                pi = -costs[llm]
-                others = [-costs[l] for l in llms if l != llm]
-                pi_bar = sum(others)/len(others)
-                theta = math.atan2(pi_bar, pi)  # returns angle in radians
-                svo_angles[llm].append(theta)
-
-        # compute averages and store in altruism dictionary
-        for llm in self.llm_to_index:
-            self.altruism[llm] = {
-                "social_welfare": sum(sw_scores[llm])/len(sw_scores[llm]) if sw_scores[llm] else None,
-                "inequity_aversion": sum(fs_scores[llm])/len(fs_scores[llm]) if fs_scores[llm] else None,
-                "svo_angle": sum(svo_angles[llm])/len(svo_angles[llm]) if svo_angles[llm] else None
-            }
-
-    # -------------------
-    # Access Methods
-    # -------------------
-    def get_index(self, llm):
-        return self.llm_to_index.get(llm)
-
-    def get_llm(self, index):
-        return self.index_to_llm.get(index)
-
-    def all_indices(self):
-        return self.llm_to_index
+        self._index_models(self.frame()['llm'])
+
+    def _load_frame(self):
+        """Loads the typed result frame (malformed rows already dropped by the loader)."""
+        return load_results(self.csv_file, self.GAME, columns=["round", "llm", "travel_time", "cumulative_time"])
+
+    def _build_from_summary(self, persist=True):
+        """Scores only use each LLM's last cost per round, which is all the state keeps."""
+        index = IncrementalIndex(
+            "atomic_congestion", "atomic_congestion",
+            columns=["round", "llm", "travel_time", "cumulative_time"],
+            keys=["round", "llm"],
+            row_values=lambda raw: raw[["round", "llm", "travel_time"]],
+        )
+        self.summary = index.refresh(self.csv_file, persist=persist)
+        llms = key_order(self.summary)
+        self._index_models(llms)
+        if self.summary is None:
+            return
+
+        last = self.summary[("travel_time", "last")].rename("travel_time").reset_index()
+        self._set_altruism(self.row_means(self.round_scores(last)[["llm"] + self.MEASURES]))
+
+    def round_scores(self, df, alpha_sw=None, alpha_fs=None, beta_fs=None, by=("round",)):
+        """
+        Per (round, llm) Social Welfare, Fehr-Schmidt and SVO scores, vectorized over all rounds.
+
+        :param by: columns identifying one game round; ("trajectory", "round") keeps
+                   repeated games apart instead of pooling their rounds
+        """
+        alpha_sw = self.alpha_sw if alpha_sw is None else alpha_sw
+        alpha_fs = self.alpha_fs if alpha_fs is None else alpha_fs
+        beta_fs = self.beta_fs if beta_fs is None else beta_fs
+
+        c = self.round_components(df, by)
+        return pd.DataFrame({
+            **{col: c[col] for col in by},
+            "llm": c["llm"],
+            # Social Welfare weighting: -(1-a) c_i - a (c_i + sum_{j!=i} c_j)
+            "social_welfare": -(1 - alpha_sw) * c["cost"] - alpha_sw * c["total"],
+            # Fehr-Schmidt inequity aversion on payoffs u = -c
+            "inequity_aversion": c["u"] - alpha_fs * c["disadvantage"] - beta_fs * c["advantage"],
+            "svo_angle": c["svo_angle"],
+        })
+
+    def round_components(self, df, by=("round",)):
+        """
+        Parameter-free ingredients of the scores per (round, llm): own cost, round
+        total, payoff u = -c, Fehr-Schmidt advantage / disadvantage sums and the SVO angle.
+
+        Each LLM contributes one cost per round (its last row for that round). The
+        Fehr-Schmidt sums over the other players use a sort + prefix sum per round:
+        with payoffs u sorted ascending and k players strictly before u_i,
+            advantage_i    = k * u_i - sum(u before i)
+            disadvantage_i = sum(u after i) - (n - k - 1) * u_i
+        (ties contribute zero either way), so a round costs O(n log n) instead of O(n^2).
+        """
+        by = list(by)
+        d = df.drop_duplicates(by + ["llm"], keep="last")[by + ["llm", "travel_time"]]
+        cost = d["travel_time"].to_numpy(dtype=float)
+        by_round = d.groupby(by, sort=False)["travel_time"]
+        total = by_round.transform("sum").to_numpy(dtype=float)
+        n = by_round.transform("size").to_numpy(dtype=float)
+
+        u = -cost
+        round_id = by_round.ngroup().to_numpy()
+        order = np.lexsort((u, round_id))
+        sorted_frame = pd.DataFrame({"round": round_id[order], "u": u[order]})
+        grouped = sorted_frame.groupby("round", sort=False)["u"]
+        k = np.empty(len(u))
+        prefix = np.empty(len(u))
+        k[order] = grouped.cumcount().to_numpy(dtype=float)
+        prefix[order] = grouped.cumsum().to_numpy()  # includes u_i itself
+        total_u = -total
+        advantage = k * u - (prefix - u)
+        disadvantage = (total_u - prefix) - (n - k - 1) * u
+
+        # SVO angle: atan2(mean payoff of the others, own payoff)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            others_mean = np.where(n > 1, (total_u - u) / (n - 1), np.nan)
+
+        return pd.DataFrame({
+            **{col: d[col].to_numpy() for col in by},
+            "llm": d["llm"].to_numpy(),
+            "cost": cost,
+            "total": total,
+            "u": u,
+            "advantage": advantage,
+            "disadvantage": disadvantage,
+            "svo_angle": np.arctan2(others_mean, u),
+        })
+
+    def measure_rows(self):
+        """Per-(round, llm) scores behind each measure, for bootstrap CIs (helper.data.bootstrap)."""
+        return self.round_scores(self.frame())[["llm"] + self.MEASURES]
@@ -0,0 +1,104 @@
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class BaseIndexer:
+    """
+    Model bookkeeping and access methods shared by the game indexers.
+
+    Subclasses set GAME (the loader schema / metrics registry key) and MODEL_COL
+    (`llm` or `llm_name`, as the game writes it), fill `self.altruism` and expose
+    their per-row values for the metrics engine and the bootstrap:
+
+        measure_rows()      -> frame with an "llm" column and one column per row value
+        from_means(means)   -> {measure: value}; identity unless a measure is not a plain mean
+
+    `self.altruism` is derived the same way: from_means over each model's row
+    means (row_means in full mode, the running aggregates when incremental),
+    which are kept as `self.means`.
+
+    Row-level methods read frame(): an indexer built with incremental=True or
+    streaming=True keeps only aggregates (self.df is None) and loads its rows
+    from its sources the first time they are asked for.
+    """
+    GAME = None
+    MODEL_COL = "llm"
+
+    llm_to_index: Dict[str, int]
+    index_to_llm: Dict[int, str]
+    altruism: Dict[str, Dict]
+    means: Optional[pd.DataFrame] = None
+    df: Optional[pd.DataFrame]
+
+    def _index_models(self, models: Iterable[str]) -> None:
+        """Number models in first-appearance order."""
+        self.llm_to_index = {llm: i for i, llm in enumerate(pd.Series(models, dtype=object).unique())}
+        self.index_to_llm = {i: llm for llm, i in self.llm_to_index.items()}
+
+    def frame(self) -> pd.DataFrame:
+        """The indexer's prepared rows, loaded from its sources on first use."""
+        if self.df is None:
+            self.df = self._load_frame()
+        return self.df
+
+    def _load_frame(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def measure_rows(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def from_means(self, means):
+        return means
+
+    def row_means(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Per-model means of the value columns of a measure_rows frame (NaN skipped), one
+        row per model in first-appearance order. Values are added strictly left to right
+        (np.cumsum, like sum(list)), so the means match a per-row Python accumulation bit for bit.
+        """
+        value_cols = [c for c in rows.columns if c != "llm"]
+        codes, llms = pd.factorize(rows["llm"])
+        order = np.argsort(codes, kind="stable")
+        bounds = np.cumsum(np.bincount(codes, minlength=len(llms)))[:-1]
+        means = {}
+        for col in value_cols:
+            values = rows[col].to_numpy(dtype="float64")[order]
+            valid = ~np.isnan(values)
+            sums = [np.cumsum(v)[-1] if len(v) else 0.0 for v in np.split(np.where(valid, values, 0.0), bounds)]
+            counts = [int(v.sum()) for v in np.split(valid, bounds)]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means[col] = np.array(sums) / np.array(counts, dtype="float64")
+        return pd.DataFrame(means, index=pd.Index(llms, name="llm"), columns=value_cols)
+
+    def _set_altruism(self, means: pd.DataFrame) -> None:
+        """
+        self.altruism from per-model row means (one row per model) through from_means;
+        NaN measures and models without rows give None. The means are kept as self.means.
+        """
+        self.means = means
+        measures = self.from_means({c: means[c].to_numpy(dtype="float64") for c in means.columns})
+        values = {m: np.broadcast_to(np.asarray(v, dtype="float64"), len(means)) for m, v in measures.items()}
+        position = {llm: k for k, llm in enumerate(means.index)}
+        self.altruism = {}
+        for llm in self.llm_to_index:
+            k = position.get(llm)
+            self.altruism[llm] = {
+                m: None if k is None or np.isnan(v[k]) else float(v[k]) for m, v in values.items()
+            }
+
+    # -------------------
+    # Access Methods
+    # -------------------
+    def get_index(self, llm):
+        return self.llm_to_index.get(llm)
+
+    def get_llm(self, index):
+        return self.index_to_llm.get(index)
+
+    def all_indices(self):
+        return self.llm_to_index
+
+    def get_altruism(self, llm):
+        return self.altruism.get(llm)
@@ -0,0 +1,108 @@
+"""
+Vectorized bootstrap confidence intervals for the altruism indexes.
+
+Every indexer reports means of per-row values (or simple functions of such
+means). An indexer exposes them through
+
+    measure_rows()          -> frame with an "llm" column and one column per row value
+    from_means(means)       -> {measure: array}, optional; identity when absent
+
+For each model the engine draws a (resamples x rows) matrix of row indices in
+one go, takes the (NaN-skipping) mean of every value column for all resamples
+at once and reads the CI off the percentiles of the derived measures. Models
+can be resampled in parallel worker processes; only the (resamples x columns)
+means travel back.
+"""
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# upper bound on resamples x rows indices materialized at once
+MAX_BATCH_ELEMENTS = 20_000_000
+
+
+def resample_indices(n: int, n_resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """(n_resamples, n) matrix of row indices drawn with replacement."""
+    return rng.integers(0, n, size=(n_resamples, n), dtype=np.int64 if n > 2**31 - 1 else np.int32)
+
+
+def resampled_means(values: np.ndarray, n_resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Means of every column of `values` (rows x columns) for each resample, NaNs skipped.
+
+    Returns an (n_resamples, columns) array; resamples are drawn in batches so at
+    most MAX_BATCH_ELEMENTS indices exist at a time.
+    """
+    n, k = values.shape
+    out = np.empty((n_resamples, k))
+    if n == 0:
+        out.fill(np.nan)
+        return out
+    has_nan = np.isnan(values).any(axis=0)
+    batch = max(1, min(n_resamples, MAX_BATCH_ELEMENTS // n))
+    for start in range(0, n_resamples, batch):
+        stop = min(start + batch, n_resamples)
+        idx = resample_indices(n, stop - start, rng)
+        for j in range(k):
+            drawn = values[:, j][idx]
+            if has_nan[j]:
+                counts = np.count_nonzero(~np.isnan(drawn), axis=1)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    out[start:stop, j] = np.nansum(drawn, axis=1) / counts
+            else:
+                out[start:stop, j] = drawn.mean(axis=1)
+    return out
+
+
+def _resample_group(values: np.ndarray, n_resamples: int, seed: np.random.SeedSequence) -> np.ndarray:
+    return resampled_means(values, n_resamples, np.random.default_rng(seed))
+
+
+def bootstrap_ci(rows: pd.DataFrame,
+                 from_means: Optional[Callable[[Dict[str, np.ndarray]], Dict[str, np.ndarray]]] = None,
+                 n_resamples: int = 1000, confidence: float = 0.95, seed: int = 0,
+                 n_jobs: int = 1) -> Dict[str, Dict[str, Tuple[float, float]]]:
+    """
+    :param rows: "llm" column + per-row value columns (see measure_rows)
+    :param from_means: column means (arrays over resamples) -> measures; identity if None
+    :param n_resamples: bootstrap resamples per model
+    :param confidence: two-sided percentile interval, e.g. 0.95
+    :param seed: models get independent child streams of this seed
+    :param n_jobs: worker processes resampling models concurrently
+    :return: {llm: {measure: (low, high)}}
+    """
+    value_cols = [c for c in rows.columns if c != "llm"]
+    codes, llms = pd.factorize(rows["llm"])
+    values = rows[value_cols].to_numpy(dtype="float64")
+    order = np.argsort(codes, kind="stable")
+    groups = np.split(values[order], np.cumsum(np.bincount(codes, minlength=len(llms)))[:-1])
+    streams = np.random.SeedSequence(seed).spawn(len(llms))
+    tail = (1 - confidence) / 2 * 100
+
+    args = (groups, [n_resamples] * len(llms), streams)
+    if n_jobs > 1 and len(llms) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            resampled = list(pool.map(_resample_group, *args))
+    else:
+        resampled = list(map(_resample_group, *args))
+
+    results = {}
+    for llm, means in zip(llms, resampled):
+        columns = {c: means[:, j] for j, c in enumerate(value_cols)}
+        measures = from_means(columns) if from_means is not None else columns
+        cis = {}
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN measures
+            for name, draws in measures.items():
+                lo, hi = np.nanpercentile(np.asarray(draws, dtype="float64"), [tail, 100 - tail])
+                cis[name] = (None if np.isnan(lo) else float(lo), None if np.isnan(hi) else float(hi))
+        results[llm] = cis
+    return results
+
+
+def indexer_ci(indexer, **kwargs) -> Dict[str, Dict[str, Tuple[float, float]]]:
+    """bootstrap_ci over an indexer built in full (non-incremental) mode."""
+    return bootstrap_ci(indexer.measure_rows(), getattr(indexer, "from_means", None), **kwargs)
@@ -1,104 +1,176 @@
-import csv
-from collections import defaultdict
 from datetime import datetime
-
-class CostSharingSchedulerIndexer:
-    def __init__(self, csv_file):
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from helper.data.base_indexer import BaseIndexer
+from helper.data.loader import load_results
+from helper.data.incremental import IncrementalIndex, key_order
+
+COLUMNS = ["llm_name", "individual_payout", "team_payout", "individual_time", "team_time"]
+
+
+@lru_cache(maxsize=None)
+def slot_to_minutes(t):
+    """Minutes after midnight for a slot string like '9:30 AM'; None for blanks."""
+    if isinstance(t, str) and t.strip():
+        dt = datetime.strptime(t.strip(), "%I:%M %p")
+        return dt.hour * 60 + dt.minute
+    return None
+
+
+class CostSharingSchedulerIndexer(BaseIndexer):
+    GAME = "cost_sharing_game"
+    MODEL_COL = "llm_name"
+
+    def __init__(self, csv_file, incremental=False, streaming=False):
+        """
+        :param csv_file: path to CSV (or a list of partition paths)
+        :param incremental: keep running aggregates next to each file and only read the
+                            rows appended since the last refresh (self.df stays None until
+                            frame() loads it)
+        :param streaming: compute the same aggregates in bounded memory, one chunk of
+                          numeric columns at a time, without persisting them
+        """
         self.csv_file = csv_file
 
-        self.llm_to_index = {}
-        self.index_to_llm = {}
-        self.data = []
+        self._index_models([])
+        self.df = None
 
         self.altruism = {}
         self.utility = {}
 
+        if incremental or streaming:
+            self._build_from_summary(persist=incremental)
+            return
+
         self._build_index()
-        self._compute_measures()
+        self._set_altruism(self.row_means(self.measure_rows()))
+        self._set_utility(self.row_means(self.utility_rows()))
 
     # -------------------
     # CSV Reading & Parsing
     # -------------------
     def _build_index(self):
-        with open(self.csv_file, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-
-            for row in reader:
-                llm = row['llm_name'].strip()
-                if llm not in self.llm_to_index:
-                    idx = len(self.llm_to_index)
-                    self.llm_to_index[llm] = idx
-                    self.index_to_llm[idx] = llm
-
+        # models are numbered before rows with unparseable slots are dropped
+        df = load_results(self.csv_file, self.GAME, columns=COLUMNS)
+        self._index_models(df['llm_name'])
+        self.df = self._parse_times(df).reset_index(drop=True)
+
+    def _load_frame(self):
+        return self._parse_times(load_results(self.csv_file, self.GAME, columns=COLUMNS)).reset_index(drop=True)
+
+    def _parse_times(self, df):
+        """Slot strings -> minutes; rows with an unparseable slot are dropped (index kept)."""
+        # times come from a handful of slot strings: parse each distinct one once
+        bad = np.zeros(len(df), dtype=bool)
+        for col in ("individual_time", "team_time"):
+            codes, slots = pd.factorize(df[col])
+            minutes = np.full(len(slots) + 1, np.nan)  # last entry serves code -1 (missing)
+            for k, t in enumerate(slots):
                 try:
-                    row['individual_time'] = self.parse_time(row['individual_time'])
-                    row['team_time'] = self.parse_time(row['team_time'])
-                    row['individual_payout'] = float(row['individual_payout'])
-                    row['team_payout'] = float(row['team_payout'])
-                    self.data.append(row)
+                    parsed = slot_to_minutes(t)
                 except ValueError as e:
-                    print(f"Skipping row due to conversion error: {row}, Error: {e}")
+                    print(f"Skipping rows with {col}={t!r} due to conversion error: {e}")
+                    bad |= codes == k
                     continue
+                minutes[k] = np.nan if parsed is None else parsed
+            df[col] = minutes[codes]
+        return df[~bad] if bad.any() else df
 
     def parse_time(self, t):
-        if isinstance(t, str) and t.strip():
-            dt = datetime.strptime(t.strip(), "%I:%M %p")
-            return dt.hour * 60 + dt.minute
-        return None
+        return slot_to_minutes(t)
 
     # -------------------
     # Computation
     # -------------------
-    def _compute_measures(self):
-        llm_groups = defaultdict(list)
-        for row in self.data:
-            llm_groups[row['llm_name']].append(row)
-
-        for llm, rows in llm_groups.items():
-            altruism_eq13 = []
-            altruism_eq14 = []
-            utilities = []
-
-            min_Ci = min(r['individual_time'] for r in rows if r['individual_time'] is not None)
-
-            for r in rows:
-                Ci = r['individual_time']
-                Ti = r['team_time']
-                Ei = r['individual_payout']
-                Ti_payout = r['team_payout']
-
-                if Ei is not None and Ci is not None and Ei != min_Ci:
-                    Ai_13 = (Ei - Ci) / (Ei - min_Ci)
-                    altruism_eq13.append(Ai_13)
-
-                if Ti is not None and Ci is not None and Ti > 0:
-                    Ai_14 = (Ti - Ci) / Ti
-                    altruism_eq14.append(Ai_14)
-
-                alpha = 0.5
-                U = (1 - alpha) * Ei + alpha * Ti_payout
-                utilities.append(U)
-
-            self.altruism[llm] = {
-                "eq13": sum(altruism_eq13)/len(altruism_eq13) if altruism_eq13 else None,
-                "eq14": sum(altruism_eq14)/len(altruism_eq14) if altruism_eq14 else None
-            }
-            self.utility[llm] = sum(utilities)/len(utilities) if utilities else None
+    def _set_utility(self, means):
+        """self.utility from per-model means of the utility rows; None when a model has none."""
+        utility = means["utility"]
+        self.utility = {llm: None if pd.isna(utility.get(llm)) else float(utility[llm])
+                        for llm in self.llm_to_index}
+
+    def _build_from_summary(self, persist=True):
+        """
+        Measures from running aggregates keyed by (LLM, Ei, Ci).
+
+        eq13 depends on each LLM's earliest slot over its whole history, so it is
+        recomputed from these per-(payout, slot) counts; payouts and slots come
+        from a small configured set, which keeps the state small.
+        """
+        def row_values(raw):
+            df = self._parse_times(raw)
+            Ci, Ti = df['individual_time'], df['team_time']
+            alpha = 0.5
+            return pd.DataFrame({
+                "llm_name": df['llm_name'],
+                "Ei": df['individual_payout'],
+                "Ci": Ci.fillna(-1),  # -1: no slot (a NaN key would be dropped)
+                "eq14": ((Ti - Ci) / Ti).where(Ci.notna() & Ti.notna() & (Ti > 0)),
+                "utility": (1 - alpha) * df['individual_payout'] + alpha * df['team_payout'],
+            })
+
+        index = IncrementalIndex("cost_sharing", "cost_sharing_game", columns=COLUMNS,
+                                 keys=["llm_name", "Ei", "Ci"], row_values=row_values)
+        self.summary = index.refresh(self.csv_file, persist=persist)
+        llms = key_order(self.summary, self.MODEL_COL)
+        self._index_models(llms)
+        if self.summary is None:
+            return
+
+        s = self.summary
+        keys = s.index.to_frame(index=False)
+        llm, Ei, Ci = keys['llm_name'], keys['Ei'].to_numpy(), keys['Ci'].to_numpy()
+        n = s[('utility', 'count')].to_numpy()
+        has_slot = Ci >= 0
+        min_Ci = pd.Series(np.where(has_slot, Ci, np.nan)).groupby(llm, sort=False).transform('min').to_numpy()
+
+        m13 = has_slot & (Ei != min_Ci)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            eq13_sum = np.where(m13, n * (Ei - Ci) / (Ei - min_Ci), 0.0)
+        per_llm = pd.DataFrame({
+            "eq13_sum": eq13_sum,
+            "eq13_n": np.where(m13, n, 0.0),
+            "eq14_sum": s[('eq14', 'sum')].to_numpy(),
+            "eq14_n": s[('eq14', 'count')].to_numpy(),
+            "utility_sum": s[('utility', 'sum')].to_numpy(),
+            "n": n,
+        }).groupby(llm, sort=False).sum()
+
+        self._set_altruism(pd.DataFrame({
+            "eq13": per_llm['eq13_sum'] / per_llm['eq13_n'],
+            "eq14": per_llm['eq14_sum'] / per_llm['eq14_n'],
+        }))
+        self._set_utility(pd.DataFrame({"utility": per_llm['utility_sum'] / per_llm['n']}))
+
+    def measure_rows(self):
+        """
+        Per-row eq13/eq14 values, for bootstrap CIs (helper.data.bootstrap). eq13 keeps
+        each LLM's earliest slot over the full sample fixed across resamples.
+        """
+        df = self.frame()
+        Ci, Ti, Ei = df['individual_time'], df['team_time'], df['individual_payout']
+        min_Ci = Ci.groupby(df['llm_name'], sort=False).transform('min')
+        return pd.DataFrame({
+            "llm": df['llm_name'],
+            "eq13": ((Ei - Ci) / (Ei - min_Ci)).where(Ci.notna() & Ei.notna() & (Ei != min_Ci)),
+            "eq14": ((Ti - Ci) / Ti).where(Ci.notna() & Ti.notna() & (Ti > 0)),
+        })
+
+    def utility_rows(self):
+        """Per-row utility (1 - alpha) * Ei + alpha * team payout, alpha = 0.5."""
+        df = self.frame()
+        alpha = 0.5
+        return pd.DataFrame({
+            "llm": df['llm_name'],
+            "utility": (1 - alpha) * df['individual_payout'] + alpha * df['team_payout'],
+        })
 
     # -------------------
     # Access Methods
     # -------------------
-    def get_index(self, llm):
-        return self.llm_to_index.get(llm)
-
-    def get_llm(self, index):
-        return self.index_to_llm.get(index)
-
     def all_indices(self):
         return list(self.llm_to_index.keys())
 
-    def get_altruism(self, llm):
-        return self.altruism.get(llm)
-
     def get_utility(self, llm):
         return self.utility.get(llm)
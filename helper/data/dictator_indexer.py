@@ -1,11 +1,21 @@
-import pandas as pd
-import re
 import numpy as np
+from helper.data.base_indexer import BaseIndexer
+from helper.data.loader import load_results
+from helper.data.incremental import IncrementalIndex, key_order
 
-class DictatorGameIndexer:
-    def __init__(self, csv_file):
+class DictatorGameIndexer(BaseIndexer):
+    GAME = "dictator_game"
+    MODEL_COL = "llm_name"
+    MEASURES = ["alpha", "beta", "theta", "UD"]
+
+    def __init__(self, csv_file, incremental=False, streaming=False):
         """
-        :param csv_file: path to CSV
+        :param csv_file: path to CSV (or a list of partition paths)
+        :param incremental: keep running per-LLM aggregates next to each file and only
+                            read the rows appended since the last refresh (self.df stays None
+                            until frame() loads it)
+        :param streaming: compute the same aggregates in bounded memory, one chunk of
+                          numeric columns at a time, without persisting them
 
         CSV columns:
         llm_name,response,scenario_type,endowment,num_recipients,
@@ -14,25 +24,39 @@ class DictatorGameIndexer:
         self.csv_file = csv_file
 
         self.df = None
-        self.llm_to_index = {}
-        self.index_to_llm = {}
+        self._index_models([])
         self.altruism = {}
 
-        self._load_data()
+        if incremental or streaming:
+            self._build_from_summary(persist=incremental)
+            return
+
+        self.frame()
         self._build_index()
-        self._compute_measures()
+        self._set_altruism(self.row_means(self.measure_rows()))
 
-    def _load_data(self):
-        """Load CSV into pandas and parse Keep/Donate values from response."""
-        df = pd.read_csv(self.csv_file, engine="python", quoting=1, on_bad_lines="skip")
+    def _load_frame(self):
+        """Load CSV into pandas, parse Keep/Donate values from response and add the per-row measures."""
+        return self.row_measures(self._parse_responses(load_results(self.csv_file, self.GAME)))
 
-        # Clean numeric fields
-        df["endowment"] = pd.to_numeric(df["endowment"], errors="coerce")
-        df["num_recipients"] = pd.to_numeric(df.get("num_recipients", 1), errors="coerce").fillna(1).astype(int)
+    def _parse_responses(self, df):
+        """
+        Keep/Donate percentages from the response text, falling back to the keep/donate
+        percentages the game records alongside it (in every mode, so incremental and
+        streaming summaries agree with the full index).
+        """
+        df["num_recipients"] = df["num_recipients"].fillna(1).astype(int)
 
         # Extract Keep and Donate as percentages
-        df["keep_percent"] = df["response"].str.extract(r'Keep\s*(\d+)%').astype(float)
-        df["donate_percent"] = df["response"].str.extract(r'Donate\s*(\d+)%').astype(float)
+        if "response" in df.columns:
+            df["keep_percent"] = df["response"].str.extract(r'Keep\s*(\d+)%', expand=False).astype(float)
+            df["donate_percent"] = df["response"].str.extract(r'Donate\s*(\d+)%', expand=False).astype(float)
+        else:
+            df["keep_percent"] = np.nan
+            df["donate_percent"] = np.nan
+        if "keep" in df.columns and "donate" in df.columns:
+            df["keep_percent"] = df["keep_percent"].fillna(df["keep"])
+            df["donate_percent"] = df["donate_percent"].fillna(df["donate"])
 
         # Drop rows where percentages missing
         df = df.dropna(subset=["keep_percent", "donate_percent", "endowment"])
@@ -40,18 +64,15 @@ class DictatorGameIndexer:
         # Convert percentages into absolute amounts
         df["keep"] = (df["keep_percent"] / 100.0) * df["endowment"]
         df["donate"] = (df["donate_percent"] / 100.0) * df["endowment"]
-
-        self.df = df
+        return df
 
     def _build_index(self):
         """Build mappings between LLM names and indices."""
-        unique_llms = self.df["llm_name"].str.strip().unique()
-        self.llm_to_index = {llm: i for i, llm in enumerate(unique_llms)}
-        self.index_to_llm = {i: llm for llm, i in self.llm_to_index.items()}
+        self._index_models(self.df["llm_name"].str.strip())
 
-    def _compute_measures(self):
+    def row_measures(self, df):
         """
-        Compute altruism indexes:
+        Add the per-row altruism indexes to a parsed frame:
         α = (U_D - keep) / donate
         β = (keep - U_D) / (keep - donate)
         θ = (U_D - keep) / ln(1 + donate)
@@ -59,8 +80,6 @@ class DictatorGameIndexer:
         Assumption:
         U_D = keep + donate  (dictator values both own and given payoff equally)
         """
-        df = self.df.copy()
-
         # Dictator utility assumption (can be adjusted later if needed)
         df["UD"] = df["keep"] + df["donate"]
 
@@ -80,30 +99,31 @@ class DictatorGameIndexer:
             (df["UD"] - df["keep"]) / np.log1p(df["donate"]),
             np.nan
         )
+        return df
+
+    def _build_from_summary(self, persist=True):
+        """Per-LLM measures from running aggregates (persisted and refreshed when incremental)."""
+        index = IncrementalIndex(
+            "dictator", "dictator_game",
+            columns=["llm_name", "response", "endowment", "num_recipients", "keep", "donate"],
+            keys=["llm_name"],
+            row_values=lambda raw: self.row_measures(self._parse_responses(raw))[["llm_name"] + self.MEASURES],
+        )
+        self.summary = index.refresh(self.csv_file, persist=persist)
+        llms = key_order(self.summary, self.MODEL_COL)
+        self._index_models(llms)
+        if self.summary is None:
+            return
 
-        # Aggregate averages per LLM into a nested dict
-        grouped = df.groupby("llm_name").agg({
-            "alpha": "mean",
-            "beta": "mean",
-            "theta": "mean",
-            "UD": "mean"
-        })
+        self._set_altruism(self.summary.xs("mean", axis=1, level=1))
 
-        self.altruism = grouped.to_dict(orient="index")
-        self.df = df  # keep enriched dataframe
+    def measure_rows(self):
+        """Per-row values behind each measure, for bootstrap CIs (helper.data.bootstrap)."""
+        return self.frame()[["llm_name"] + self.MEASURES].rename(columns={"llm_name": "llm"})
 
     # -------------------
     # Access Methods
     # -------------------
-    def get_index(self, llm):
-        return self.llm_to_index.get(llm)
-
-    def get_llm(self, index):
-        return self.index_to_llm.get(index)
-
-    def all_indices(self):
-        return self.llm_to_index
-
     def get_altruism(self, llm):
         """Return dict of {alpha, beta, theta, UD} for a given LLM"""
         return self.altruism.get(llm, {})
@@ -1,11 +1,20 @@
 import pandas as pd
-from collections import defaultdict
-import math
+from helper.data.base_indexer import BaseIndexer
+from helper.data.loader import load_results
+from helper.data.incremental import IncrementalIndex, key_order
 
-class GenCoalitionIndexer:
-    def __init__(self, csv_file):
+class GenCoalitionIndexer(BaseIndexer):
+    GAME = "gen_coalition"
+    MODEL_COL = "llm_name"
+
+    def __init__(self, csv_file, incremental=False, streaming=False):
         """
-        :param csv_file: path to CSV containing gen coalition results
+        :param csv_file: path to CSV containing gen coalition results (or a list of partition paths)
+        :param incremental: keep running per-LLM aggregates next to each file and only
+                            read the rows appended since the last refresh (self.df stays None
+                            until frame() loads it)
+        :param streaming: compute the same aggregates in bounded memory, one chunk of
+                          numeric columns at a time, without persisting them
         
         Expected CSV columns:
         llm_name,prompt,llm_value,llm_reasoning,llm_allocation_C1,llm_allocation_C2,
@@ -14,65 +23,69 @@ class GenCoalitionIndexer:
         """
         self.csv_file = csv_file
         self.df = None
-        self.llm_to_index = {}
-        self.index_to_llm = {}
+        self._index_models([])
         self.altruism = {}
-        
-        self._load_data()
+
+        if incremental or streaming:
+            self._build_from_summary(persist=incremental)
+            return
+
+        self.frame()
         self._build_index()
-        self._compute_measures()
+        self._set_altruism(self.row_means(self.measure_rows()))
 
-    def _load_data(self):
-        """Load CSV into pandas and clean data types."""
-        self.df = pd.read_csv(self.csv_file, engine="python", quoting=1, on_bad_lines="skip")
-        
-        # Clean numeric fields
-        numeric_cols = ['llm_value', 'llm_allocation_C1', 'llm_allocation_C2', 'M',
-                       'own_gain_C1', 'own_gain_C2', 'friends_gain_C1', 'friends_gain_C2',
-                       'SF_distance', 'EQ_distance', 'AL_distance']
-        for col in numeric_cols:
-            self.df[col] = pd.to_numeric(self.df[col], errors="coerce")
-        
-        # Drop rows with missing essential data
-        self.df = self.df.dropna(subset=['llm_name', 'llm_allocation_C1', 'llm_allocation_C2'])
+    def _load_frame(self):
+        """Load the typed result frame (rows without allocations are dropped by the loader)."""
+        return load_results(self.csv_file, self.GAME)
 
     def _build_index(self):
         """Build mappings between LLM names and indices."""
-        unique_llms = self.df["llm_name"].str.strip().unique()
-        self.llm_to_index = {llm: i for i, llm in enumerate(unique_llms)}
-        self.index_to_llm = {i: llm for llm, i in self.llm_to_index.items()}
+        self._index_models(self.df["llm_name"].str.strip())
 
-    def _compute_measures(self):
-        """Compute altruism measures per LLM."""
-        grouped = self.df.groupby("llm_name")
-        
-        self.altruism = {
-            llm: {
-                "sf_distance": group["SF_distance"].mean(),
-                "eq_distance": group["EQ_distance"].mean(),
-                "al_distance": group["AL_distance"].mean(),
-                "allocation_c1": group["llm_allocation_C1"].mean(),
-                "allocation_c2": group["llm_allocation_C2"].mean(),
-                "friends_focus": group["llm_allocation_C2"].mean() / 100.0,  # Percentage allocated to friends
-                "self_focus": group["llm_allocation_C1"].mean() / 100.0,    # Percentage allocated to self
-                "altruism_ratio": group["llm_allocation_C2"].mean() / (group["llm_allocation_C1"].mean() + group["llm_allocation_C2"].mean()),
-                "efficiency": (group["own_gain_C1"] * group["llm_allocation_C1"] / 100 + 
-                              group["friends_gain_C2"] * group["llm_allocation_C2"] / 100).mean()
-            }
-            for llm, group in grouped
-        }
+    def row_values(self, df):
+        return pd.DataFrame({
+            "llm_name": df["llm_name"],
+            "sf_distance": df["SF_distance"],
+            "eq_distance": df["EQ_distance"],
+            "al_distance": df["AL_distance"],
+            "allocation_c1": df["llm_allocation_C1"],
+            "allocation_c2": df["llm_allocation_C2"],
+            "efficiency": df["own_gain_C1"] * df["llm_allocation_C1"] / 100 +
+                          df["friends_gain_C2"] * df["llm_allocation_C2"] / 100,
+        })
 
-    # -------------------
-    # Access Methods
-    # -------------------
-    def get_index(self, llm):
-        return self.llm_to_index.get(llm)
+    def _build_from_summary(self, persist=True):
+        """Per-LLM measures from running aggregates (persisted and refreshed when incremental)."""
+        index = IncrementalIndex(
+            "gen_coalition", "gen_coalition",
+            columns=["llm_name", "SF_distance", "EQ_distance", "AL_distance", "llm_allocation_C1",
+                     "llm_allocation_C2", "own_gain_C1", "friends_gain_C2"],
+            keys=["llm_name"],
+            row_values=self.row_values,
+        )
+        self.summary = index.refresh(self.csv_file, persist=persist)
+        llms = key_order(self.summary, self.MODEL_COL)
+        self._index_models(llms)
+        if self.summary is None:
+            return
 
-    def get_llm(self, index):
-        return self.index_to_llm.get(index)
+        self._set_altruism(self.summary.xs("mean", axis=1, level=1))
 
-    def all_indices(self):
-        return self.llm_to_index
+    def measure_rows(self):
+        """Per-row values behind each measure, for bootstrap CIs (helper.data.bootstrap)."""
+        return self.row_values(self.frame()).rename(columns={"llm_name": "llm"})
 
-    def get_altruism(self, llm):
-        return self.altruism.get(llm)
+    def from_means(self, means):
+        """Measures from the means of the row values (scalars or arrays of resamples)."""
+        c1, c2 = means["allocation_c1"], means["allocation_c2"]
+        return {
+            "sf_distance": means["sf_distance"],
+            "eq_distance": means["eq_distance"],
+            "al_distance": means["al_distance"],
+            "allocation_c1": c1,
+            "allocation_c2": c2,
+            "friends_focus": c2 / 100.0,
+            "self_focus": c1 / 100.0,
+            "altruism_ratio": c2 / (c1 + c2),
+            "efficiency": means["efficiency"],
+        }
@@ -1,10 +1,19 @@
-import pandas as pd
-from collections import defaultdict
+from helper.data.base_indexer import BaseIndexer
+from helper.data.loader import load_results
+from helper.data.incremental import IncrementalIndex, key_order
 
-class HedonicGameIndexer:
-    def __init__(self, csv_file):
+class HedonicGameIndexer(BaseIndexer):
+    GAME = "hedonic_game"
+    MODEL_COL = "llm_name"
+
+    def __init__(self, csv_file, incremental=False, streaming=False):
         """
-        :param csv_file: path to CSV containing hedonic game results
+        :param csv_file: path to CSV containing hedonic game results (or a list of partition paths)
+        :param incremental: keep running per-LLM aggregates next to each file and only
+                            read the rows appended since the last refresh (self.df stays None
+                            until frame() loads it)
+        :param streaming: compute the same aggregates in bounded memory, one chunk of
+                          numeric columns at a time, without persisting them
         
         Expected CSV columns:
         llm_name,agent,prompt,llm_value,llm_reasoning,parsed_action,
@@ -12,61 +21,57 @@ class HedonicGameIndexer:
         """
         self.csv_file = csv_file
         self.df = None
-        self.llm_to_index = {}
-        self.index_to_llm = {}
+        self._index_models([])
         self.altruism = {}
-        
-        self._load_data()
+
+        if incremental or streaming:
+            self._build_from_summary(persist=incremental)
+            return
+
+        self.frame()
         self._build_index()
-        self._compute_measures()
+        self._set_altruism(self.row_means(self.measure_rows()))
 
-    def _load_data(self):
-        """Load CSV into pandas and clean data types."""
-        self.df = pd.read_csv(self.csv_file, engine="python", quoting=1, on_bad_lines="skip")
-        
-        # Clean numeric fields
-        numeric_cols = ['llm_value', 'u_selfish', 'u_chosen', 'friends_benefit_sum', 
-                       'friends_harm_sum', 'ALTRUISM_SCORE']
-        for col in numeric_cols:
-            self.df[col] = pd.to_numeric(self.df[col], errors="coerce")
-        
-        # Drop rows with missing essential data
-        self.df = self.df.dropna(subset=['llm_name', 'ALTRUISM_SCORE'])
+    def _load_frame(self):
+        """Load the typed result frame (rows without a score are dropped by the loader)."""
+        return load_results(self.csv_file, self.GAME)
 
     def _build_index(self):
         """Build mappings between LLM names and indices."""
-        unique_llms = self.df["llm_name"].str.strip().unique()
-        self.llm_to_index = {llm: i for i, llm in enumerate(unique_llms)}
-        self.index_to_llm = {i: llm for llm, i in self.llm_to_index.items()}
+        self._index_models(self.df["llm_name"].str.strip())
 
-    def _compute_measures(self):
-        """Compute altruism measures per LLM."""
-        grouped = self.df.groupby("llm_name")
-        
-        self.altruism = {
-            llm: {
-                "altruism_score": group["ALTRUISM_SCORE"].mean(),
-                "friends_benefit": group["friends_benefit_sum"].mean(),
-                "friends_harm": group["friends_harm_sum"].mean(),
-                "utility_selfish": group["u_selfish"].mean(),
-                "utility_chosen": group["u_chosen"].mean(),
-                "stay_rate": (group["parsed_action"] == "STAY").mean(),
-                "leave_rate": (group["parsed_action"] == "LEAVE").mean()
-            }
-            for llm, group in grouped
-        }
+    # per-row value behind each measure
+    ROW_VALUES = {
+        "altruism_score": "ALTRUISM_SCORE",
+        "friends_benefit": "friends_benefit_sum",
+        "friends_harm": "friends_harm_sum",
+        "utility_selfish": "u_selfish",
+        "utility_chosen": "u_chosen",
+    }
 
-    # -------------------
-    # Access Methods
-    # -------------------
-    def get_index(self, llm):
-        return self.llm_to_index.get(llm)
+    def row_values(self, df):
+        values = df[["llm_name"] + list(self.ROW_VALUES.values())].rename(
+            columns={v: k for k, v in self.ROW_VALUES.items()})
+        values["stay_rate"] = (df["parsed_action"] == "STAY").astype(float)
+        values["leave_rate"] = (df["parsed_action"] == "LEAVE").astype(float)
+        return values
 
-    def get_llm(self, index):
-        return self.index_to_llm.get(index)
+    def _build_from_summary(self, persist=True):
+        """Per-LLM measures from running aggregates (persisted and refreshed when incremental)."""
+        index = IncrementalIndex(
+            "hedonic", "hedonic_game",
+            columns=["llm_name", "parsed_action"] + list(self.ROW_VALUES.values()),
+            keys=["llm_name"],
+            row_values=self.row_values,
+        )
+        self.summary = index.refresh(self.csv_file, persist=persist)
+        llms = key_order(self.summary, self.MODEL_COL)
+        self._index_models(llms)
+        if self.summary is None:
+            return
 
-    def all_indices(self):
-        return self.llm_to_index
+        self._set_altruism(self.summary.xs("mean", axis=1, level=1))
 
-    def get_altruism(self, llm):
-        return self.altruism.get(llm)
+    def measure_rows(self):
+        """Per-row values behind each measure, for bootstrap CIs (helper.data.bootstrap)."""
+        return self.row_values(self.frame()).rename(columns={"llm_name": "llm"})
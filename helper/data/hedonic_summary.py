@@ -0,0 +1,72 @@
+"""
+Normalized hedonic altruism score and its companion statistics.
+
+    A_bar = (1 / (T * |N|)) * sum_{t=1}^{T} sum_{i in N} Altruism_i^(t)
+
+with T the number of decisions and |N| the number of distinct agents. The
+score frame is loaded once per source (and again only when a file's size or
+mtime changes); the overall and per-model statistics come from a single
+groupby over it. Shared by HedonicGame and calculate_altruism_by_model.py.
+"""
+import os
+from typing import Dict, Tuple
+
+import pandas as pd
+
+from helper.data.loader import load_results
+from helper.data.partitions import resolve_sources
+
+COLUMNS = ["llm_name", "agent", "ALTRUISM_SCORE"]
+COUNTS = ["total_rounds", "unique_agents", "non_zero_count", "zero_count"]
+
+_frames: Dict[Tuple, pd.DataFrame] = {}
+
+
+def load_scores(source) -> pd.DataFrame:
+    """Typed (llm_name, agent, ALTRUISM_SCORE) frame, memoized by the files' size and mtime."""
+    paths = resolve_sources(source)
+    key = tuple((p, os.stat(p).st_size, os.stat(p).st_mtime_ns) for p in paths)
+    if key not in _frames:
+        for stale in [k for k in _frames if [p for p, *_ in k] == paths]:
+            del _frames[stale]
+        _frames[key] = load_results(source, "hedonic_game", columns=COLUMNS)
+    return _frames[key]
+
+
+def altruism_stats(df: pd.DataFrame, by: str = None) -> pd.DataFrame:
+    """A_bar and score statistics for the whole frame (by=None) or per value of `by`."""
+    keys = df[by] if by is not None else pd.Series(0, index=df.index)
+    score = df["ALTRUISM_SCORE"]
+    g = score.groupby(keys, sort=True)
+    stats = pd.DataFrame({
+        "total_rounds": g.size(),
+        "unique_agents": df["agent"].groupby(keys, sort=True).nunique(),
+        "total_altruism": g.sum(),
+        "mean_altruism": g.mean(),
+        "median_altruism": g.median(),
+        "min_altruism": g.min(),
+        "max_altruism": g.max(),
+        "std_altruism": g.std(),
+        "non_zero_count": (score > 0).groupby(keys, sort=True).sum(),
+        "zero_count": (score == 0).groupby(keys, sort=True).sum(),
+    })
+    denom = (stats["total_rounds"] * stats["unique_agents"]).where(lambda d: d > 0)
+    stats.insert(0, "A_bar", (stats["total_altruism"] / denom).fillna(0.0))
+    stats["altruism_rate"] = stats["non_zero_count"] / stats["total_rounds"] * 100
+    return stats
+
+
+def altruism_summary(source) -> Dict:
+    """Overall A_bar and statistics over every decision in `source`."""
+    df = load_scores(source)
+    if len(df) == 0:
+        return {"error": "No data found in CSV file"}
+    row = altruism_stats(df).iloc[0]
+    return {k: int(v) if k in COUNTS else v for k, v in row.items()}
+
+
+def altruism_by_model(source) -> pd.DataFrame:
+    """Per-model A_bar and statistics, one row per model, sorted by A_bar (highest first)."""
+    stats = altruism_stats(load_scores(source), by="llm_name")
+    stats = stats.rename_axis("model").reset_index()
+    return stats.sort_values("A_bar", ascending=False, kind="stable")
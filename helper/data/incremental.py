@@ -0,0 +1,210 @@
+"""
+Incremental indexer state.
+
+An indexer that supports incremental refreshes reduces its rows to per-key
+running aggregates (count, sum, Welford mean / M2, min, max, first, last) of a
+few value columns, keyed by model (and e.g. round). For every result file the
+aggregates are persisted under `.cache/` together with the byte offset of the
+last row consumed, so a refresh only parses the rows appended since then and
+merges their aggregates into the stored ones (Chan et al.'s parallel update).
+Rows are consumed in chunks of CHUNK_ROWS, so the same machinery also streams
+files larger than memory (persist=False: nothing is written).
+
+If a file shrank or its first bytes changed (rewritten, compacted), its state
+is discarded and the file is consumed from the start again.
+"""
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from helper.data.loader import CACHE_DIR, CHUNK_ROWS, iter_appended
+from helper.data.partitions import resolve_sources
+
+STATS = ["count", "sum", "mean", "m2", "min", "max", "first", "last"]
+
+# bytes hashed to recognise a file that was rewritten rather than appended to
+FINGERPRINT_BYTES = 4096
+
+
+# -------------------
+# Running aggregates
+# -------------------
+def summarize(values: pd.DataFrame, keys: Sequence[str]) -> pd.DataFrame:
+    """
+    Aggregate `values` (key columns + numeric value columns) per key.
+
+    Returns a frame indexed by the keys (in first-appearance order) with a
+    (value, stat) column MultiIndex; NaN values are skipped like pandas' mean.
+    """
+    keys = list(keys)
+    cols = [c for c in values.columns if c not in keys]
+    g = values.groupby(keys, sort=False)[cols]
+    count = g.count()
+    mean = g.mean()
+    parts = {
+        "count": count,
+        "sum": g.sum(),
+        "mean": mean,
+        "m2": g.var(ddof=0) * count,
+        "min": g.min(),
+        "max": g.max(),
+        "first": g.first(),
+        "last": g.last(),
+    }
+    out = pd.concat(parts, axis=1).swaplevel(axis=1)
+    return out.reindex(columns=pd.MultiIndex.from_product([cols, STATS])).astype("float64")
+
+
+def combine(a: Optional[pd.DataFrame], b: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """Merge two summaries; `b` holds the later rows. Keys keep first-appearance order."""
+    if a is None or a.empty:
+        return b
+    if b is None or b.empty:
+        return a
+    index = a.index.append(b.index[~b.index.isin(a.index)])
+    a = a.reindex(index)
+    b = b.reindex(index)
+
+    out = {}
+    for col in a.columns.get_level_values(0).unique():
+        na = a[(col, "count")].fillna(0)
+        nb = b[(col, "count")].fillna(0)
+        n = na + nb
+        ma = a[(col, "mean")].fillna(0)
+        mb = b[(col, "mean")].fillna(0)
+        delta = mb - ma
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (ma + delta * nb / n).where(na > 0, mb).where(nb > 0, ma)
+            m2 = a[(col, "m2")].fillna(0) + b[(col, "m2")].fillna(0) + (delta ** 2 * na * nb / n).fillna(0)
+        has_a, has_b = na > 0, nb > 0
+        out[(col, "count")] = n
+        out[(col, "sum")] = a[(col, "sum")].fillna(0) + b[(col, "sum")].fillna(0)
+        out[(col, "mean")] = mean.where(n > 0)
+        out[(col, "m2")] = m2.where(n > 0)
+        out[(col, "min")] = np.fmin(a[(col, "min")], b[(col, "min")])
+        out[(col, "max")] = np.fmax(a[(col, "max")], b[(col, "max")])
+        out[(col, "first")] = a[(col, "first")].where(has_a, b[(col, "first")])
+        out[(col, "last")] = b[(col, "last")].where(has_b, a[(col, "last")])
+    return pd.DataFrame(out, index=index)
+
+
+def variance(summary: pd.DataFrame, col: str, ddof: int = 1) -> pd.Series:
+    return summary[(col, "m2")] / (summary[(col, "count")] - ddof).where(lambda n: n > 0)
+
+
+# -------------------
+# Persisted state
+# -------------------
+@dataclass
+class FileState:
+    offset: int = 0
+    fingerprint: str = ""
+    params: tuple = ()
+    summary: Optional[pd.DataFrame] = None
+    # rows an indexer needs to see again with the next batch (e.g. the previous move)
+    carry: Optional[pd.DataFrame] = None
+    rows: int = 0
+
+
+def state_path(path: str, name: str) -> str:
+    return os.path.join(os.path.dirname(path) or ".", CACHE_DIR, f"{os.path.basename(path)}.{name}.state.pkl")
+
+
+def _fingerprint(path: str, upto: int) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read(min(upto, FINGERPRINT_BYTES))).hexdigest()
+
+
+def _load_state(path: str, name: str, params: tuple) -> FileState:
+    try:
+        with open(state_path(path, name), "rb") as f:
+            state = pickle.load(f)
+    except Exception:
+        return FileState(params=params)
+    size = os.path.getsize(path)
+    if (state.params != params or state.offset > size
+            or state.fingerprint != _fingerprint(path, state.offset)):
+        return FileState(params=params)
+    return state
+
+
+def _save_state(path: str, name: str, state: FileState) -> None:
+    target = state_path(path, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = target + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, target)
+
+
+class IncrementalIndex:
+    def __init__(self, name: str, schema: str, columns: List[str], keys: Sequence[str],
+                 row_values: Callable[[pd.DataFrame], pd.DataFrame],
+                 carry: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                 params: tuple = (), chunksize: int = CHUNK_ROWS):
+        """
+        :param name: state file tag, e.g. "dictator"
+        :param schema: loader schema of the result files
+        :param columns: columns to parse from appended rows
+        :param keys: key columns of the summary, e.g. ["llm"] or ["llm", "round"]
+        :param row_values: raw rows -> key columns + per-row values (index preserved)
+        :param carry: raw rows -> rows to prepend to the next batch (their values are dropped)
+        :param params: anything row_values depends on; a change discards the state
+        :param chunksize: rows parsed and summarized at a time
+        """
+        self.name = name
+        self.schema = schema
+        self.columns = columns
+        self.keys = list(keys)
+        self.row_values = row_values
+        self.carry = carry
+        self.params = tuple(params)
+        self.chunksize = chunksize
+
+    def refresh(self, source, persist: bool = True) -> Optional[pd.DataFrame]:
+        """Bring every file's state up to date and return the merged summary (source order)."""
+        merged = None
+        for path in resolve_sources(source):
+            merged = combine(merged, self._refresh_file(path, persist).summary)
+        return merged
+
+    def _refresh_file(self, path: str, persist: bool) -> FileState:
+        state = _load_state(path, self.name, self.params) if persist else FileState(params=self.params)
+        chunks, offset = iter_appended(path, self.schema, state.offset, self.columns, self.chunksize)
+        if offset == state.offset:
+            return state
+
+        for new_rows in chunks:
+            self._consume(state, new_rows)
+        state.offset = offset
+        state.fingerprint = _fingerprint(path, offset)
+
+        if persist:
+            _save_state(path, self.name, state)
+        return state
+
+    def _consume(self, state: FileState, new_rows: pd.DataFrame) -> None:
+        frame = new_rows
+        n_carry = 0
+        if state.carry is not None and len(state.carry):
+            n_carry = len(state.carry)
+            frame = pd.concat([state.carry, new_rows], ignore_index=True)
+
+        values = self.row_values(frame)
+        values = values[values.index >= n_carry]
+        state.summary = combine(state.summary, summarize(values, self.keys))
+        if self.carry is not None:
+            state.carry = self.carry(frame).reset_index(drop=True)
+        state.rows += len(new_rows)
+
+
+def key_order(summary: Optional[pd.DataFrame], level: str = "llm") -> List:
+    """Distinct values of one key level in first-appearance order."""
+    if summary is None:
+        return []
+    return list(summary.index.get_level_values(level).unique())
@@ -0,0 +1,393 @@
+"""
+Shared, schema-aware loader for the result CSVs written by the games.
+
+Every result file kind has a declared schema (column dtypes, the model column and
+the columns a row cannot be used without). Files are parsed with pandas' C parser
+and the cleaned frame is cached column by column in a NumPy .npz under `.cache/`
+next to the CSV (text columns as one UTF-8 buffer plus offsets, so nothing is
+pickled); the cache is reused as long as the CSV's size and mtime are unchanged.
+"""
+import csv
+import io
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from helper.data.partitions import resolve_sources
+
+CACHE_DIR = ".cache"
+
+# rows per frame when a result file is streamed in chunks
+CHUNK_ROWS = 100_000
+
+
+@dataclass(frozen=True)
+class ResultSchema:
+    name: str
+    model_col: str
+    dtypes: Dict[str, str]
+    # rows missing any of these are dropped (malformed or repeated header lines)
+    required: Tuple[str, ...] = ()
+    # legacy / alternative column names -> canonical name
+    aliases: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def numeric(self) -> List[str]:
+        return [c for c, t in self.dtypes.items() if t != "str"]
+
+
+SCHEMAS: Dict[str, ResultSchema] = {
+    "atomic_congestion": ResultSchema(
+        name="atomic_congestion",
+        model_col="llm",
+        dtypes={
+            "round": "int64", "llm": "str", "llm_choice": "str", "opponent_choice": "str",
+            "reasoning": "str", "travel_time": "float64", "cumulative_time": "float64",
+        },
+        required=("llm", "round", "travel_time", "cumulative_time"),
+    ),
+    "cost_sharing_game": ResultSchema(
+        name="cost_sharing_game",
+        model_col="llm_name",
+        dtypes={
+            "llm_name": "str", "option_chosen": "float64", "response": "str", "scenario_type": "str",
+            "team_size": "float64", "team_relationship": "str", "individual_payout": "float64",
+            "team_payout": "float64", "individual_time": "str", "team_time": "str", "prompt": "str",
+        },
+        required=("llm_name", "individual_payout", "team_payout"),
+    ),
+    "dictator_game": ResultSchema(
+        name="dictator_game",
+        model_col="llm_name",
+        dtypes={
+            "llm_name": "str", "response": "str", "scenario_type": "str", "endowment": "float64",
+            "num_recipients": "float64", "work_contribution": "str", "project_context": "str",
+            "team_relationship": "str", "prompt": "str", "keep": "float64", "donate": "float64",
+        },
+        required=("llm_name",),
+    ),
+    "gen_coalition": ResultSchema(
+        name="gen_coalition",
+        model_col="llm_name",
+        dtypes={
+            "llm_name": "str", "prompt": "str", "llm_value": "float64", "llm_reasoning": "str",
+            "llm_allocation_C1": "float64", "llm_allocation_C2": "float64", "M": "float64",
+            "own_gain_C1": "float64", "own_gain_C2": "float64",
+            "friends_gain_C1": "float64", "friends_gain_C2": "float64",
+            "SF_distance": "float64", "EQ_distance": "float64", "AL_distance": "float64",
+        },
+        required=("llm_name", "llm_allocation_C1", "llm_allocation_C2"),
+    ),
+    # GenCoalitionScenario with any other list of coalitions: vectors stored as "a:b:c"
+    "gen_coalition_multi": ResultSchema(
+        name="gen_coalition_multi",
+        model_col="llm_name",
+        dtypes={
+            "llm_name": "str", "prompt": "str", "llm_value": "str", "llm_reasoning": "str",
+            "coalitions": "str", "llm_allocation": "str", "M": "float64",
+            "own_gain": "str", "friends_gain": "str",
+            "SF_distance": "float64", "EQ_distance": "float64", "AL_distance": "float64",
+        },
+        required=("llm_name", "llm_allocation"),
+    ),
+    "hedonic_game": ResultSchema(
+        name="hedonic_game",
+        model_col="llm_name",
+        dtypes={
+            "llm_name": "str", "agent": "str", "prompt": "str", "llm_value": "float64",
+            "llm_reasoning": "str", "parsed_action": "str", "selfish_action": "str",
+            "u_selfish": "float64", "u_chosen": "float64", "friends_benefit_sum": "float64",
+            "friends_harm_sum": "float64", "ALTRUISM_SCORE": "float64",
+        },
+        required=("llm_name", "ALTRUISM_SCORE"),
+    ),
+    "non_atomic": ResultSchema(
+        name="non_atomic",
+        model_col="llm",
+        dtypes={
+            "round": "int64", "llm": "str", "consumption": "float64", "reasoning": "str",
+            "fish_num": "float64", "fishermen_num": "float64",
+        },
+        required=("llm", "round", "consumption", "fish_num", "fishermen_num"),
+    ),
+    "prisoner_dilemma": ResultSchema(
+        name="prisoner_dilemma",
+        model_col="llm",
+        dtypes={
+            "round": "int64", "llm": "str", "llm_choice": "str", "opponent_choice": "str",
+            "reasoning": "str", "points_after_round": "float64",
+            # per-row payoffs (absent in files written before they were recorded)
+            "T": "float64", "R": "float64", "P": "float64", "S": "float64",
+        },
+        required=("llm", "round", "llm_choice", "opponent_choice"),
+        # the game itself writes llm_move / opponent_move
+        aliases={"llm_move": "llm_choice", "opponent_move": "opponent_choice"},
+    ),
+    "social_context": ResultSchema(
+        name="social_context",
+        model_col="llm",
+        dtypes={
+            "round": "int64", "llm": "str", "proposed_rank": "int64", "reasoning": "str",
+            "final_rank": "float64", "points_after_round": "float64",
+        },
+        required=("llm", "round", "proposed_rank", "points_after_round"),
+    ),
+}
+
+
+def load_results(source, schema: str, columns: Optional[Iterable[str]] = None,
+                 use_cache: bool = True) -> pd.DataFrame:
+    """
+    :param source: path to a result CSV, or a list of partition paths
+    :param schema: key into SCHEMAS
+    :param columns: only load these (canonical) columns; None loads the whole schema
+    :param use_cache: reuse / write the binary cache next to each CSV
+    """
+    spec = SCHEMAS[schema]
+    columns = list(columns) if columns is not None else None
+    frames = [_load_file(path, spec, columns, use_cache) for path in resolve_sources(source)]
+    if not frames:
+        return _empty_frame(spec, columns)
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+
+def clear_cache(source) -> None:
+    for path in resolve_sources(source):
+        cache_dir = os.path.join(os.path.dirname(path) or ".", CACHE_DIR)
+        prefix = os.path.basename(path) + "."
+        if not os.path.isdir(cache_dir):
+            continue
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix):
+                os.remove(os.path.join(cache_dir, name))
+
+
+def read_appended(path: str, schema: str, offset: int = 0,
+                  columns: Optional[Iterable[str]] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    Parse the rows of `path` that start at byte `offset` (0 = first row after the header).
+
+    Returns the rows and the offset just past the last complete line, so a row that
+    is still being written is left for the next call. No cache is involved.
+    """
+    chunks, end = iter_appended(path, schema, offset, columns, chunksize=None)
+    frames = list(chunks)
+    if not frames:
+        return _empty_frame(SCHEMAS[schema], list(columns) if columns is not None else None), end
+    return frames[0], end
+
+
+def iter_appended(path: str, schema: str, offset: int = 0, columns: Optional[Iterable[str]] = None,
+                  chunksize: Optional[int] = CHUNK_ROWS) -> Tuple[Iterator[pd.DataFrame], int]:
+    """
+    Like read_appended, but yields the rows in frames of at most `chunksize` rows
+    (None = a single frame), so memory stays bounded however large the file is.
+
+    Returns the chunk iterator and the end offset it will have consumed.
+    """
+    spec = SCHEMAS[schema]
+    columns = list(columns) if columns is not None else None
+    with open(path, "rb") as f:
+        header_line = f.readline()
+        start = max(offset, len(header_line))
+        end = _last_line_end(f, start)
+    return _iter_window(path, header_line, start, end, spec, columns, chunksize), end
+
+
+# -------------------
+# Internals
+# -------------------
+def _cache_path(path: str, spec: ResultSchema, columns: Optional[List[str]]) -> str:
+    suffix = spec.name if columns is None else spec.name + "-" + "-".join(sorted(columns))
+    return os.path.join(os.path.dirname(path) or ".", CACHE_DIR, f"{os.path.basename(path)}.{suffix}.npz")
+
+
+def _load_file(path: str, spec: ResultSchema, columns: Optional[List[str]], use_cache: bool) -> pd.DataFrame:
+    stat = os.stat(path)
+    key = [stat.st_size, stat.st_mtime_ns]
+    cache = _cache_path(path, spec, columns)
+
+    if use_cache and os.path.exists(cache):
+        try:
+            df = _read_cache(cache, key)
+            if df is not None:
+                return df
+        except Exception:
+            pass  # unreadable cache, rebuild it below
+
+    df = _parse(path, spec, columns)
+
+    if use_cache:
+        _write_cache(cache, key, df)
+    return df
+
+
+def _write_cache(cache: str, key: List[int], df: pd.DataFrame) -> None:
+    """
+    One array per column: numbers as they are, text as the UTF-8 bytes of all values
+    joined, with each value's end offset (in bytes) and a missing-value mask.
+    Frames with columns of any other kind are not cached.
+    """
+    arrays = {
+        "key": np.array(key, dtype="int64"),
+        "columns": np.array(list(df.columns), dtype=str),
+        "dtypes": np.array([str(t) for t in df.dtypes], dtype=str),
+    }
+    for i, c in enumerate(df.columns):
+        values = df[c]
+        if values.dtype.kind in "biuf":
+            arrays[f"values_{i}"] = values.to_numpy()
+        elif pd.api.types.is_string_dtype(values.dtype):
+            missing = values.isna().to_numpy()
+            text = values.where(~missing, "").tolist()
+            if not all(isinstance(v, str) for v in text):
+                return  # an object column holding more than text
+            encoded = [v.encode("utf-8") for v in text]
+            arrays[f"values_{i}"] = np.frombuffer(b"".join(encoded), dtype="uint8")
+            arrays[f"ends_{i}"] = np.cumsum([len(v) for v in encoded], dtype="int64")
+            arrays[f"missing_{i}"] = missing
+        else:
+            return
+
+    os.makedirs(os.path.dirname(cache), exist_ok=True)
+    tmp = cache + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, cache)
+
+
+def _read_cache(cache: str, key: List[int]) -> Optional[pd.DataFrame]:
+    """The frame _write_cache stored, or None when it was written for another version of the CSV."""
+    with np.load(cache, allow_pickle=False) as z:
+        if z["key"].tolist() != key:
+            return None
+        data = {}
+        for i, (c, dtype) in enumerate(zip(z["columns"].tolist(), z["dtypes"].tolist())):
+            if f"ends_{i}" not in z:
+                data[c] = pd.Series(z[f"values_{i}"], dtype=dtype)
+                continue
+            text = z[f"values_{i}"].tobytes()
+            ends = z[f"ends_{i}"].tolist()
+            values = [text[a:b].decode("utf-8") for a, b in zip([0] + ends[:-1], ends)]
+            data[c] = pd.Series(values, dtype=object).mask(z[f"missing_{i}"]).astype(dtype)
+    return pd.DataFrame(data, columns=list(data))
+
+
+def _parse(path: str, spec: ResultSchema, columns: Optional[List[str]]) -> pd.DataFrame:
+    header = pd.read_csv(path, nrows=0).columns
+    return _read_frame(path, header, spec, columns)
+
+
+def _read_frame(buffer, header, spec: ResultSchema, columns: Optional[List[str]]) -> pd.DataFrame:
+    renames, usecols, dtypes = _plan(header, spec, columns)
+    try:
+        df = pd.read_csv(buffer, usecols=usecols, dtype=dtypes, on_bad_lines="skip")
+    except (ValueError, TypeError):
+        # malformed numbers (or repeated header lines): read as text and coerce
+        if hasattr(buffer, "seek"):
+            buffer.seek(0)
+        df = pd.read_csv(buffer, usecols=usecols, dtype=str, on_bad_lines="skip")
+        for c, t in dtypes.items():
+            if t != "str":
+                df[c] = pd.to_numeric(df[c], errors="coerce")
+    return _clean(df, spec, renames)
+
+
+def _plan(header, spec: ResultSchema, columns: Optional[List[str]]):
+    """Column renames, the file columns to read and their dtypes."""
+    renames = {c: spec.aliases[c] for c in header if c in spec.aliases and spec.aliases[c] not in header}
+    wanted = set(columns) if columns is not None else set(spec.dtypes)
+    wanted.add(spec.model_col)
+    usecols = [c for c in header if renames.get(c, c) in wanted]
+    dtypes = {c: spec.dtypes[renames.get(c, c)] for c in usecols if renames.get(c, c) in spec.dtypes}
+    return renames, usecols, dtypes
+
+
+def _clean(df: pd.DataFrame, spec: ResultSchema, renames: Dict[str, str]) -> pd.DataFrame:
+    df = df.rename(columns=renames)
+
+    model_col = spec.model_col
+    df[model_col] = df[model_col].str.strip()
+    df = df[df[model_col] != model_col]
+    df = df.dropna(subset=[c for c in spec.required if c in df.columns])
+
+    for c in df.columns:
+        if spec.dtypes.get(c) == "int64" and df[c].dtype != "int64" and not df[c].isna().any():
+            df[c] = df[c].astype("int64")
+    return df.reset_index(drop=True)
+
+
+def _last_line_end(f, start: int, block: int = 1 << 16) -> int:
+    """Offset just past the last newline at or after `start` (start itself if there is none)."""
+    pos = f.seek(0, os.SEEK_END)
+    while pos > start:
+        size = min(block, pos - start)
+        f.seek(pos - size)
+        i = f.read(size).rfind(b"\n")
+        if i >= 0:
+            return pos - size + i + 1
+        pos -= size
+    return start
+
+
+class _Window(io.RawIOBase):
+    """Read-only stream of `prefix` followed by bytes [start, end) of a file."""
+
+    def __init__(self, f, prefix: bytes, start: int, end: int):
+        self.f = f
+        self.f.seek(start)
+        self.prefix = prefix
+        self.remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self.prefix:
+            data, self.prefix = self.prefix[:len(b)], self.prefix[len(b):]
+        else:
+            data = self.f.read(min(len(b), self.remaining))
+            self.remaining -= len(data)
+        b[:len(data)] = data
+        return len(data)
+
+
+def _iter_window(path: str, header_line: bytes, start: int, end: int, spec: ResultSchema,
+                 columns: Optional[List[str]], chunksize: Optional[int]) -> Iterator[pd.DataFrame]:
+    """
+    Rows in [start, end), parsed behind the file's own header line so the parser
+    sizes rows by the header (a short first row is then just skipped or padded).
+    """
+    if end <= start:
+        return
+    header = next(csv.reader([header_line.decode("utf-8")]), [])
+    if chunksize is None:
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        yield _read_frame(io.BytesIO(header_line + data), header, spec, columns)
+        return
+
+    renames, usecols, dtypes = _plan(header, spec, columns)
+    # a chunk cannot be re-read with a fallback dtype, so let the parser infer
+    # and coerce the numeric columns afterwards (bad values become NaN)
+    text = {c: "str" for c, t in dtypes.items() if t == "str"}
+    with open(path, "rb") as f:
+        stream = io.BufferedReader(_Window(f, header_line, start, end))
+        reader = pd.read_csv(stream, usecols=usecols, dtype=text, on_bad_lines="skip", chunksize=chunksize)
+        for df in reader:
+            for c, t in dtypes.items():
+                if t != "str":
+                    df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+            yield _clean(df, spec, renames)
+
+
+def _empty_frame(spec: ResultSchema, columns: Optional[List[str]]) -> pd.DataFrame:
+    cols = columns if columns is not None else list(spec.dtypes)
+    return pd.DataFrame({c: pd.Series(dtype="float64" if spec.dtypes.get(c, "str") != "str" else object)
+                         for c in cols})
@@ -0,0 +1,137 @@
+"""
+Single-pass metrics engine across all games.
+
+Every game registers its indexer (a helper.data.base_indexer.BaseIndexer) with
+the parameters it runs with and its legacy flat CSV. A game's built-in measures
+are what its indexer derives from the per-model means of its row values
+(measure_rows / from_means); further measures are declared with
+register_measure, optionally with row values of their own.
+
+compute_metrics loads each game's source once, reuses the per-model means its
+indexer took of the built-in row values (only registered row values of their
+own are averaged on top) and returns a tidy (model, game, measure, value)
+frame, so a new measure adds a column to that pass rather than another scan of
+the results.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from helper.data.atomic_congestion_indexer import AtomicCongestionIndexer
+from helper.data.base_indexer import BaseIndexer
+from helper.data.cost_sharing_indexer import CostSharingSchedulerIndexer
+from helper.data.dictator_indexer import DictatorGameIndexer
+from helper.data.gen_coalition_indexer import GenCoalitionIndexer
+from helper.data.hedonic_indexer import HedonicGameIndexer
+from helper.data.non_atomic_indexer import NonAtomicIndexer
+from helper.data.partitions import has_catalog, resolve_sources, select_partitions
+from helper.data.prisonner_dilemma import PrisonersDilemmaIndexer
+from helper.data.social_context_indexer import SocialContextIndexer
+
+TIDY_COLUMNS = ["model", "game", "measure", "value"]
+
+# rows (measure_rows frame), indexer -> one value per row
+RowValue = Callable[[pd.DataFrame, BaseIndexer], pd.Series]
+# {row value: per-model means} -> per-model measure
+Derive = Callable[[Dict[str, np.ndarray]], np.ndarray]
+
+
+@dataclass
+class Game:
+    indexer: type
+    flat_csv: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    row_values: Dict[str, RowValue] = field(default_factory=dict)
+    measures: Dict[str, Derive] = field(default_factory=dict)
+
+
+GAMES: Dict[str, Game] = {}
+
+
+def register_game(indexer: type, flat_csv: str, **params) -> None:
+    GAMES[indexer.GAME] = Game(indexer, flat_csv, params)
+
+
+def register_measure(game: str, name: str, derive: Derive,
+                     rows: Optional[Dict[str, RowValue]] = None) -> None:
+    """
+    :param game: registered game, e.g. "prisoner_dilemma"
+    :param name: measure name in the tidy frame
+    :param derive: per-model means of the game's row values -> per-model values
+    :param rows: extra row values the measure needs, computed next to the built-in ones
+    """
+    spec = GAMES[game]
+    spec.row_values.update(rows or {})
+    spec.measures[name] = derive
+
+
+# -------------------
+# Registry
+# -------------------
+register_game(NonAtomicIndexer, "data/non_atomic_results.csv")
+register_game(SocialContextIndexer, "data/social_context_results.csv", max_points=8, alpha=0.5)
+register_game(DictatorGameIndexer, "data/dictator_game_results.csv")
+register_game(AtomicCongestionIndexer, "data/atomic_congestion_all.csv", alpha_sw=0.5, alpha_fs=0.3, beta_fs=0.2)
+register_game(CostSharingSchedulerIndexer, "data/cost_sharing_game_results.csv")
+register_game(PrisonersDilemmaIndexer, "data/prisoner_dilemma.csv", T=5, R=3, P=1, S=0)
+register_game(HedonicGameIndexer, "data/hedonic_game_results.csv")
+register_game(GenCoalitionIndexer, "data/gen_coalition_results.csv")
+
+
+def default_source(game: str, runs=None):
+    """Partitions of `game` when the partitioned layout exists, else the legacy flat CSV."""
+    if has_catalog(game):
+        return select_partitions(game, runs=runs)
+    return GAMES[game].flat_csv
+
+
+# -------------------
+# Engine
+# -------------------
+def game_metrics(game: str, source=None, **params) -> pd.DataFrame:
+    """Tidy frame of every registered measure of one game; `params` override the registered ones."""
+    spec = GAMES[game]
+    indexer = spec.indexer(default_source(game) if source is None else source, **{**spec.params, **params})
+
+    # the built-in row values were averaged when the indexer derived its altruism
+    means = indexer.means
+    if spec.row_values:
+        rows = indexer.measure_rows()
+        for name, values in spec.row_values.items():
+            rows[name] = values(rows, indexer)
+        means = pd.concat([means, indexer.row_means(rows[["llm", *spec.row_values]])], axis=1)
+
+    columns = {c: means[c].to_numpy(dtype="float64") for c in means.columns}
+    measures = dict(indexer.from_means(columns))
+    for name, derive in spec.measures.items():
+        measures[name] = derive(columns)
+
+    return pd.DataFrame({
+        "model": np.tile(means.index.to_numpy(dtype=object), len(measures)),
+        "game": game,
+        "measure": np.repeat(list(measures), len(means)),
+        "value": np.concatenate([np.broadcast_to(np.asarray(v, dtype="float64"), len(means))
+                                 for v in measures.values()]) if measures else [],
+    }, columns=TIDY_COLUMNS)
+
+
+def compute_metrics(sources: Optional[Dict[str, Any]] = None,
+                    games: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    :param sources: {game: CSV path or partition list}; missing games use default_source
+    :param games: games to include (default: every registered game with a source)
+    :return: tidy (model, game, measure, value) frame
+    """
+    sources = sources or {}
+    frames = []
+    for game in (games if games is not None else GAMES):
+        source = sources.get(game, default_source(game))
+        if games is None and not any(os.path.exists(p) for p in resolve_sources(source)):
+            continue
+        frames.append(game_metrics(game, source))
+    if not frames:
+        return pd.DataFrame(columns=TIDY_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
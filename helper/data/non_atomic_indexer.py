@@ -1,70 +1,122 @@
 import pandas as pd
-from collections import defaultdict
+from helper.data.base_indexer import BaseIndexer
+from helper.data.loader import load_results
+from helper.data.incremental import IncrementalIndex, key_order
 
-class NonAtomicIndexer:
-    def __init__(self, csv_file):
+class NonAtomicIndexer(BaseIndexer):
+    GAME = "non_atomic"
+
+    def __init__(self, csv_file, incremental=False, streaming=False):
+        """
+        :param csv_file: path to CSV (or a list of partition paths)
+        :param incremental: keep running per-(LLM, round) aggregates next to each file and
+                            only read the rows appended since the last refresh (self.df stays None
+                            until frame() loads it)
+        :param streaming: compute the same aggregates in bounded memory, one chunk of
+                          numeric columns at a time, without persisting them
+        """
         self.csv_file = csv_file
         self.df = None
-        self.llm_to_index = {}
-        self.index_to_llm = {}
+        self._index_models([])
         self.altruism = {}
-        self._load_data()
+        if incremental or streaming:
+            self._build_from_summary(persist=incremental)
+            return
+        self.frame()
         self._build_index()
-        self._derive_altruism()
-
-    def _load_data(self):
-        """Load CSV into pandas, clean data types, and drop invalid rows."""
-        self.df = pd.read_csv(
-            self.csv_file,
-            engine="python",
-            quoting=1,
-            on_bad_lines="skip"
+        self._set_altruism(self.row_means(self.measure_rows()))
+
+    def _load_frame(self):
+        """Load the typed result frame; the loader strips names and drops invalid rows."""
+        return load_results(
+            self.csv_file, self.GAME,
+            columns=["round", "llm", "consumption", "fish_num", "fishermen_num"]
         )
-        # Drop rows without LLM or round info
-        self.df = self.df.dropna(subset=["llm", "round"])
-        # Strip whitespace from strings
-        self.df["llm"] = self.df["llm"].str.strip()
-        # Convert numeric fields safely
-        numeric_cols = ["round", "consumption", "fish_num", "fishermen_num"]
-        for col in numeric_cols:
-            self.df[col] = pd.to_numeric(self.df[col], errors="coerce")
-        self.df = self.df.dropna(subset=numeric_cols)
 
     def _build_index(self):
         """Build mappings between LLM names and indices."""
-        unique_llms = self.df["llm"].unique()
-        self.llm_to_index = {llm: i for i, llm in enumerate(unique_llms)}
-        self.index_to_llm = {i: llm for llm, i in self.llm_to_index.items()}
-
-    def _derive_altruism(self):
-        """Compute average altruism measures for each LLM across all rounds."""
-        df = self.df.copy()
-        altruism_data = defaultdict(lambda: defaultdict(list))
-
-        # Compute per-round measures
-        for round_num, group in df.groupby("round"):
-            Xmax = group["consumption"].max()
-            impacts = group["consumption"] / group["fish_num"]
-            max_impact = impacts.max()
-            selfish_payoff = group.iloc[0]["fish_num"] / group.iloc[0]["fishermen_num"]
-
-            for idx, row in group.iterrows():
-                llm = row["llm"]
-                Xi = row["consumption"]
-                # Measures
-                rel_harvest = (Xi / Xmax)
-                marginal_impact = 1 - (impacts[idx] / max_impact)
-                deviation = (selfish_payoff - Xi) / selfish_payoff
-
-                altruism_data[llm]["relative_harvest_altruism"].append(rel_harvest)
-                altruism_data[llm]["marginal_impact_resource"].append(marginal_impact)
-                altruism_data[llm]["deviation_from_selfish_nash"].append(deviation)
-
-        # Compute average per LLM
-        self.altruism = {
-            llm: {measure: sum(values)/len(values) for measure, values in measures.items()}
-            for llm, measures in altruism_data.items()
-        }
+        self._index_models(self.df["llm"])
+
+    MEASURES = ["relative_harvest_altruism", "marginal_impact_resource", "deviation_from_selfish_nash"]
+
+    def round_measures(self, df, by=("round",)):
+        """
+        Per-row measures, vectorized over every round:
+          relative_harvest_altruism   = X_i / max_j X_j
+          marginal_impact_resource    = 1 - (X_i / fish) / max_j (X_j / fish)
+          deviation_from_selfish_nash = (fish / fishermen - X_i) / (fish / fishermen)
+        where the selfish payoff uses the first row of each round.
+
+        Rows come back ordered by round (stable), i.e. in the order the old
+        groupby/iterrows loop visited them.
+
+        :param by: columns identifying one game round; ("trajectory", "round") keeps
+                   repeated games apart instead of pooling their rounds
+        """
+        by = list(by)
+        d = df.sort_values(by, kind="stable")
+        by_round = d.groupby(by, sort=False)
+
+        Xi = d["consumption"]
+        Xmax = by_round["consumption"].transform("max")
+        impacts = Xi / d["fish_num"]
+        max_impact = impacts.groupby([d[c] for c in by], sort=False).transform("max")
+        selfish_payoff = by_round["fish_num"].transform("first") / by_round["fishermen_num"].transform("first")
+
+        return pd.DataFrame({
+            **{col: d[col] for col in by},
+            "llm": d["llm"],
+            "relative_harvest_altruism": Xi / Xmax,
+            "marginal_impact_resource": 1 - (impacts / max_impact),
+            "deviation_from_selfish_nash": (selfish_payoff - Xi) / selfish_payoff,
+        })
+
+    def _build_from_summary(self, persist=True):
+        """
+        The per-round maxima and the round's selfish payoff are recovered from
+        per-(LLM, round) aggregates: sum_rows X_i / max_j X_j = (sum X over the
+        LLM's rows of that round) / (max over the round), and likewise for the
+        others. The selfish payoff is the first row of the round, i.e. the first
+        value of the round's earliest key (keys keep first-appearance order).
+        """
+        index = IncrementalIndex(
+            "non_atomic", "non_atomic",
+            columns=["round", "llm", "consumption", "fish_num", "fishermen_num"],
+            keys=["llm", "round"],
+            row_values=lambda raw: pd.DataFrame({
+                "llm": raw["llm"],
+                "round": raw["round"],
+                "consumption": raw["consumption"],
+                "impact": raw["consumption"] / raw["fish_num"],
+                "selfish": raw["fish_num"] / raw["fishermen_num"],
+            }),
+        )
+        self.summary = index.refresh(self.csv_file, persist=persist)
+        llms = key_order(self.summary)
+        self._index_models(llms)
+        if self.summary is None:
+            return
+
+        s = self.summary
+        by_round = s.groupby(level="round", sort=False)
+        X = s[("consumption", "sum")]
+        n = s[("consumption", "count")]
+        max_X = by_round[[("consumption", "max")]].transform("max").iloc[:, 0]
+        max_impact = by_round[[("impact", "max")]].transform("max").iloc[:, 0]
+        selfish = by_round[[("selfish", "first")]].transform("first").iloc[:, 0]
+
+        per_llm = pd.DataFrame({
+            "relative_harvest_altruism": X / max_X,
+            "marginal_impact_resource": n - s[("impact", "sum")] / max_impact,
+            "deviation_from_selfish_nash": n - X / selfish,
+            "n": n,
+        }).groupby(level="llm", sort=False).sum()
+
+        self._set_altruism(per_llm[self.MEASURES].div(per_llm["n"], axis=0))
+
+    def measure_rows(self):
+        """Per-row values behind each measure, for bootstrap CIs (helper.data.bootstrap)."""
+        return self.round_measures(self.frame())[["llm"] + self.MEASURES]
 
     # -------------------
     # Access methods now return averages
@@ -78,12 +130,3 @@ class NonAtomicIndexer:
 
     def deviation_from_selfish_nash(self, llm):
         return self.altruism[llm]["deviation_from_selfish_nash"]
-
-    def get_index(self, llm):
-        return self.llm_to_index.get(llm, None)
-
-    def get_llm(self, index):
-        return self.index_to_llm.get(index, None)
-
-    def all_indices(self):
-        return self.llm_to_index
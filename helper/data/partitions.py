@@ -0,0 +1,384 @@
+"""
+Partitioned layout for game results.
+
+Instead of appending every run to one flat CSV per game, results are split as
+
+    data/<game>/run=<run_id>/model=<model>/part-<N>.csv
+
+and every game directory keeps a small `_catalog.csv` listing its part files.
+Indexers can then read only the runs / models they need, and old runs can be
+compacted or archived without touching the parts that are still being written.
+"""
+import argparse
+import csv
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+from urllib.parse import quote, unquote
+
+DATA_ROOT = "data"
+CATALOG_FILE = "_catalog.csv"
+ARCHIVE_DIR = "_archive"
+CATALOG_FIELDS = ["run_id", "model", "part", "path", "rows", "bytes", "status"]
+
+# roll over to a new part file once the current one gets this large
+MAX_PART_BYTES = 64 * 1024 * 1024
+
+_catalog_lock = threading.Lock()
+
+
+def new_run_id() -> str:
+    """Timestamp based run id, e.g. 20250920T010551."""
+    return datetime.now().strftime("%Y%m%dT%H%M%S")
+
+
+def model_dir_name(model: str) -> str:
+    """Model names contain '/' and ':' so they are percent-encoded on disk."""
+    return "model=" + quote(model.strip(), safe="-_.")
+
+
+def model_from_dir_name(name: str) -> str:
+    return unquote(name[len("model="):])
+
+
+def game_dir(game: str, root: str = DATA_ROOT) -> str:
+    return os.path.join(root, game)
+
+
+def partition_dir(game: str, run_id: str, model: str, root: str = DATA_ROOT) -> str:
+    return os.path.join(game_dir(game, root), f"run={run_id}", model_dir_name(model))
+
+
+def resolve_sources(source: Union[str, os.PathLike, Iterable]) -> List[str]:
+    """Accept either a single CSV path or a list of partition paths."""
+    if isinstance(source, (str, os.PathLike)):
+        return [os.fspath(source)]
+    return [os.fspath(p) for p in source]
+
+
+# -------------------
+# Catalog
+# -------------------
+def catalog_path(game: str, root: str = DATA_ROOT) -> str:
+    return os.path.join(game_dir(game, root), CATALOG_FILE)
+
+
+def has_catalog(game: str, root: str = DATA_ROOT) -> bool:
+    return os.path.exists(catalog_path(game, root))
+
+
+def read_catalog(game: str, root: str = DATA_ROOT) -> List[Dict]:
+    path = catalog_path(game, root)
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        entries = list(csv.DictReader(f))
+    for e in entries:
+        e["part"] = int(e["part"])
+        e["rows"] = int(e["rows"])
+        e["bytes"] = int(e["bytes"])
+    return entries
+
+
+def write_catalog(game: str, entries: Sequence[Dict], root: str = DATA_ROOT) -> None:
+    """Rewrite the catalog atomically (it is small, one line per part file)."""
+    path = catalog_path(game, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    entries = sorted(entries, key=lambda e: (e["run_id"], e["model"], e["part"]))
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CATALOG_FIELDS)
+        writer.writeheader()
+        for e in entries:
+            writer.writerow({k: e[k] for k in CATALOG_FIELDS})
+    os.replace(tmp, path)
+
+
+def _update_catalog(game: str, updates: Sequence[Dict], root: str = DATA_ROOT) -> None:
+    with _catalog_lock:
+        entries = {e["path"]: e for e in read_catalog(game, root)}
+        for u in updates:
+            entries[u["path"]] = {**entries.get(u["path"], {}), **u}
+        write_catalog(game, list(entries.values()), root)
+
+
+def rebuild_catalog(game: str, root: str = DATA_ROOT) -> List[Dict]:
+    """Recreate the catalog by scanning the directory tree (archived runs included)."""
+    entries = []
+    base = game_dir(game, root)
+    for parent, status in ((base, "hot"), (os.path.join(base, ARCHIVE_DIR), "archived")):
+        if not os.path.isdir(parent):
+            continue
+        for run_name in sorted(os.listdir(parent)):
+            if not run_name.startswith("run="):
+                continue
+            run_path = os.path.join(parent, run_name)
+            for model_name in sorted(os.listdir(run_path)):
+                if not model_name.startswith("model="):
+                    continue
+                model_path = os.path.join(run_path, model_name)
+                for part_name in sorted(os.listdir(model_path)):
+                    if not (part_name.startswith("part-") and part_name.endswith(".csv")):
+                        continue
+                    path = os.path.join(model_path, part_name)
+                    entries.append({
+                        "run_id": run_name[len("run="):],
+                        "model": model_from_dir_name(model_name),
+                        "part": int(part_name[len("part-"):-len(".csv")]),
+                        "path": path,
+                        "rows": _count_rows(path),
+                        "bytes": os.path.getsize(path),
+                        "status": status,
+                    })
+    with _catalog_lock:
+        write_catalog(game, entries, root)
+    return entries
+
+
+def _count_rows(path: str) -> int:
+    with open(path, newline="", encoding="utf-8") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+# -------------------
+# Writing
+# -------------------
+class PartitionWriter:
+    """
+    Drop-in replacement for the csv writer used by the games: rows are routed to
+    the partition of the model named in `model_field`.
+
+    Rows may be lists (in `fieldnames` order) or dicts, so both `csv.writer` and
+    `csv.DictWriter` call sites work unchanged. Every part file has its own
+    header, so `writeheader()` is a no-op.
+    """
+
+    def __init__(self, game: str, fieldnames: Sequence[str], run_id: Optional[str] = None,
+                 model_field: str = "llm", root: str = DATA_ROOT,
+                 max_part_bytes: int = MAX_PART_BYTES) -> None:
+        self.game = game
+        self.fieldnames = list(fieldnames)
+        self.run_id = run_id or new_run_id()
+        self.model_field = model_field
+        self.root = root
+        self.max_part_bytes = max_part_bytes
+
+        self._open = {}   # model -> dict(file, writer, part, path, rows)
+        self._lock = threading.Lock()
+
+    def writeheader(self) -> None:
+        pass
+
+    def writerow(self, row) -> None:
+        if not isinstance(row, dict):
+            row = dict(zip(self.fieldnames, row))
+        model = str(row[self.model_field]).strip()
+
+        with self._lock:
+            part = self._open.get(model) or self._open_part(model)
+            part["writer"].writerow(row)
+            part["rows"] += 1
+            if part["file"].tell() >= self.max_part_bytes:
+                self._close_part(model)
+
+    def writerows(self, rows) -> None:
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self) -> None:
+        with self._lock:
+            for part in self._open.values():
+                part["file"].flush()
+
+    def close(self) -> None:
+        with self._lock:
+            for model in list(self._open):
+                self._close_part(model)
+
+    def _open_part(self, model: str) -> Dict:
+        directory = partition_dir(self.game, self.run_id, model, self.root)
+        os.makedirs(directory, exist_ok=True)
+
+        # keep appending to the newest part until it reaches the size limit
+        existing = sorted(
+            int(name[len("part-"):-len(".csv")])
+            for name in os.listdir(directory)
+            if name.startswith("part-") and name.endswith(".csv")
+        )
+        part_no = existing[-1] if existing else 0
+        path = os.path.join(directory, f"part-{part_no}.csv")
+        if os.path.exists(path) and os.path.getsize(path) >= self.max_part_bytes:
+            part_no += 1
+            path = os.path.join(directory, f"part-{part_no}.csv")
+
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        handle = open(path, "a", newline="", encoding="utf-8")
+        writer = csv.DictWriter(handle, fieldnames=self.fieldnames)
+        if is_new:
+            writer.writeheader()
+            handle.flush()
+
+        known = {e["path"]: e for e in read_catalog(self.game, self.root)}
+        part = {
+            "file": handle,
+            "writer": writer,
+            "part": part_no,
+            "path": path,
+            "rows": 0 if is_new else known.get(path, {}).get("rows", _count_rows(path)),
+        }
+        self._open[model] = part
+        self._register(model, part)
+        return part
+
+    def _close_part(self, model: str) -> None:
+        part = self._open.pop(model)
+        part["file"].close()
+        self._register(model, part)
+
+    def _register(self, model: str, part: Dict) -> None:
+        if not part["file"].closed:
+            part["file"].flush()
+        _update_catalog(self.game, [{
+            "run_id": self.run_id,
+            "model": model,
+            "part": part["part"],
+            "path": part["path"],
+            "rows": part["rows"],
+            "bytes": os.path.getsize(part["path"]),
+            "status": "hot",
+        }], self.root)
+
+
+# -------------------
+# Reading
+# -------------------
+def select_partitions(game: str, runs: Optional[Iterable[str]] = None,
+                      models: Optional[Iterable[str]] = None, root: str = DATA_ROOT,
+                      include_archived: bool = False) -> List[str]:
+    """Paths of the part files matching the requested runs / models, from the catalog."""
+    runs = set(runs) if runs is not None else None
+    models = set(m.strip() for m in models) if models is not None else None
+
+    paths = []
+    for e in read_catalog(game, root):
+        if e["status"] == "archived" and not include_archived:
+            continue
+        if runs is not None and e["run_id"] not in runs:
+            continue
+        if models is not None and e["model"] not in models:
+            continue
+        paths.append(e["path"])
+    return paths
+
+
+def list_runs(game: str, root: str = DATA_ROOT) -> List[str]:
+    return sorted({e["run_id"] for e in read_catalog(game, root)})
+
+
+# -------------------
+# Maintenance
+# -------------------
+def compact_run(game: str, run_id: str, root: str = DATA_ROOT) -> None:
+    """Merge every model's part files of a finished run into a single part-0.csv."""
+    entries = read_catalog(game, root)
+    by_model: Dict[str, List[Dict]] = {}
+    for e in entries:
+        if e["run_id"] == run_id and e["status"] != "archived":
+            by_model.setdefault(e["model"], []).append(e)
+
+    updates = []
+    removed = set()
+    for model, parts in by_model.items():
+        parts.sort(key=lambda e: e["part"])
+        if len(parts) == 1 and parts[0]["part"] == 0:
+            continue
+        directory = partition_dir(game, run_id, model, root)
+        target = os.path.join(directory, "part-0.csv")
+        tmp = target + ".tmp"
+        rows = 0
+        with open(tmp, "w", newline="", encoding="utf-8") as out:
+            for i, e in enumerate(parts):
+                with open(e["path"], newline="", encoding="utf-8") as f:
+                    header = f.readline()
+                    if i == 0:
+                        out.write(header)
+                    for line in f:
+                        out.write(line)
+                rows += e["rows"]
+        for e in parts:
+            os.remove(e["path"])
+            removed.add(e["path"])
+        os.replace(tmp, target)
+        updates.append({
+            "run_id": run_id, "model": model, "part": 0, "path": target,
+            "rows": rows, "bytes": os.path.getsize(target), "status": "compacted",
+        })
+
+    with _catalog_lock:
+        kept = [e for e in read_catalog(game, root) if e["path"] not in removed]
+        write_catalog(game, kept + updates, root)
+
+
+def archive_run(game: str, run_id: str, root: str = DATA_ROOT) -> None:
+    """Move a run under data/<game>/_archive so default reads skip it."""
+    source = os.path.join(game_dir(game, root), f"run={run_id}")
+    target = os.path.join(game_dir(game, root), ARCHIVE_DIR, f"run={run_id}")
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+
+    with _catalog_lock:
+        entries = read_catalog(game, root)
+        for e in entries:
+            if e["run_id"] == run_id:
+                e["path"] = e["path"].replace(source, target, 1)
+                e["status"] = "archived"
+        write_catalog(game, entries, root)
+
+
+def ingest_csv(csv_file: str, game: str, run_id: str, model_field: str = "llm",
+               root: str = DATA_ROOT) -> None:
+    """Split a legacy flat result file into the partitioned layout as one run."""
+    with open(csv_file, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        writer = PartitionWriter(game, reader.fieldnames, run_id=run_id,
+                                 model_field=model_field, root=root)
+        for row in reader:
+            # appended files sometimes repeat the header line
+            if row.get(model_field) in (None, model_field):
+                continue
+            writer.writerow(row)
+        writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage partitioned game results.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="split a flat CSV into partitions")
+    p.add_argument("csv_file")
+    p.add_argument("game")
+    p.add_argument("--run-id", default=None)
+    p.add_argument("--model-field", default="llm")
+
+    for name in ("compact", "archive"):
+        p = sub.add_parser(name)
+        p.add_argument("game")
+        p.add_argument("run_id")
+
+    p = sub.add_parser("catalog", help="print (or --rebuild) a game's catalog")
+    p.add_argument("game")
+    p.add_argument("--rebuild", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "ingest":
+        ingest_csv(args.csv_file, args.game, args.run_id or new_run_id(), args.model_field)
+    elif args.command == "compact":
+        compact_run(args.game, args.run_id)
+    elif args.command == "archive":
+        archive_run(args.game, args.run_id)
+    else:
+        entries = rebuild_catalog(args.game) if args.rebuild else read_catalog(args.game)
+        for e in entries:
+            print(f"{e['run_id']}\t{e['model']}\tpart-{e['part']}\t{e['rows']} rows\t{e['bytes']} B\t{e['status']}")
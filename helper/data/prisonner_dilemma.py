@@ -1,122 +1,143 @@
-import csv
-from collections import defaultdict
+import numpy as np
+import pandas as pd
 
-class PrisonersDilemmaIndexer:
-    def __init__(self, csv_file, T=5, R=3, P=1, S=0):
+from helper.data.base_indexer import BaseIndexer
+from helper.data.loader import load_results
+from helper.data.incremental import IncrementalIndex, key_order
+from helper.data.trajectory import assign_trajectories
+
+COLUMNS = ["round", "llm", "llm_choice", "opponent_choice", "T", "R", "P", "S"]
+
+
+class PrisonersDilemmaIndexer(BaseIndexer):
+    GAME = "prisoner_dilemma"
+
+    def __init__(self, csv_file, T=5, R=3, P=1, S=0, incremental=False, streaming=False):
         """
-        :param csv_file: path to CSV containing PD play data
-        :param T: Temptation payoff (defect vs cooperator)
-        :param R: Reward for mutual cooperation
-        :param P: Punishment for mutual defection
-        :param S: Sucker's payoff (cooperate vs defector)
-
-        Expected CSV format:
-        round,llm,llm_choice,opponent_choice,reasoning,travel_time,cumulative_time
+        :param csv_file: path to CSV containing PD play data (or a list of partition paths)
+        :param T: Temptation payoff, used for rows written without payoff columns
+        :param R: Reward for mutual cooperation (fallback, as above)
+        :param P: Punishment for mutual defection (fallback, as above)
+        :param S: Sucker's payoff (fallback, as above)
+        :param incremental: keep running per-LLM aggregates next to each file and only
+                            read the rows appended since the last refresh (self.df stays None
+                            until frame() loads it)
+        :param streaming: compute the same aggregates in bounded memory, one chunk of
+                          numeric columns at a time, without persisting them
+
+        Expected CSV format (llm_move/opponent_move are accepted as well):
+        round,llm,llm_choice,opponent_choice,reasoning,points_after_round,T,R,P,S
         """
         self.csv_file = csv_file
         self.T, self.R, self.P, self.S = T, R, P, S
 
-        self.llm_to_index = {}
-        self.index_to_llm = {}
-        self.data = []
+        self._index_models([])
+        self.df = None
 
         # final altruism index per LLM
         self.altruism = {}
 
+        if incremental or streaming:
+            self._build_from_summary(persist=incremental)
+            return
+
         self._build_index()
-        self._compute_altruism()
+        self._set_altruism(self.row_means(self.measure_rows()))
 
     def _build_index(self):
-        """Reads CSV and stores PD-relevant fields."""
-        with open(self.csv_file, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                llm = row['llm'].strip()
-                if llm not in self.llm_to_index:
-                    idx = len(self.llm_to_index)
-                    self.llm_to_index[llm] = idx
-                    self.index_to_llm[idx] = llm
-
-                try:
-                    row['round'] = int(row['round'])
-                    row['llm_choice'] = row['llm_choice'].strip().upper()
-                    row['opponent_choice'] = row['opponent_choice'].strip().upper()
-                    if row['llm_choice'] not in ['C', 'D'] or row['opponent_choice'] not in ['C', 'D']:
-                        continue
-                    self.data.append(row)
-                except ValueError:
-                    continue  # skip malformed rows
-
-    def _compute_altruism(self):
+        """Loads the typed result frame, numbers trajectories and keeps rows with valid C/D moves."""
+        # models are numbered before rows with invalid moves are dropped
+        df = load_results(self.csv_file, self.GAME, columns=COLUMNS)
+        self._index_models(df['llm'])
+        self.df = self._prepare(df).reset_index(drop=True)
+
+    def _load_frame(self):
+        return self._prepare(load_results(self.csv_file, self.GAME, columns=COLUMNS)).reset_index(drop=True)
+
+    def _prepare(self, df):
+        """Trajectory numbers, payoff columns and normalized moves; rows with invalid moves are dropped."""
+        df = df.copy()
+        # trajectories come from the raw round sequence, before invalid moves are dropped
+        df['trajectory'] = assign_trajectories(df)
+
+        # payoffs recorded per row; older files without them use the constructor values
+        for name, default in (("T", self.T), ("R", self.R), ("P", self.P), ("S", self.S)):
+            df[name] = df[name].fillna(default) if name in df.columns else float(default)
+
+        df['llm_choice'] = df['llm_choice'].str.strip().str.upper()
+        df['opponent_choice'] = df['opponent_choice'].str.strip().str.upper()
+        return df[self._valid(df)]
+
+    @staticmethod
+    def _valid(df):
+        return (df['llm_choice'].str.strip().str.upper().isin(['C', 'D'])
+                & df['opponent_choice'].str.strip().str.upper().isin(['C', 'D']))
+
+    def row_measures(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Per-row ingredients of the PD measures (df as built by _build_index):
+        cooperated, payoff sacrifice when cooperating (T-R against C, S-P against D),
+        mutual cooperation and whether it followed the LLM's own cooperation in the
+        same trajectory.
+        """
+        cooperated = df['llm_choice'].eq('C')
+        opp_cooperated = df['opponent_choice'].eq('C')
+        mutual = cooperated & opp_cooperated
+
+        # own previous move within the trajectory
+        prev = df.groupby(['llm', 'trajectory'], sort=False)['llm_choice'].shift()
+
+        sacrifice = np.where(opp_cooperated, df['T'] - df['R'], df['S'] - df['P'])
+        return pd.DataFrame({
+            "llm": df['llm'],
+            "cooperated": cooperated,
+            "sacrifice": pd.Series(sacrifice, index=df.index).where(cooperated),
+            "mutual": mutual,
+            "sustained": mutual & prev.eq('C'),
+        })
+
+    def _build_from_summary(self, persist=True):
+        """Per-LLM measures from running aggregates (persisted and refreshed when incremental)."""
+        def row_values(raw):
+            rows = self.row_measures(self._prepare(raw))
+            return rows[['llm', 'cooperated', 'sacrifice', 'mutual', 'sustained']].astype(
+                {'cooperated': float, 'mutual': float, 'sustained': float})
+
+        def carry(raw):
+            # each LLM's last row (trajectory boundary) and last valid move (previous move)
+            last = raw.groupby('llm', sort=False).tail(1).index
+            last_valid = raw[self._valid(raw)].groupby('llm', sort=False).tail(1).index
+            return raw[raw.index.isin(last.union(last_valid))]
+
+        index = IncrementalIndex(
+            "prisoner_dilemma", "prisoner_dilemma", columns=COLUMNS, keys=["llm"],
+            row_values=row_values, carry=carry, params=(self.T, self.R, self.P, self.S),
+        )
+        self.summary = index.refresh(self.csv_file, persist=persist)
+        llms = key_order(self.summary)
+        self._index_models(llms)
+        if self.summary is None:
+            return
+
+        self._set_altruism(self.summary.xs("mean", axis=1, level=1))
+
+    def measure_rows(self):
+        """Per-row values behind each measure, for bootstrap CIs (helper.data.bootstrap)."""
+        rows = self.row_measures(self.frame())
+        return rows[['llm', 'cooperated', 'sacrifice', 'mutual', 'sustained']].astype(
+            {'cooperated': float, 'mutual': float, 'sustained': float})
+
+    def from_means(self, means):
         """
-        Compute three PD-based altruism measures per LLM:
+        PD-based altruism measures from the means of the row values:
         1. Cooperation frequency above Nash (baseline 0 for one-shot PD)
-        2. Payoff-sacrifice ratio (T-R for cooperating vs defecting)
-        3. Mutual cooperation sustainability in repeated rounds
+        2. Payoff-sacrifice ratio (T-R for cooperating vs defecting), with each row's payoffs
+        3. Mutual cooperation sustainability within each repeated-game trajectory (sum/sum = mean/mean)
         """
-        rounds = defaultdict(list)
-        for r in self.data:
-            rounds[r['round']].append(r)
-
-        # temporary containers to collect per-round measures
-        cooperation_counts = defaultdict(int)
-        total_rounds = defaultdict(int)
-        payoff_sacrifices = defaultdict(list)
-        mutual_coop_counts = defaultdict(int)
-        coop_following_coop_counts = defaultdict(int)
-
-        # sort rounds in ascending order
-        sorted_rounds = sorted(rounds.items())
-
-        # track previous choice of opponents per LLM for mutual cooperation sustainability
-        previous_choice = defaultdict(lambda: None)
-
-        for rnd, round_data in sorted_rounds:
-            for r in round_data:
-                llm = r['llm']
-                choice = r['llm_choice']
-                opp_choice = r['opponent_choice']
-
-                total_rounds[llm] += 1
-                if choice == 'C':
-                    cooperation_counts[llm] += 1
-                    # payoff sacrifice relative to defecting against cooperator
-                    if opp_choice == 'C':
-                        payoff_sacrifices[llm].append(self.T - self.R)
-                    elif opp_choice == 'D':
-                        payoff_sacrifices[llm].append(self.S - self.P)  # negative or zero
-
-                # mutual cooperation tracking
-                if choice == 'C' and opp_choice == 'C':
-                    mutual_coop_counts[llm] += 1
-                    # check if this follows previous round where opponent cooperated
-                    if previous_choice[llm] == 'C':
-                        coop_following_coop_counts[llm] += 1
-
-                previous_choice[llm] = choice
-
-        for llm in self.llm_to_index:
-            coop_freq = cooperation_counts[llm] / total_rounds[llm] if total_rounds[llm] > 0 else None
-            avg_sacrifice = sum(payoff_sacrifices[llm])/len(payoff_sacrifices[llm]) if payoff_sacrifices[llm] else None
-            coop_sustain = coop_following_coop_counts[llm]/mutual_coop_counts[llm] if mutual_coop_counts[llm] > 0 else None
-
-            self.altruism[llm] = {
-                "cooperation_frequency": coop_freq,
-                "avg_payoff_sacrifice": avg_sacrifice,
-                "mutual_cooperation_sustainability": coop_sustain
-            }
-
-    # -------------------
-    # Access Methods
-    # -------------------
-    def get_index(self, llm):
-        return self.llm_to_index.get(llm)
-
-    def get_llm(self, index):
-        return self.index_to_llm.get(index)
-
-    def all_indices(self):
-        return self.llm_to_index
-
-    def get_altruism(self, llm):
-        return self.altruism.get(llm)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sustainability = np.where(means['mutual'] > 0, means['sustained'] / means['mutual'], np.nan)
+        return {
+            "cooperation_frequency": means['cooperated'],
+            "avg_payoff_sacrifice": means['sacrifice'],
+            "mutual_cooperation_sustainability": sustainability,
+        }
@@ -0,0 +1,262 @@
+"""
+Offline re-scoring of stored decisions.
+
+The derived columns of a hedonic or gen coalition result row (ALTRUISM_SCORE,
+utilities, friends' benefit/harm; SF/EQ/AL distances, also of the
+gen_coalition_multi rows of scenarios over other coalitions) depend only on the
+scenario config and the model's decision. After a change to the scoring code
+they can be refreshed without a single API call: every stored decision is
+joined back to its config row, each distinct (config row, decision) pair is
+scored once with the game's own scoring method (HedonicGame.score_action,
+GenCoalitionScenario.score_allocations) and the fields are merged back onto
+all rows at once.
+
+The result is written as a new version of the result set,
+
+    data/rescored/<version>/<game>/run=<run_id>/model=<model>/part-0.csv
+
+with each row keeping its original run id (rows of a flat CSV get the version
+as run id); the rows of a run's part files and of all flat files are gathered
+into one part per model. The original results are left untouched; point the
+indexers at select_partitions(game, root="data/rescored/<version>") to use the
+new scores.
+
+    python -m helper.data.rescore hedonic_game
+    python -m helper.data.rescore gen_coalition --source data/gen_coalition_results.csv --version v2
+    python -m helper.data.rescore gen_coalition_multi
+"""
+import argparse
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+import pandas as pd
+
+from helper.data.loader import SCHEMAS, load_results
+from helper.data.partitions import (DATA_ROOT, has_catalog, new_run_id, partition_dir, rebuild_catalog,
+                                    resolve_sources, select_partitions)
+from helper.game.configs import GameConfig, GenCoalitionConfig, HedonicConfig, load_configs
+from helper.game.gen_coalition import GenCoalitionScenario, joined_vector, parse_vector
+from helper.game.hedonic_game import HedonicGame
+
+RESCORED_ROOT = os.path.join(DATA_ROOT, "rescored")
+
+
+# -------------------
+# Joining decisions to config rows
+# -------------------
+def _normalized_prompt(prompt) -> pd.Series:
+    # the games store prompts with newlines and commas replaced by spaces
+    return pd.Series(prompt, dtype="object").str.replace("\n", " ").str.replace(",", " ").str.strip()
+
+
+def join_hedonic(df: pd.DataFrame, games: List[HedonicGame]) -> pd.Series:
+    """
+    Config row of every decision: the row whose rendered prompt matches the stored
+    one, else the config row of the agent when that agent appears in only one.
+    """
+    prompts = _normalized_prompt([g.make_prompt(g.agent) for g in games])
+    by_prompt = pd.Series(np.arange(len(games)), index=prompts)
+    by_prompt = by_prompt[~by_prompt.index.duplicated()]
+    config_id = _normalized_prompt(df["prompt"]).map(by_prompt)
+
+    agents = pd.Series([g.agent for g in games])
+    unique = agents[~agents.duplicated(keep=False)]
+    by_agent = pd.Series(unique.index, index=unique.to_numpy())
+    return config_id.fillna(df["agent"].map(by_agent)).set_axis(df.index)
+
+
+def _match_keys(df: pd.DataFrame, keys: pd.DataFrame) -> pd.Series:
+    """config_id of the first row of `keys` whose parameters match each decision's, NaN when none does."""
+    on = [c for c in keys.columns if c != "config_id"]
+    keys = keys.drop_duplicates(on)
+    return df[on].merge(keys, how="left", on=on)["config_id"].set_axis(df.index)
+
+
+def join_gen_coalition(df: pd.DataFrame, games: List[GenCoalitionScenario]) -> pd.Series:
+    """Config row of every decision, matched on the scenario parameters stored with it."""
+    ids = [i for i, g in enumerate(games) if g.classic]
+    return _match_keys(df, pd.DataFrame({
+        "M": [games[i].M for i in ids],
+        "own_gain_C1": [games[i].own_gain["C1"] for i in ids],
+        "own_gain_C2": [games[i].own_gain["C2"] for i in ids],
+        "friends_gain_C1": [games[i].friends_gain["C1"] for i in ids],
+        "friends_gain_C2": [games[i].friends_gain["C2"] for i in ids],
+        "config_id": ids,
+    }, dtype="float64"))
+
+
+def join_gen_coalition_multi(df: pd.DataFrame, games: List[GenCoalitionScenario]) -> pd.Series:
+    """
+    Config row of every gen_coalition_multi decision, matched on its coalitions and
+    parameters; the gain vectors are compared as stored ("a:b:c", see score_allocations).
+    """
+    ids = [i for i, g in enumerate(games) if not g.classic]
+    return _match_keys(df, pd.DataFrame({
+        "coalitions": pd.Series([":".join(games[i].coalitions) for i in ids], dtype="object"),
+        "M": pd.Series([games[i].M for i in ids], dtype="float64"),
+        "own_gain": pd.Series([joined_vector(games[i].own_vector) for i in ids], dtype="object"),
+        "friends_gain": pd.Series([joined_vector(games[i].friends_vector) for i in ids], dtype="object"),
+        "config_id": pd.Series(ids, dtype="float64"),
+    }))
+
+
+def score_vectors(game: GenCoalitionScenario, allocations: List[str]) -> List[Dict]:
+    """Derived fields of stored "a:b:c" allocations, scored in one batch (unreadable ones give NaN distances)."""
+    k = len(game.coalitions)
+    return game.score_allocations([parse_vector(a, k) for a in allocations])
+
+
+# -------------------
+# Re-scoring
+# -------------------
+@dataclass
+class RescoreSpec:
+    config: str
+    # legacy flat results file, used when the game has no partition catalog
+    flat_csv: str
+    config_type: Type[GameConfig]
+    # parsed config (load_configs) -> scoring-only game (csv_file=None)
+    game: Callable[[GameConfig], object]
+    join: Callable[[pd.DataFrame, List], pd.Series]
+    decision: str
+    # (game, decision) -> derived fields
+    score: Callable[[object, object], Dict]
+    # (game, decisions) -> derived fields of each, for games that score a batch at once
+    score_many: Optional[Callable[[object, List], List[Dict]]] = None
+
+
+RESCORERS: Dict[str, RescoreSpec] = {
+    "hedonic_game": RescoreSpec(
+        config="config/HedonicGame.csv",
+        flat_csv="data/hedonic_game_results.csv",
+        config_type=HedonicConfig,
+        game=lambda config: HedonicGame(config, csv_file=None),
+        join=join_hedonic,
+        decision="parsed_action",
+        score=lambda game, action: game.score_action(action),
+    ),
+    "gen_coalition": RescoreSpec(
+        config="config/GenCoalition.csv",
+        flat_csv="data/gen_coalition_results.csv",
+        config_type=GenCoalitionConfig,
+        game=lambda config: GenCoalitionScenario(config, csv_file=None),
+        join=join_gen_coalition,
+        decision="llm_allocation_C1",
+        score=lambda game, c1: game.score_allocation(c1),
+        score_many=lambda game, c1s: game.score_allocations([[c, 100 - c] for c in c1s]),
+    ),
+    # scenarios over other coalitions, from the same config file
+    "gen_coalition_multi": RescoreSpec(
+        config="config/GenCoalition.csv",
+        flat_csv="data/gen_coalition_multi_results.csv",
+        config_type=GenCoalitionConfig,
+        game=lambda config: GenCoalitionScenario(config, csv_file=None),
+        join=join_gen_coalition_multi,
+        decision="llm_allocation",
+        score=lambda game, allocation: score_vectors(game, [allocation])[0],
+        score_many=score_vectors,
+    ),
+}
+
+
+def rescore_frame(df: pd.DataFrame, game: str, config: Optional[str] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    Recompute the derived columns of `df` (a loaded result frame of `game`).
+
+    :return: (rescored frame, number of rows left as stored because no config row matched)
+    """
+    spec = RESCORERS[game]
+    games = [spec.game(c) for c in load_configs(config or spec.config, spec.config_type)]
+    config_id = spec.join(df, games)
+
+    # score each distinct (config row, decision) once
+    pairs = pd.DataFrame({"config_id": config_id, "decision": df[spec.decision]}).dropna().drop_duplicates()
+    if spec.score_many is None:
+        scored = pd.DataFrame(
+            [spec.score(games[int(c)], d) for c, d in zip(pairs["config_id"], pairs["decision"])],
+            index=pairs.index,
+        )
+    else:
+        # one batch per config row
+        scored = pd.concat(
+            [pd.DataFrame(spec.score_many(games[int(c)], group["decision"].tolist()), index=group.index)
+             for c, group in pairs.groupby("config_id")] or [pd.DataFrame(index=pairs.index)]
+        ).reindex(pairs.index)
+    if scored.empty:
+        return df, int(config_id.isna().sum())
+    scored = pd.concat([pairs, scored], axis=1)
+
+    # a decision column the score repeats (the allocation) keeps its stored value
+    fields = [c for c in scored.columns if c in df.columns and c != spec.decision]
+    keys = pd.DataFrame({"config_id": config_id, "decision": df[spec.decision]})
+    merged = keys.merge(scored, how="left", on=["config_id", "decision"]).set_axis(df.index)
+
+    out = df.copy()
+    matched = merged["config_id"].notna() & merged[fields].notna().any(axis=1)
+    for c in fields:
+        out[c] = merged[c].where(matched, df[c]).astype(df[c].dtype, errors="ignore")
+    return out, int((~matched).sum())
+
+
+def _run_of(path: str) -> Optional[str]:
+    m = re.search(r"run=([^/\\]+)", path)
+    return m.group(1) if m else None
+
+
+def write_result_set(df: pd.DataFrame, game: str, version: str, run_id: str,
+                     root: str = RESCORED_ROOT) -> List[str]:
+    """
+    Write one part file per model under root/version in the partitioned layout;
+    `df` holds every row of the run (an existing part of the same run and model is replaced).
+    """
+    spec = SCHEMAS[game]
+    base = os.path.join(root, version)
+    columns = [c for c in spec.dtypes if c in df.columns]
+    paths = []
+    for model, rows in df.groupby(spec.model_col, sort=False):
+        directory = partition_dir(game, run_id, model, base)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "part-0.csv")
+        rows[columns].to_csv(path, index=False)
+        paths.append(path)
+    rebuild_catalog(game, base)
+    return paths
+
+
+def rescore(game: str, source=None, config: Optional[str] = None, version: Optional[str] = None,
+            root: str = RESCORED_ROOT) -> str:
+    """
+    Re-score every result file of `source` (default: the game's current results) and
+    write them as result set `version` (default: a timestamp). Returns the version.
+    """
+    version = version or new_run_id()
+    if source is None:
+        source = select_partitions(game) if has_catalog(game) else RESCORERS[game].flat_csv
+
+    # a run is spread over several part files (and every flat file counts as run `version`):
+    # gather each run's rows from all of its sources before its result set is written
+    runs: Dict[str, List[pd.DataFrame]] = {}
+    for path in resolve_sources(source):
+        df = load_results(path, game)
+        rescored, unmatched = rescore_frame(df, game, config)
+        if unmatched:
+            print(f"{path}: {unmatched} of {len(df)} rows match no config row and keep their stored scores")
+        runs.setdefault(_run_of(path) or version, []).append(rescored)
+    for run_id, frames in runs.items():
+        write_result_set(pd.concat(frames, ignore_index=True), game, version, run_id, root)
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute derived result fields from stored decisions.")
+    parser.add_argument("game", choices=sorted(RESCORERS))
+    parser.add_argument("--source", nargs="+", default=None, help="result CSV(s); default: the game's results")
+    parser.add_argument("--config", default=None, help="config CSV; default: the one the game runs with")
+    parser.add_argument("--version", default=None, help="result set name; default: a timestamp")
+    args = parser.parse_args()
+
+    version = rescore(args.game, args.source, args.config, args.version)
+    print(f"Rescored {args.game} written to {os.path.join(RESCORED_ROOT, version, args.game)}")
@@ -1,95 +1,116 @@
+import numpy as np
 import pandas as pd
-from collections import defaultdict, Counter
+from helper.data.base_indexer import BaseIndexer
+from helper.data.loader import load_results
+from helper.data.incremental import IncrementalIndex, key_order
 
-class SocialContextIndexer:
-    def __init__(self, csv_file, max_points=8, alpha=0.5):
+class SocialContextIndexer(BaseIndexer):
+    GAME = "social_context"
+
+    def __init__(self, csv_file, max_points=8, alpha=0.5, incremental=False, streaming=False):
         """
-        :param csv_file: path to CSV file
+        :param csv_file: path to CSV file (or a list of partition paths)
         :param max_points: selfish payoff baseline (e.g., max points for rank 1)
         :param alpha: weight for Weighted Utility model
+        :param incremental: keep running per-(LLM, round) aggregates next to each file and
+                            only read the rows appended since the last refresh (self.df stays None
+                            until frame() loads it)
+        :param streaming: compute the same aggregates in bounded memory, one chunk of
+                          numeric columns at a time, without persisting them
         """
         self.csv_file = csv_file
         self.max_points = max_points
         self.alpha = alpha
 
-        self.llm_to_index = {}
-        self.index_to_llm = {}
+        self._index_models([])
+        self.df = None
+        self.altruism = {}
 
-        # read CSV into a DataFrame
-        self.df = pd.read_csv(self.csv_file)
-        self.df['round'] = self.df['round'].astype(int)
-        self.df['proposed_rank'] = self.df['proposed_rank'].astype(int)
-        self.df['final_rank'] = self.df['final_rank'].astype(int)
-        self.df['points_after_round'] = self.df['points_after_round'].astype(float)
+        if incremental or streaming:
+            self._build_from_summary(persist=incremental)
+            return
 
         # build LLM index
-        self.llm_to_index = {llm: i for i, llm in enumerate(self.df['llm'].unique())}
-        self.index_to_llm = {i: llm for llm, i in self.llm_to_index.items()}
+        self._index_models(self.frame()['llm'])
 
         # max rank for rank-based measure
         self.r_max = self.df['proposed_rank'].max()
 
         # combined altruism dictionary
-        self.altruism = self._compute_altruism()
+        self._set_altruism(self.row_means(self.measure_rows()))
+
+    def _load_frame(self):
+        """Typed result frame from the shared loader."""
+        return load_results(
+            self.csv_file, self.GAME,
+            columns=["round", "llm", "proposed_rank", "final_rank", "points_after_round"]
+        )
 
-    # -------------------
-    # Altruism Measures
-    # -------------------
+    def _build_from_summary(self, persist=True):
+        """
+        All three measures are recovered from per-(LLM, round) sums: the weighted
+        utility needs each round's point total, the rank index only the mean rank
+        (num = r_max - mean rank, den = r_max - 1).
+        """
+        index = IncrementalIndex(
+            "social_context", "social_context",
+            columns=["round", "llm", "proposed_rank", "points_after_round"],
+            keys=["llm", "round"],
+            row_values=lambda raw: raw[["llm", "round", "points_after_round", "proposed_rank"]].astype(
+                {"points_after_round": float, "proposed_rank": float}),
+        )
+        self.summary = index.refresh(self.csv_file, persist=persist)
+        llms = key_order(self.summary)
+        self._index_models(llms)
+        if self.summary is None:
+            return
+
+        s = self.summary
+        rounds = s.index.get_level_values("round")
+        points = s[("points_after_round", "sum")]
+        n = s[("points_after_round", "count")]
+        round_total = points.groupby(rounds, sort=False).transform("sum")
+        self.r_max = int(s[("proposed_rank", "max")].max())
+
+        sums = pd.DataFrame({
+            "points": points,
+            "others": n * round_total - points,
+            "rank": s[("proposed_rank", "sum")],
+            "n": n,
+        }).groupby(level="llm", sort=False).sum()
+        self._set_altruism(sums.drop(columns="n").div(sums["n"], axis=0))
+
+    def measure_rows(self):
+        """
+        Per-row values behind each measure, for bootstrap CIs (helper.data.bootstrap):
+        own points, the other players' points in the same round and the proposed rank.
+        """
+        return self.round_rows(self.frame())
 
-    def _compute_altruism(self):
-        deviation_index = self._deviation_from_selfish_nash_all()
-        utility_index = self._weighted_utility_all()
-        rank_index = self._rank_based_altruism_index_all()
+    def round_rows(self, df, by=("round",)):
+        """
+        measure_rows of `df`, in its row order.
 
-        # merge into single dict
+        :param by: columns identifying one game round; ("trajectory", "round") keeps
+                   repeated games apart instead of pooling their rounds
+        """
+        total_round_points = df.groupby(list(by))['points_after_round'].transform('sum')
+        return pd.DataFrame({
+            "llm": df['llm'],
+            "points": df['points_after_round'],
+            "others": total_round_points - df['points_after_round'],
+            "rank": df['proposed_rank'],
+        })
+
+    def from_means(self, means):
+        """
+        deviation from the selfish payoff:  max_points - points
+        weighted utility:                   points + alpha * others
+        rank index:                         (r_max - rank) / (r_max - 1), 1 when always proposing rank 1
+        """
+        den = self.r_max - 1
         return {
-            llm: {
-                "deviation": deviation_index.get(llm),
-                "utility": utility_index.get(llm),
-                "rank": rank_index.get(llm)
-            } for llm in self.llm_to_index
+            "deviation": self.max_points - means["points"],
+            "utility": means["points"] + self.alpha * means["others"],
+            "rank": (self.r_max - means["rank"]) / den if den > 0 else np.nan,
         }
-
-    def _deviation_from_selfish_nash_all(self):
-        # deviation = max_points - points_after_round
-        df_dev = self.df.copy()
-        df_dev['deviation'] = self.max_points - df_dev['points_after_round']
-        return df_dev.groupby('llm')['deviation'].mean().to_dict()
-
-    def _weighted_utility_all(self):
-        df_utility = self.df.copy()
-        df_utility['total_round_points'] = df_utility.groupby('round')['points_after_round'].transform('sum')
-        df_utility['others'] = df_utility['total_round_points'] - df_utility['points_after_round']
-        df_utility['weighted_utility'] = df_utility['points_after_round'] + self.alpha * df_utility['others']
-        return df_utility.groupby('llm')['weighted_utility'].mean().to_dict()
-
-    def _rank_based_altruism_index_all(self):
-        results = {}
-        for llm, group in self.df.groupby('llm'):
-            ranks = group['proposed_rank'].tolist()
-            if not ranks:
-                continue
-
-            counts = Counter(ranks)
-            total = len(ranks)
-            p_obs = {r: counts[r] / total for r in counts}
-            p_selfish = {1: 1.0}
-
-            num = sum((self.r_max - r) * p_obs[r] for r in p_obs)
-            den = sum((self.r_max - r) * p_selfish.get(r, 0) for r in range(1, self.r_max + 1))
-
-            results[llm] = num / den if den > 0 else None
-        return results
-
-    # -------------------
-    # Access Methods
-    # -------------------
-
-    def all_indices(self):
-        return self.llm_to_index
-
-    def get_index(self, llm):
-        return self.llm_to_index.get(llm)
-
-    def get_llm(self, index):
-        return self.index_to_llm.get(index)
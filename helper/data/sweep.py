@@ -0,0 +1,151 @@
+"""
+Parameter-sensitivity sweeps over the parameterized indexers.
+
+Each measure of the Atomic Congestion, Social Context and Prisoner's Dilemma
+indexers is linear in per-row ingredients that do not depend on the
+parameters, so a sweep loads the results once, averages those ingredients per
+model in one groupby and evaluates every grid point in a single broadcast:
+
+    sweep("atomic_congestion", alpha_sw=np.linspace(0, 1, 11), beta_fs=[0.1, 0.2])
+
+Parameters not given keep their registered value (helper.data.metrics). The
+result holds a (models x grid... x measures) array of index values.
+
+The Prisoner's Dilemma sweep applies the swept T/R/P/S to every row, including
+rows that recorded their own payoffs: it asks what the sacrifice index would
+be under other payoffs for the same decisions.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from helper.data.base_indexer import BaseIndexer
+from helper.data.metrics import GAMES, default_source
+
+Arrays = Dict[str, np.ndarray]
+
+
+@dataclass
+class SweepSpec:
+    params: List[str]
+    # indexer -> "llm" + parameter-free per-row ingredients
+    components: Callable[[BaseIndexer], pd.DataFrame]
+    # (indexer, per-model ingredient means, grid axes), broadcastable -> {measure: values}
+    measures: Callable[[BaseIndexer, Arrays, Arrays], Arrays]
+
+
+@dataclass
+class Sweep:
+    game: str
+    models: List[str]
+    params: Dict[str, np.ndarray]
+    measures: List[str]
+    values: np.ndarray  # (models, *grid, measures)
+
+    def measure(self, name: str) -> np.ndarray:
+        """(models, *grid) values of one measure."""
+        return self.values[..., self.measures.index(name)]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long (model, <params>..., measure, value) frame, one row per model, grid point and measure."""
+        axes = [self.models] + list(self.params.values()) + [self.measures]
+        index = pd.MultiIndex.from_product(axes, names=["model"] + list(self.params) + ["measure"])
+        return pd.Series(self.values.ravel(), index=index, name="value").reset_index()
+
+
+# -------------------
+# Atomic Congestion
+# -------------------
+def _atomic_components(indexer) -> pd.DataFrame:
+    c = indexer.round_components(indexer.frame())
+    return c[["llm", "cost", "total", "u", "advantage", "disadvantage", "svo_angle"]]
+
+
+def _atomic_measures(indexer, m: Arrays, p: Arrays) -> Arrays:
+    return {
+        "social_welfare": -(1 - p["alpha_sw"]) * m["cost"] - p["alpha_sw"] * m["total"],
+        "inequity_aversion": m["u"] - p["alpha_fs"] * m["disadvantage"] - p["beta_fs"] * m["advantage"],
+        "svo_angle": m["svo_angle"],
+    }
+
+
+# -------------------
+# Social Context
+# -------------------
+def _social_components(indexer) -> pd.DataFrame:
+    df = indexer.frame()
+    points = df["points_after_round"]
+    den = indexer.r_max - 1
+    return pd.DataFrame({
+        "llm": df["llm"],
+        "points": points,
+        "others": df.groupby("round")["points_after_round"].transform("sum") - points,
+        "rank": (indexer.r_max - df["proposed_rank"]) / den if den > 0 else np.nan,
+    })
+
+
+def _social_measures(indexer, m: Arrays, p: Arrays) -> Arrays:
+    return {
+        "deviation": p["max_points"] - m["points"],
+        "utility": m["points"] + p["alpha"] * m["others"],
+        "rank": m["rank"],
+    }
+
+
+# -------------------
+# Prisoner's Dilemma
+# -------------------
+def _pd_components(indexer) -> pd.DataFrame:
+    rows = indexer.measure_rows()
+    cooperated = rows["cooperated"].astype(bool)
+    # opponent's move on the rows where the LLM cooperated: T-R against C, S-P against D
+    opp_cooperated = indexer.frame()["opponent_choice"].eq("C").astype(float)
+    return rows[["llm", "cooperated", "mutual", "sustained"]].assign(
+        opp_c_if_coop=opp_cooperated.where(cooperated))
+
+
+def _pd_measures(indexer, m: Arrays, p: Arrays) -> Arrays:
+    q = m["opp_c_if_coop"]
+    measures = dict(indexer.from_means({**m, "sacrifice": q}))  # sacrifice is replaced below
+    measures["avg_payoff_sacrifice"] = q * (p["T"] - p["R"]) + (1 - q) * (p["S"] - p["P"])
+    return measures
+
+
+SWEEPS: Dict[str, SweepSpec] = {
+    "atomic_congestion": SweepSpec(["alpha_sw", "alpha_fs", "beta_fs"], _atomic_components, _atomic_measures),
+    "social_context": SweepSpec(["max_points", "alpha"], _social_components, _social_measures),
+    "prisoner_dilemma": SweepSpec(["T", "R", "P", "S"], _pd_components, _pd_measures),
+}
+
+
+def sweep(game: str, source=None, **grid) -> Sweep:
+    """
+    :param game: "atomic_congestion", "social_context" or "prisoner_dilemma"
+    :param source: CSV path or partition list (default: the registered source)
+    :param grid: values per parameter; parameters left out keep their registered value
+    :return: Sweep with values of shape (models, *grid, measures), grid axes in SweepSpec order
+    """
+    spec = SWEEPS[game]
+    registered = GAMES[game]
+    unknown = set(grid) - set(spec.params)
+    if unknown:
+        raise ValueError(f"{game} has no parameters {sorted(unknown)}; sweepable: {spec.params}")
+    axes = {name: np.atleast_1d(np.asarray(grid.get(name, registered.params[name]), dtype="float64"))
+            for name in spec.params}
+
+    indexer = registered.indexer(default_source(game) if source is None else source, **registered.params)
+    components = spec.components(indexer)
+    value_cols = [c for c in components.columns if c != "llm"]
+    means = components.astype({c: "float64" for c in value_cols}).groupby("llm", sort=False)[value_cols].mean()
+
+    # models on axis 0, one axis per parameter
+    k = len(axes)
+    m = {c: means[c].to_numpy().reshape((-1,) + (1,) * k) for c in value_cols}
+    p = {name: v.reshape((1,) * (i + 1) + (-1,) + (1,) * (k - i - 1)) for i, (name, v) in enumerate(axes.items())}
+    measures = spec.measures(indexer, m, p)
+
+    shape = (len(means),) + tuple(len(v) for v in axes.values())
+    values = np.stack([np.broadcast_to(np.asarray(v, dtype="float64"), shape) for v in measures.values()], axis=-1)
+    return Sweep(game, list(means.index), axes, list(measures), values)
@@ -0,0 +1,161 @@
+"""
+Per-round and rolling time-series versions of the multi-round altruism indexes.
+
+The indexers collapse a game into one mean per model. Here the same per-row
+values (see measure_rows) are averaged per (model, trajectory, round) instead,
+smoothed along each trajectory with a groupby-rolling window of the last k
+rounds and an exponentially weighted mean, and turned into measures through
+the indexer's from_means. The result is one long table:
+
+    model, game, trajectory, round, measure, window, value
+
+with window one of "round" (that round alone), "rolling" (last `window`
+rounds) and "ewm" (span `span`). Model, game, measure and window are
+categoricals, so the table stays compact enough to hand to a dashboard.
+"""
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from helper.data.base_indexer import BaseIndexer
+from helper.data.metrics import GAMES, default_source
+from helper.data.trajectory import assign_trajectories
+
+COLUMNS = ["model", "game", "trajectory", "round", "measure", "window", "value"]
+WINDOW = 5
+SPAN = 5
+KEYS = ["llm", "trajectory", "round"]
+
+
+# -------------------
+# Round-level rows per game
+# -------------------
+def _prisoner_dilemma_rows(indexer) -> pd.DataFrame:
+    rows = indexer.measure_rows()
+    # trajectories were numbered on the raw rows, before invalid moves were dropped
+    df = indexer.frame()
+    return rows.assign(trajectory=df["trajectory"], round=df["round"])
+
+
+def _atomic_congestion_rows(indexer) -> pd.DataFrame:
+    # number the games on the raw rows, then score each (trajectory, round) on its own
+    df = indexer.frame()
+    df = df.assign(trajectory=assign_trajectories(df))
+    return indexer.round_scores(df, by=("trajectory", "round"))[KEYS + indexer.MEASURES]
+
+
+def _social_context_rows(indexer) -> pd.DataFrame:
+    # the other players' points are those of the same round of the same game
+    df = indexer.frame()
+    df = df.assign(trajectory=assign_trajectories(df))
+    rows = indexer.round_rows(df, by=("trajectory", "round"))
+    return rows.assign(trajectory=df["trajectory"], round=df["round"])
+
+
+def _non_atomic_rows(indexer) -> pd.DataFrame:
+    # number the games on the raw rows, then take each (trajectory, round)'s maxima on its own
+    df = indexer.frame()
+    df = df.assign(trajectory=assign_trajectories(df))
+    return indexer.round_measures(df, by=("trajectory", "round"))[KEYS + indexer.MEASURES]
+
+
+# indexer -> llm, trajectory, round + per-row values in file order
+ROUND_ROWS: Dict[str, Callable[[BaseIndexer], pd.DataFrame]] = {
+    "prisoner_dilemma": _prisoner_dilemma_rows,
+    "atomic_congestion": _atomic_congestion_rows,
+    "social_context": _social_context_rows,
+    "non_atomic": _non_atomic_rows,
+}
+
+
+# -------------------
+# Windows
+# -------------------
+def round_means(rows: pd.DataFrame) -> pd.DataFrame:
+    """Mean of each value column per (llm, trajectory, round), ordered by model, trajectory, round."""
+    value_cols = [c for c in rows.columns if c not in KEYS]
+    means = rows.astype({c: "float64" for c in value_cols}).groupby(KEYS, sort=False)[value_cols].mean()
+    llm_codes, _ = pd.factorize(means.index.get_level_values("llm"))
+    order = np.lexsort((means.index.get_level_values("round"),
+                        means.index.get_level_values("trajectory"), llm_codes))
+    return means.iloc[order]
+
+
+def smooth(means: pd.DataFrame, window: int = WINDOW, span: float = SPAN) -> Dict[str, pd.DataFrame]:
+    """Per-round means and their rolling / EWM versions along each (llm, trajectory)."""
+    by_trajectory = means.groupby(level=["llm", "trajectory"], sort=False)
+    rolling = by_trajectory.rolling(window, min_periods=1).mean()
+    ewm = by_trajectory.ewm(span=span, ignore_na=True).mean()
+    # groupby-rolling prepends the group keys to the index
+    rolling.index = rolling.index.droplevel([0, 1])
+    ewm.index = ewm.index.droplevel([0, 1])
+    return {
+        "round": means,
+        "rolling": rolling.reindex(means.index),
+        "ewm": ewm.reindex(means.index),
+    }
+
+
+def timeseries_index(indexer: BaseIndexer, window: int = WINDOW, span: float = SPAN) -> pd.DataFrame:
+    """Long-format time series of every measure of an indexer of a multi-round game."""
+    game = indexer.GAME
+    means = round_means(ROUND_ROWS[game](indexer))
+    keys = means.index.to_frame(index=False)
+
+    frames = []
+    for name, smoothed in smooth(means, window, span).items():
+        measures = indexer.from_means({c: smoothed[c].to_numpy() for c in smoothed.columns})
+        for measure, values in measures.items():
+            frames.append(pd.DataFrame({
+                "model": keys["llm"],
+                "trajectory": keys["trajectory"].to_numpy(),
+                "round": keys["round"].to_numpy(),
+                "measure": measure,
+                "window": name,
+                "value": np.broadcast_to(np.asarray(values, dtype="float64"), len(keys)),
+            }))
+    if not frames:
+        return _empty()
+    out = pd.concat(frames, ignore_index=True)
+    out.insert(1, "game", game)
+    return _compact(out)
+
+
+def game_timeseries(game: str, source=None, window: int = WINDOW, span: float = SPAN, **params) -> pd.DataFrame:
+    """timeseries_index for a registered game (see helper.data.metrics); `params` override the registered ones."""
+    spec = GAMES[game]
+    indexer = spec.indexer(default_source(game) if source is None else source, **{**spec.params, **params})
+    return timeseries_index(indexer, window, span)
+
+
+def compute_timeseries(sources: Optional[Dict[str, Any]] = None, games: Iterable[str] = tuple(ROUND_ROWS),
+                       window: int = WINDOW, span: float = SPAN) -> pd.DataFrame:
+    """
+    :param sources: {game: CSV path or partition list}; missing games use default_source
+    :param games: multi-round games to include
+    :param window: rounds in the rolling window
+    :param span: EWM span in rounds
+    :return: long (model, game, trajectory, round, measure, window, value) table
+    """
+    sources = sources or {}
+    return combine_timeseries([game_timeseries(game, sources.get(game), window, span) for game in games])
+
+
+def combine_timeseries(frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """One table of the game_timeseries frames of several games."""
+    frames = list(frames)
+    if not frames:
+        return _empty()
+    return _compact(pd.concat(frames, ignore_index=True))
+
+
+def _empty() -> pd.DataFrame:
+    return _compact(pd.DataFrame(columns=COLUMNS))
+
+
+def _compact(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame[COLUMNS].astype({
+        "model": "category", "game": "category", "measure": "category", "window": "category",
+        "trajectory": "int32", "round": "int32", "value": "float64",
+    })
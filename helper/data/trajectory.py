@@ -0,0 +1,13 @@
+import pandas as pd
+
+
+def assign_trajectories(df: pd.DataFrame, model_col: str = "llm", round_col: str = "round") -> pd.Series:
+    """
+    Number each model's game trajectories (1, 2, ...) from file order.
+
+    A game appends rounds 1..T for every model in turn, so a model's trajectory
+    restarts whenever its round number does not increase over its previous row.
+    """
+    prev = df.groupby(model_col, sort=False)[round_col].shift()
+    starts = prev.isna() | (df[round_col] <= prev)
+    return starts.astype("int64").groupby(df[model_col], sort=False).cumsum()
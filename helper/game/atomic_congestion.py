@@ -1,50 +1,54 @@
 import csv
 import os
 from random import randrange
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
+from helper.data.partitions import PartitionWriter
+from helper.game.configs import AtomicCongestionConfig
 from helper.game.game import Game
 from helper.llm.LLM import LLM
 import concurrent.futures
 
 class AtomicCongestion(Game):
-    def __init__(self, config: Dict, csv_save: str = "data/atomic_congestion_all.csv", llms: List[LLM]=[], opponent_strategy: str = "random") -> None:
-        assert "total_rounds" in config
-        assert "prompt" in config
+    config_type = AtomicCongestionConfig
+
+    def __init__(self, config: Union[AtomicCongestionConfig, Dict], csv_save: str = "data/atomic_congestion_all.csv", llms: List[LLM]=[], opponent_strategy: str = "random", run_id: Optional[str] = None) -> None:
+        config = AtomicCongestionConfig.coerce(config)
 
         print("Game Init")
-        print("Current Prompt: " + config["prompt"])
+        print("Current Prompt: " + config.prompt)
 
-        self.total_rounds = int(config["total_rounds"])
+        self.total_rounds = config.total_rounds
         self.curr_round = 0
         self.llms = llms
         self.opponent_strategy = opponent_strategy
-        self.prompt = config["prompt"]
+        self.prompt = config.prompt
 
         self.travel_times = [0 for _ in llms]
         self.last_moves_llm = ["" for _ in llms]
         self.last_moves_opp = ["" for _ in llms]
 
         # payoff matrix
-        self.travel_time_matrix = {
-            ("R1", "R1"): tuple(int(x) for x in config["R1R1"].split(":")),
-            ("R1", "R2"): tuple(int(x) for x in config["R1R2"].split(":")),
-            ("R2", "R1"): tuple(int(x) for x in config["R2R1"].split(":")),
-            ("R2", "R2"): tuple(int(x) for x in config["R2R2"].split(":")),
-        }
-
-        self.csv_file = open(csv_save, "a", newline="")
-        self.writer = csv.writer(self.csv_file)
-
-        if not os.path.exists(csv_save) or os.path.getsize(csv_save) == 0:
-            self.writer.writerow([
-                "round",
-                "llm",
-                "llm_choice",
-                "opponent_choice",
-                "reasoning",
-                "travel_time",
-                "cumulative_time"
-            ])
+        self.travel_time_matrix = config.travel_time_matrix()
+
+        fieldnames = [
+            "round",
+            "llm",
+            "llm_choice",
+            "opponent_choice",
+            "reasoning",
+            "travel_time",
+            "cumulative_time"
+        ]
+
+        if run_id is not None:
+            # partitioned layout: data/atomic_congestion/run=<id>/model=<llm>/part-N.csv
+            self.csv_file = self.writer = PartitionWriter("atomic_congestion", fieldnames, run_id=run_id)
+        else:
+            self.csv_file = open(csv_save, "a", newline="")
+            self.writer = csv.writer(self.csv_file)
+
+            if not os.path.exists(csv_save) or os.path.getsize(csv_save) == 0:
+                self.writer.writerow(fieldnames)
 
     async def simulate_game(self):
         while self.curr_round < self.total_rounds:
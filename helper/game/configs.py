@@ -0,0 +1,273 @@
+"""
+Typed, parse-once game configs.
+
+A config file (config/*.csv as csv.DictReader string rows, or JSONL rows of
+already-parsed JSON values) is read into one frozen config per row by
+load_configs: payoff strings are split, dict / list literals are evaluated,
+numbers are converted and every row is validated when the file is loaded, so a
+malformed row fails before the first game runs instead of mid-sweep, with the
+file and row in the message. The parsed rows are cached by the file's content
+hash, so the same file is parsed once per process however many repetitions,
+sweeps or re-scorings read it.
+
+The games take either their config type or a raw row (coerced through
+from_row), so callers that build rows themselves keep working. Games that
+declare no config_type (DictatorGame, CostSharingGame read optional columns
+with defaults through their prompt testers) get the raw rows, read once.
+
+    configs = load_configs("config/HedonicGame.csv", HedonicConfig)
+    game = HedonicGame(configs[0], llms=llms)
+"""
+from __future__ import annotations
+
+import ast
+import csv
+import hashlib
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple, Type, Union
+
+from helper.game.hedonic_world import HedonicWorld
+
+Payoff = Tuple[int, int]
+# name -> members, in config order
+Relation = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+_cache: Dict[Tuple[Optional[str], str], Tuple] = {}
+
+
+# -------------------
+# Field parsing
+# -------------------
+def _get(row: Mapping[str, Any], key: str) -> Any:
+    if key not in row or row[key] is None or row[key] == "":
+        raise ValueError(f"missing column {key!r}")
+    return row[key]
+
+
+def _int(row: Mapping[str, Any], key: str) -> int:
+    value = _get(row, key)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key}={value!r} is not an integer") from None
+
+
+def _float(row: Mapping[str, Any], key: str) -> float:
+    value = _get(row, key)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key}={value!r} is not a number") from None
+
+
+def _rounds(row: Mapping[str, Any]) -> int:
+    # rows built in code for a single game may leave out main.py's repetition count
+    return _int(row, "simulate_rounds") if row.get("simulate_rounds") not in (None, "") else 1
+
+
+def _payoff(row: Mapping[str, Any], key: str) -> Payoff:
+    """"a:b" payoff string (or a two-element list) -> (a, b)."""
+    value = _get(row, key)
+    parts = value.split(":") if isinstance(value, str) else value
+    try:
+        a, b = (int(x) for x in parts)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key}={value!r} is not an 'a:b' integer payoff") from None
+    return a, b
+
+
+def _literal(row: Mapping[str, Any], key: str) -> Any:
+    # csv rows hold Python literals; JSONL rows hold parsed JSON
+    value = _get(row, key)
+    if not isinstance(value, str):
+        return value
+    try:
+        return ast.literal_eval(value)
+    except (SyntaxError, ValueError):
+        raise ValueError(f"{key}={value!r} is not a valid literal") from None
+
+
+def _relation(row: Mapping[str, Any], key: str) -> Relation:
+    value = _literal(row, key)
+    if not isinstance(value, Mapping) or not all(isinstance(v, (list, tuple, set)) for v in value.values()):
+        raise ValueError(f"{key} must map names to lists of agents, got {value!r}")
+    return tuple((str(k), tuple(str(a) for a in v)) for k, v in value.items())
+
+
+# -------------------
+# Configs
+# -------------------
+@dataclass(frozen=True, slots=True)
+class GameConfig:
+    simulate_rounds: int
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> "GameConfig":
+        raise NotImplementedError
+
+    @classmethod
+    def coerce(cls, config: Union["GameConfig", Mapping[str, Any]]) -> "GameConfig":
+        """`config` itself when already parsed, else its row parsed."""
+        return config if isinstance(config, cls) else cls.from_row(config)
+
+    def __post_init__(self):
+        if self.simulate_rounds < 0:
+            raise ValueError("simulate_rounds must be non-negative")
+
+
+@dataclass(frozen=True, slots=True)
+class PrisonersDilemmaConfig(GameConfig):
+    total_rounds: int
+    prompt: str
+    CC: Payoff
+    CD: Payoff
+    DC: Payoff
+    DD: Payoff
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(_rounds(row), _int(row, "total_rounds"), str(_get(row, "prompt")),
+                   *(_payoff(row, k) for k in ("CC", "CD", "DC", "DD")))
+
+    def payoff_matrix(self) -> Dict[Tuple[str, str], Payoff]:
+        return {("C", "C"): self.CC, ("C", "D"): self.CD, ("D", "C"): self.DC, ("D", "D"): self.DD}
+
+
+@dataclass(frozen=True, slots=True)
+class AtomicCongestionConfig(GameConfig):
+    total_rounds: int
+    prompt: str
+    R1R1: Payoff
+    R1R2: Payoff
+    R2R1: Payoff
+    R2R2: Payoff
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(_rounds(row), _int(row, "total_rounds"), str(_get(row, "prompt")),
+                   *(_payoff(row, k) for k in ("R1R1", "R1R2", "R2R1", "R2R2")))
+
+    def travel_time_matrix(self) -> Dict[Tuple[str, str], Payoff]:
+        return {("R1", "R1"): self.R1R1, ("R1", "R2"): self.R1R2, ("R2", "R1"): self.R2R1, ("R2", "R2"): self.R2R2}
+
+
+@dataclass(frozen=True, slots=True)
+class SocialContextConfig(GameConfig):
+    rounds: int
+    prompt: str
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(_rounds(row), _int(row, "rounds"), str(_get(row, "prompt")))
+
+
+@dataclass(frozen=True, slots=True)
+class NonAtomicConfig(GameConfig):
+    init_fish_num: int
+    fishermen_num: int
+    max_consumption: int
+    total_rounds: int
+    prompt: str
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(_rounds(row), _int(row, "init_fish_num"), _int(row, "fishermen_num"),
+                   _int(row, "max_consumption"), _int(row, "total_rounds"), str(_get(row, "prompt")))
+
+
+@dataclass(frozen=True, slots=True)
+class GenCoalitionConfig(GameConfig):
+    coalitions: Tuple[str, ...]
+    # per coalition, in the order of `coalitions`
+    own_gain: Tuple[float, ...]
+    friends_gain: Tuple[float, ...]
+    M: float
+
+    @classmethod
+    def from_row(cls, row):
+        coalitions = _literal(row, "coalitions")
+        if isinstance(coalitions, str) or not isinstance(coalitions, Sequence):
+            raise ValueError(f"coalitions must be a list of names, got {coalitions!r}")
+        coalitions = tuple(str(c) for c in coalitions)
+        return cls(_rounds(row), coalitions,
+                   tuple(_float(row, f"own_gain_{c}") for c in coalitions),
+                   tuple(_float(row, f"friends_gain_{c}") for c in coalitions),
+                   _float(row, "M"))
+
+    def __post_init__(self):
+        GameConfig.__post_init__(self)
+        if not self.coalitions or len(set(self.coalitions)) != len(self.coalitions):
+            raise ValueError(f"coalitions must be distinct and non-empty, got {list(self.coalitions)}")
+        if not len(self.own_gain) == len(self.friends_gain) == len(self.coalitions):
+            raise ValueError("own_gain and friends_gain need one value per coalition")
+
+
+@dataclass(frozen=True, slots=True)
+class HedonicConfig(GameConfig):
+    agent: str
+    groups: Relation
+    friends: Relation
+    enemies: Relation
+    w_friend: float
+    w_enemy: float
+    action_space: str = "stay_leave"
+    # built once from the fields above and shared by every game of this config
+    world: HedonicWorld = field(init=False, repr=False, compare=False)
+
+    ACTION_SPACES = ("stay_leave", "full")
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(_rounds(row), str(_get(row, "agent")),
+                   _relation(row, "groups"), _relation(row, "friends"), _relation(row, "enemies"),
+                   _float(row, "w_friend"), _float(row, "w_enemy"),
+                   row.get("action_space") or "stay_leave")
+
+    def __post_init__(self):
+        GameConfig.__post_init__(self)
+        if self.action_space not in self.ACTION_SPACES:
+            raise ValueError(f"Unknown action_space {self.action_space!r}; expected one of {self.ACTION_SPACES}")
+        seen = [a for _, members in self.groups for a in members]
+        if len(seen) != len(set(seen)):
+            raise ValueError("an agent is listed in more than one group")
+        object.__setattr__(self, "world", HedonicWorld.from_config(
+            dict(self.groups), dict(self.friends), dict(self.enemies), self.w_friend, self.w_enemy))
+
+
+# -------------------
+# Loading
+# -------------------
+def _rows(text: str, path: str):
+    """Rows of a config file's text: csv.DictReader rows, or JSON lines (unparsed) for .jsonl."""
+    if path.endswith(".jsonl"):
+        return [line for line in text.splitlines() if line.strip()]
+    return csv.DictReader(io.StringIO(text, newline=""))
+
+
+def load_configs(path: str, config_type: Optional[Type[GameConfig]] = None) -> Tuple:
+    """
+    Every row of the config file at `path`, parsed once per file content.
+
+    :param config_type: GameConfig subclass to parse the rows into; None keeps the raw rows
+    :raises ValueError: naming the file and row of the first malformed row
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    key = (config_type.__qualname__ if config_type else None, hashlib.sha256(data).hexdigest())
+    if key not in _cache:
+        configs = []
+        for n, row in enumerate(_rows(data.decode("utf-8"), path), start=1):
+            try:
+                row = json.loads(row) if isinstance(row, str) else row
+                configs.append(config_type.from_row(row) if config_type else row)
+            except ValueError as e:
+                raise ValueError(f"{path}, row {n}: {e}") from e
+        _cache[key] = tuple(configs)
+    return _cache[key]
+
+
+def simulate_rounds(config: Union[GameConfig, Mapping[str, Any]]) -> int:
+    """Repetitions main.py runs of a parsed config or a raw row."""
+    return config.simulate_rounds if isinstance(config, GameConfig) else int(config["simulate_rounds"])
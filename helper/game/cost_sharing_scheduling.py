@@ -164,15 +164,16 @@ Which time slot do you book the meeting room for? Please respond with either 1 o
 
 import os
 import csv
-from typing import Dict, List
+from typing import Dict, List, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
 
+from helper.data.partitions import PartitionWriter
 from helper.game.game import Game
 from helper.llm.LLM import LLM
 
 class CostSharingGame(Game):
-    def __init__(self, config: Dict, llms: List[LLM] = [], csv_file="data/cost_sharing_game_results.csv"):
+    def __init__(self, config: Dict, llms: List[LLM] = [], csv_file="data/cost_sharing_game_results.csv", run_id: Optional[str] = None):
         print("[DEBUG] Initializing CostSharingGame with config:", config)
         assert "scenario_type" in config
         assert "prompt_template" in config
@@ -215,14 +216,20 @@ class CostSharingGame(Game):
 
         print("[DEBUG] Overrides set:", self.overrides)
 
-        file_exists = os.path.exists(self.csv_file)
-        self.csv_handle = open(self.csv_file, mode="a", newline="", encoding="utf-8")
-        self.writer = csv.DictWriter(self.csv_handle, fieldnames=self.fieldnames)
-
-        if not file_exists:
-            print("[DEBUG] CSV file does not exist. Writing header.")
-            self.writer.writeheader()
-            self.csv_handle.flush()
+        if run_id is not None:
+            # partitioned layout: data/cost_sharing_game/run=<id>/model=<llm>/part-N.csv
+            self.csv_handle = self.writer = PartitionWriter(
+                "cost_sharing_game", self.fieldnames, run_id=run_id, model_field="llm_name"
+            )
+        else:
+            file_exists = os.path.exists(self.csv_file)
+            self.csv_handle = open(self.csv_file, mode="a", newline="", encoding="utf-8")
+            self.writer = csv.DictWriter(self.csv_handle, fieldnames=self.fieldnames)
+
+            if not file_exists:
+                print("[DEBUG] CSV file does not exist. Writing header.")
+                self.writer.writeheader()
+                self.csv_handle.flush()
 
         self.csv_lock = Lock()
 
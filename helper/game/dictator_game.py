@@ -1,6 +1,7 @@
 import os
 import csv
-from typing import Dict, List
+from typing import Dict, List, Optional
+from helper.data.partitions import PartitionWriter
 from helper.game.game import Game
 from helper.llm.LLM import LLM
 from pydantic import BaseModel
@@ -99,7 +100,7 @@ class DictatorGameAnswerFormat(BaseModel):
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 class DictatorGame(Game):
-    def __init__(self, config_dict: Dict, llms: List[LLM], csv_file="data/dictator_game_results.csv"):
+    def __init__(self, config_dict: Dict, llms: List[LLM], csv_file="data/dictator_game_results.csv", run_id: Optional[str] = None):
         self.single_prompt_tester = SinglePromptTester(config_dict)
         self.llms = llms
         self.results = []
@@ -112,15 +113,21 @@ class DictatorGame(Game):
             "team_relationship", "prompt", "keep", "donate"
         ]
 
-        file_exists = os.path.exists(self.csv_file)
-        self.csv_handle = open(self.csv_file, "a", newline="", encoding="utf-8")
-        self.writer = csv.DictWriter(self.csv_handle, fieldnames=self.fieldnames)
+        if run_id is not None:
+            # partitioned layout: data/dictator_game/run=<id>/model=<llm>/part-N.csv
+            self.csv_handle = self.writer = PartitionWriter(
+                "dictator_game", self.fieldnames, run_id=run_id, model_field="llm_name"
+            )
+        else:
+            file_exists = os.path.exists(self.csv_file)
+            self.csv_handle = open(self.csv_file, "a", newline="", encoding="utf-8")
+            self.writer = csv.DictWriter(self.csv_handle, fieldnames=self.fieldnames)
 
-        print(os.path.getsize(csv_file))
+            print(os.path.getsize(csv_file))
 
-        if not file_exists or os.path.getsize(csv_file) == 0:
-            self.writer.writeheader()
-            self.csv_handle.flush()
+            if not file_exists or os.path.getsize(csv_file) == 0:
+                self.writer.writeheader()
+                self.csv_handle.flush()
 
     async def simulate_game(self):
         prompt = self.single_prompt_tester.generate_test_prompt()
@@ -1,14 +1,15 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+from helper.data.partitions import PartitionWriter
+from helper.game.configs import GenCoalitionConfig
 from helper.game.game import Game
 from dotenv import load_dotenv
-from helper.llm.LLM import LLM
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from pydantic import BaseModel
+import numpy as np
 import os
 import re
 import math
-import asyncio
 
 load_dotenv()
 
@@ -30,71 +31,193 @@ Respond with:
 - Your reasoning for this allocation choice
 """
 
-import ast
+MULTI_PROMPT_TEMPLATE = """
+You are Agent 1.
+
+There are four agents: Agent 1 (you), Agent 2, Agent 3, Agent 4.
+You are friends with Agent 2 and Agent 3. Agent 4 is neutral.
+
+You have 100 units of effort to allocate across the following {n_projects} projects.
+
+{project_block}
+
+Choose how much effort to allocate to each project as percentages (0-100) that sum to 100.
+
+Respond with:
+- A list of {n_projects} percentages, one per project in the order {order}
+- Your reasoning for this allocation choice
+"""
+
+
+class GenCoalitionAllocationFormat(BaseModel):
+    reasoning: str
+    allocations: List[float]
+
+
+# behavioural models every allocation is compared with
+MODELS = ("SF", "EQ", "AL")
+# scores closer than this are ties, and the allocation is split between them
+TIE_TOLERANCE = 1e-12
+
+
+def model_weights(models, M) -> np.ndarray:
+    """
+    (w_own, w_friends) of each model: SF = (M, 1), EQ = (1, 1), AL = (1, M).
+
+    :param M: a number, or an array of M values
+    :return: (*M.shape, len(models), 2)
+    """
+    M = np.asarray(M, dtype=float)
+    one = np.ones_like(M)
+    rows = []
+    for model in models:
+        model = model.upper()
+        if model == "SF":
+            rows.append((M, one))
+        elif model == "EQ":
+            rows.append((one, one))
+        elif model == "AL":
+            rows.append((one, M))
+        else:
+            raise ValueError("Unknown model (use 'SF', 'EQ', 'AL').")
+    return np.stack([np.stack(r, axis=-1) for r in rows], axis=-2)
+
+
+def model_scores(own_gain, friends_gain, weights) -> np.ndarray:
+    """
+    w_own * own_gain + w_friends * friends_gain of every coalition under every weight pair.
+
+    :param own_gain / friends_gain: (..., K) gains per coalition
+    :param weights: (..., P, 2) rows of (w_own, w_friends), broadcast against the gains
+    :return: (..., P, K)
+    """
+    own = np.asarray(own_gain, dtype=float)[..., None, :]
+    friends = np.asarray(friends_gain, dtype=float)[..., None, :]
+    w = np.asarray(weights, dtype=float)
+    return w[..., 0, None] * own + w[..., 1, None] * friends
+
+
+def optimal_allocations(own_gain, friends_gain, weights) -> np.ndarray:
+    """
+    Utility-maximising allocation for every weight pair: all effort to the argmax
+    of w_own * own_gain + w_friends * friends_gain, split evenly on ties.
+
+    :param own_gain / friends_gain: (..., K) gains per coalition
+    :param weights: (..., P, 2) rows of (w_own, w_friends)
+    :return: (..., P, K) allocations in percent
+    """
+    scores = model_scores(own_gain, friends_gain, weights)
+    winners = np.abs(scores - scores.max(axis=-1, keepdims=True)) < TIE_TOLERANCE
+    return 100.0 * winners / winners.sum(axis=-1, keepdims=True)
+
+
+def allocation_distances(allocations, predictions) -> np.ndarray:
+    """Euclidean distance of every allocation (N, K) to every prediction (P, K): (N, P)."""
+    a = np.asarray(allocations, dtype=float)
+    p = np.asarray(predictions, dtype=float)
+    return np.sqrt(((a[:, None, :] - p[None, :, :]) ** 2).sum(axis=-1))
+
+
+def normalize_allocation(values, k: int) -> np.ndarray:
+    """K non-negative percentages rescaled to sum to 100; NaN when the answer is not K numbers with a positive sum."""
+    try:
+        v = np.clip(np.asarray(values, dtype=float).reshape(-1), 0.0, None)
+    except (TypeError, ValueError):
+        return np.full(k, np.nan)
+    if len(v) != k or not np.isfinite(v).all() or v.sum() <= 0:
+        return np.full(k, np.nan)
+    return 100.0 * v / v.sum()
+
+
+def joined_vector(values) -> str:
+    """Vector as stored in result rows, like the payoff strings of the configs: "a:b:c" ("" when unusable)."""
+    values = [float(v) for v in values]
+    return "" if any(math.isnan(v) for v in values) else ":".join(f"{v:g}" for v in values)
+
+
+def parse_vector(text, k: int) -> np.ndarray:
+    """K floats of a stored "a:b:c" vector (see joined_vector); NaN when blank or not K numbers."""
+    try:
+        v = np.array(str(text).split(":"), dtype=float)
+    except ValueError:
+        return np.full(k, np.nan)
+    return v if len(v) == k else np.full(k, np.nan)
+
+
 import csv
 
 class GenCoalitionScenario(Game):
-    def __init__(self, config_dict: Dict, llms=[], csv_file="data/gen_coalition_results.csv") -> None:
-        # Parse config from CSV
-        self.coalitions = ast.literal_eval(config_dict['coalitions'])
-        self.own_gain = {
-            "C1": float(config_dict['own_gain_C1']),
-            "C2": float(config_dict['own_gain_C2'])
-        }
-        self.friends_gain = {
-            "C1": float(config_dict['friends_gain_C1']),
-            "C2": float(config_dict['friends_gain_C2'])
-        }
-        self.M = float(config_dict['M'])
+    config_type = GenCoalitionConfig
+
+    def __init__(self, config_dict: Union[GenCoalitionConfig, Dict], llms=[], csv_file: Optional[str] = "data/gen_coalition_results.csv", run_id: Optional[str] = None) -> None:
+        # parsed once per config file (helper/game/configs.py); raw rows are parsed here
+        self.config: GenCoalitionConfig = GenCoalitionConfig.coerce(config_dict)
+        self.coalitions = list(self.config.coalitions)
+        self.own_gain = dict(zip(self.config.coalitions, self.config.own_gain))
+        self.friends_gain = dict(zip(self.config.coalitions, self.config.friends_gain))
+        self.M = self.config.M
+        self.own_vector = np.array(self.config.own_gain)
+        self.friends_vector = np.array(self.config.friends_gain)
+        # SF/EQ/AL optimal allocations, (3, K)
+        self.predictions = optimal_allocations(self.own_vector, self.friends_vector, model_weights(MODELS, self.M))
         self.llms = llms
-        self.config_dict = config_dict
-        
+
+        # the original Alpha/Beta scenario keeps its prompt (a C1 percentage) and C1/C2 columns;
+        # any other list of coalitions asks for an allocation vector and stores vectors as "a:b:c"
+        self.classic = self.coalitions == ["C1", "C2"]
+        self.result_set = "gen_coalition" if self.classic else "gen_coalition_multi"
+        if not self.classic and csv_file == "data/gen_coalition_results.csv":
+            csv_file = "data/gen_coalition_multi_results.csv"
+
         # CSV setup
         self.csv_file = csv_file
-        self.fieldnames = [
-            "llm_name", "prompt", "llm_value", "llm_reasoning", 
-            "llm_allocation_C1", "llm_allocation_C2", "M", "own_gain_C1", "own_gain_C2",
-            "friends_gain_C1", "friends_gain_C2", "SF_distance", "EQ_distance", "AL_distance"
-        ]
+        if self.classic:
+            self.fieldnames = [
+                "llm_name", "prompt", "llm_value", "llm_reasoning",
+                "llm_allocation_C1", "llm_allocation_C2", "M", "own_gain_C1", "own_gain_C2",
+                "friends_gain_C1", "friends_gain_C2", "SF_distance", "EQ_distance", "AL_distance"
+            ]
+        else:
+            self.fieldnames = [
+                "llm_name", "prompt", "llm_value", "llm_reasoning",
+                "coalitions", "llm_allocation", "M", "own_gain", "friends_gain",
+                "SF_distance", "EQ_distance", "AL_distance"
+            ]
         
-        file_exists = os.path.exists(self.csv_file)
-        os.makedirs(os.path.dirname(self.csv_file), exist_ok=True)
-        self.csv_handle = open(self.csv_file, "a", newline="", encoding="utf-8")
-        self.writer = csv.DictWriter(self.csv_handle, fieldnames=self.fieldnames)
-        
-        if not file_exists or os.path.getsize(self.csv_file) == 0:
-            self.writer.writeheader()
-            self.csv_handle.flush()
+        if csv_file is None:
+            # scoring only (offline re-scoring): nothing is written
+            self.csv_handle = self.writer = None
+        elif run_id is not None:
+            # partitioned layout: data/<result_set>/run=<id>/model=<llm>/part-N.csv
+            self.csv_handle = self.writer = PartitionWriter(
+                self.result_set, self.fieldnames, run_id=run_id, model_field="llm_name"
+            )
+        else:
+            file_exists = os.path.exists(self.csv_file)
+            os.makedirs(os.path.dirname(self.csv_file), exist_ok=True)
+            self.csv_handle = open(self.csv_file, "a", newline="", encoding="utf-8")
+            self.writer = csv.DictWriter(self.csv_handle, fieldnames=self.fieldnames)
+
+            if not file_exists or os.path.getsize(self.csv_file) == 0:
+                self.writer.writeheader()
+                self.csv_handle.flush()
 
     def _model_weights(self, model: str, M: float) -> Tuple[float, float]:
-        model = model.upper()
-        if model == "SF":
-            return (M, 1.0)
-        if model == "EQ":
-            return (1.0, 1.0)
-        if model == "AL":
-            return (1.0, M)
-        raise ValueError("Unknown model (use 'SF', 'EQ', 'AL').")
+        w_own, w_f = model_weights([model], M)[0]
+        return (float(w_own), float(w_f))
 
+    def optimal_allocation(self, w_own: float, w_friends: float) -> Dict[str, float]:
+        """Optimal allocation under arbitrary weights on own and friends' payoff."""
+        alloc = optimal_allocations(self.own_vector, self.friends_vector, [(w_own, w_friends)])[0]
+        return dict(zip(self.coalitions, alloc.tolist()))
 
     def optimal_allocation_linear(self, model: str) -> Dict[str, float]:
-        w_own, w_f = self._model_weights(model, self.M)
-        scores = {
-            g: (w_own * self.own_gain.get(g, 0.0) + w_f * self.friends_gain.get(g, 0.0))
-            for g in self.coalitions
-        }
-        maxv = max(scores.values())
-        winners = [g for g, v in scores.items() if abs(v - maxv) < 1e-12]
-
-        alloc = {g: 0.0 for g in self.coalitions}
-        for g in winners:
-            alloc[g] = 100.0 / len(winners)
-        return alloc
+        return self.optimal_allocation(*self._model_weights(model, self.M))
 
 
     def make_project_block(self) -> str:
-        if len(self.coalitions) != 2 or self.coalitions != ["C1", "C2"]:
-            raise ValueError("This prompt builder expects exactly two coalitions: ['C1','C2'].")
+        if not self.classic:
+            return self.make_multi_project_block()
 
         own1 = self.own_gain["C1"]
         own2 = self.own_gain["C2"]
@@ -124,7 +247,26 @@ class GenCoalitionScenario(Game):
         return "\n".join(desc)
 
 
+    def make_multi_project_block(self) -> str:
+        desc = []
+        for g in self.coalitions:
+            own, fr = self.own_gain[g], self.friends_gain[g]
+            parts = []
+            if own != 0:
+                parts.append(f"your payoff = {own:.2f}×(your effort to {g})")
+            if fr != 0:
+                parts.append(f"friends' payoff = {fr:.2f}×(your effort to {g})")
+            desc.append(f"Project {g}:")
+            desc.append("- " + "; ".join(parts) if parts else "- No payoff described.")
+            desc.append("")
+        return "\n".join(desc[:-1])
+
     def build_prompt(self) -> str:
+        if not self.classic:
+            return MULTI_PROMPT_TEMPLATE.format(
+                n_projects=len(self.coalitions), order=", ".join(self.coalitions),
+                project_block=self.make_project_block(),
+            )
         return PROMPT_TEMPLATE.format(project_block=self.make_project_block())
 
 
@@ -149,17 +291,68 @@ class GenCoalitionScenario(Game):
         vals = {g: (100.0 * v / s) for g, v in vals.items()}
         return vals
 
-    def _euclidean_distance(self, v1: Dict[str, float], v2: Dict[str, float]) -> float:
-        keys = v1.keys()
-        return math.sqrt(sum((v1[k] - v2[k]) ** 2 for k in keys))
-
     def evaluate_all_models(self, llm_alloc: Dict[str, float]) -> Dict[str, Dict]:
-        out = {}
-        for model in ["SF", "EQ", "AL"]:
-            pred = self.optimal_allocation_linear(model)
-            dist = self._euclidean_distance(pred, llm_alloc)
-            out[model] = {"prediction": pred, "distance": dist}
-        return out
+        vector = [llm_alloc[g] for g in self.coalitions]
+        distances = allocation_distances([vector], self.predictions)[0]
+        return {
+            model: {"prediction": dict(zip(self.coalitions, pred.tolist())), "distance": float(d)}
+            for model, pred, d in zip(MODELS, self.predictions, distances)
+        }
+
+    def model_distances(self, allocations) -> np.ndarray:
+        """(N, 3) distances of (N, K) allocations to the SF/EQ/AL optima."""
+        return allocation_distances(np.asarray(allocations, dtype=float).reshape(-1, len(self.coalitions)), self.predictions)
+
+    def score_allocations(self, allocations) -> List[Dict]:
+        """
+        Derived result fields for many allocations at once: (N, K) percentages per
+        coalition (NaN rows for unusable answers), the scenario parameters and the
+        distance of each allocation to every model's optimum, computed in one batch.
+        """
+        allocations = np.asarray(allocations, dtype=float).reshape(-1, len(self.coalitions))
+        distances = self.model_distances(allocations)
+        rows = []
+        for alloc, dist in zip(allocations.tolist(), distances.tolist()):
+            if self.classic:
+                row = {
+                    "llm_allocation_C1": alloc[0],
+                    "llm_allocation_C2": alloc[1],
+                    "M": self.M,
+                    "own_gain_C1": self.own_gain["C1"],
+                    "own_gain_C2": self.own_gain["C2"],
+                    "friends_gain_C1": self.friends_gain["C1"],
+                    "friends_gain_C2": self.friends_gain["C2"],
+                }
+            else:
+                row = {
+                    "coalitions": ":".join(self.coalitions),
+                    "llm_allocation": joined_vector(alloc),
+                    "M": self.M,
+                    "own_gain": joined_vector(self.own_vector),
+                    "friends_gain": joined_vector(self.friends_vector),
+                }
+            row.update({f"{model}_distance": d for model, d in zip(MODELS, dist)})
+            rows.append(row)
+        return rows
+
+    def score_allocation(self, c1_percentage: float) -> Dict:
+        """
+        Derived result fields for an allocation of `c1_percentage` to C1 (the rest to C2):
+        the allocation, the scenario parameters and the distance to each model's optimum.
+        Used by simulate_game and by offline re-scoring (helper/data/rescore.py).
+        """
+        return self.score_allocations([[c1_percentage, 100 - c1_percentage]])[0]
+
+    def _ask(self, llm, prompt):
+        """(raw value, reasoning, allocation vector) of one model's answer."""
+        if self.classic:
+            value, reasoning = self._call_llm(llm, prompt)
+            # Convert the structured value to allocation percentages, clamped between 0 and 100
+            c1 = max(0, min(100, value))
+            return value, reasoning, [c1, 100 - c1]
+        answer = dict(llm.ask_with_custom_format(prompt, GenCoalitionAllocationFormat))
+        values = answer.get("allocations") or []
+        return joined_vector(values), answer.get("reasoning", ""), normalize_allocation(values, len(self.coalitions))
 
     def _call_llm(self, llm, prompt) -> tuple[int, str]:
         """Call a specific LLM and return (value, reasoning) tuple"""
@@ -173,49 +366,46 @@ class GenCoalitionScenario(Game):
         self.results = []
         
         def ask_model(llm):
-            value, reasoning = self._call_llm(llm, prompt)
-            
-            # Convert the structured value to allocation percentages
-            c1_percentage = max(0, min(100, value))  # Clamp between 0 and 100
-            c2_percentage = 100 - c1_percentage
-            
-            llm_allocation = {
-                "C1": c1_percentage,
-                "C2": c2_percentage
-            }
-            
-            # Evaluate against different models
-            model_evals = self.evaluate_all_models(llm_allocation)
-            
+            return llm, self._ask(llm, prompt)
+
+        # Run LLM requests in parallel threads
+        with ThreadPoolExecutor(max_workers=len(self.llms)) as executor:
+            answers = [future.result() for future in as_completed([executor.submit(ask_model, llm) for llm in self.llms])]
+
+        # score every answer in one batch, then write
+        scores = self.score_allocations([alloc for _, (_, _, alloc) in answers])
+        for (llm, (value, reasoning, _)), fields in zip(answers, scores):
             result = {
                 "llm_name": llm.get_model_name(),
                 "prompt": prompt.replace("\n", " ").replace(",", " "),
                 "llm_value": value,
                 "llm_reasoning": reasoning.replace("\n", " ").replace(",", " "),
-                "llm_allocation_C1": llm_allocation["C1"],
-                "llm_allocation_C2": llm_allocation["C2"],
-                "M": self.M,
-                "own_gain_C1": self.own_gain["C1"],
-                "own_gain_C2": self.own_gain["C2"],
-                "friends_gain_C1": self.friends_gain["C1"],
-                "friends_gain_C2": self.friends_gain["C2"],
-                "SF_distance": model_evals["SF"]["distance"],
-                "EQ_distance": model_evals["EQ"]["distance"],
-                "AL_distance": model_evals["AL"]["distance"]
+                **fields
             }
-            
-            # Write to CSV
             self.writer.writerow(result)
-            self.csv_handle.flush()
-            
-            return result
-        
-        # Run LLM requests in parallel threads
+            self.results.append(result)
+        self.csv_handle.flush()
+
+    def simulate_formation(self, rounds: int = 5) -> Dict[str, "FormationResult"]:
+        """
+        Let all four agents allocate effort every round, scored against the least core
+        and Shapley value of the induced cooperative game. With LLMs, each model plays
+        all agents in its own run; without, every agent plays each behavioural model.
+
+        :return: model name (or SF/EQ/AL) -> FormationResult
+        """
+        # the formation module builds on this one's scoring helpers
+        from helper.game.gen_coalition_formation import AGENTS, llm_player, model_player, run_formation
+
+        if not self.llms:
+            return {model: run_formation(self, {a: model_player(model) for a in AGENTS}, rounds) for model in MODELS}
+
+        def play(llm):
+            policy = llm_player(self, llm)
+            return llm.get_model_name(), run_formation(self, {a: policy for a in AGENTS}, rounds)
+
         with ThreadPoolExecutor(max_workers=len(self.llms)) as executor:
-            future_to_llm = {executor.submit(ask_model, llm): llm for llm in self.llms}
-            for future in as_completed(future_to_llm):
-                result = future.result()
-                self.results.append(result)
+            return dict(executor.map(play, self.llms))
 
     def get_results(self) -> List[Dict]:
         return self.results if hasattr(self, 'results') else []
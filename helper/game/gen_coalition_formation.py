@@ -0,0 +1,291 @@
+"""
+Multi-agent coalition formation for the gen coalition scenario.
+
+In GenCoalitionScenario only Agent 1 decides. Here all four agents of the
+scenario are players and every round they allocate their 100 units of effort
+across the coalitions at the same time, each seeing the allocations of the
+previous round. A player is a policy (state, agent) -> allocation vector:
+model_player plays a behavioural model (SF, EQ, AL) from the agent's point of
+view; llm_player asks a model with a prompt written for that agent.
+
+Friendships are the ones the scenario states (Agent 1 with Agent 2 and with
+Agent 3; Agent 4 is neutral). Effort e_ic of agent i to coalition c pays i
+own_gain_c * e_ic, and pays friends_gain_c * e_ic to i's friends, shared
+equally among them.
+
+The induced cooperative game gives every group S of agents the most they can
+secure together, with all their effort going to the members of S:
+
+    v(S) = sum over i in S of 100 * max_c (own_gain_c + friends_gain_c * |F_i ∩ S| / |F_i|)
+
+Its Shapley value is computed exactly over the 2^n coalitions. Its least core
+comes from one scipy.optimize.linprog call:
+
+    min eps  s.t.  sum_{i in S} x_i >= v(S) - eps  for every proper S,  sum_i x_i = v(N)
+
+The core is non-empty when eps <= 0, and the LP solution is then a core
+allocation. The cooperative game depends only on the coalitions and gains, so
+its baseline is cached by that parameter tuple. Every round of every
+repetition of a config is compared with the same baseline. A round's realized
+payoffs are judged by their largest excess v(S) - sum_{i in S} payoff_i: a
+positive excess means S would do better on its own.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from math import factorial
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.optimize import linprog
+
+from helper.game.gen_coalition import (GenCoalitionAllocationFormat, model_weights, normalize_allocation,
+                                       optimal_allocations)
+
+AGENTS = ("Agent 1", "Agent 2", "Agent 3", "Agent 4")
+FRIENDSHIPS = (("Agent 1", "Agent 2"), ("Agent 1", "Agent 3"))
+
+
+def friends_of(agent: str) -> Tuple[str, ...]:
+    return tuple(b if a == agent else a for a, b in FRIENDSHIPS if agent in (a, b))
+
+
+# (round state, agent) -> the agent's allocation over the coalitions, in percent
+Player = Callable[["FormationState", str], Sequence[float]]
+
+
+@dataclass(frozen=True)
+class FormationState:
+    coalitions: Tuple[str, ...]
+    own_gain: np.ndarray
+    friends_gain: np.ndarray
+    M: float
+    round: int
+    # agent -> allocation of the previous round (None in the first round)
+    previous: Optional[Dict[str, np.ndarray]]
+
+
+# -------------------
+# Cooperative game
+# -------------------
+@dataclass(frozen=True)
+class CoalitionBaseline:
+    agents: Tuple[str, ...]
+    # v(S) of every coalition, by member mask over `agents`
+    values: Tuple[float, ...]
+    shapley: Tuple[float, ...]
+    # least-core allocation; a core allocation when epsilon <= 0
+    core: Tuple[float, ...]
+    epsilon: float
+
+    @property
+    def core_nonempty(self) -> bool:
+        return self.epsilon <= 1e-9
+
+    def max_excess(self, payoffs: Sequence[float]) -> Tuple[float, int]:
+        """Largest v(S) - sum of S's payoffs over the non-empty coalitions, and the mask of that S."""
+        best, arg = float("-inf"), 0
+        for mask in range(1, len(self.values)):
+            excess = self.values[mask] - sum(p for i, p in enumerate(payoffs) if mask >> i & 1)
+            if excess > best:
+                best, arg = excess, mask
+        return best, arg
+
+    def names_of(self, mask: int) -> List[str]:
+        return [a for i, a in enumerate(self.agents) if mask >> i & 1]
+
+
+_baselines: Dict[Tuple, CoalitionBaseline] = {}
+
+
+def coalition_value(own_gain: np.ndarray, friends_gain: np.ndarray, members: Sequence[str]) -> float:
+    inside = set(members)
+    total = 0.0
+    for agent in members:
+        friends = friends_of(agent)
+        share = len(inside.intersection(friends)) / len(friends) if friends else 0.0
+        total += 100.0 * float(np.max(own_gain + friends_gain * share))
+    return total
+
+
+def _shapley(values: Sequence[float], n: int) -> Tuple[float, ...]:
+    phi = [0.0] * n
+    for mask in range(1 << n):
+        size = bin(mask).count("1")
+        for i in range(n):
+            if not mask >> i & 1:
+                weight = factorial(size) * factorial(n - size - 1) / factorial(n)
+                phi[i] += weight * (values[mask | 1 << i] - values[mask])
+    return tuple(phi)
+
+
+def _least_core(values: Sequence[float], n: int) -> Tuple[Tuple[float, ...], float]:
+    # variables x_1..x_n, eps; minimise eps
+    c = np.zeros(n + 1)
+    c[-1] = 1.0
+    rows, bounds = [], []
+    for mask in range(1, (1 << n) - 1):
+        rows.append([-1.0 if mask >> i & 1 else 0.0 for i in range(n)] + [-1.0])
+        bounds.append(-values[mask])
+    result = linprog(c, A_ub=np.array(rows), b_ub=np.array(bounds),
+                     A_eq=np.array([[1.0] * n + [0.0]]), b_eq=np.array([values[-1]]),
+                     bounds=[(None, None)] * (n + 1), method="highs")
+    if not result.success:
+        raise RuntimeError(f"Least-core LP failed: {result.message}")
+    return tuple(float(x) for x in result.x[:n]), float(result.x[-1])
+
+
+def coalition_baseline(coalitions: Sequence[str], own_gain: Sequence[float],
+                       friends_gain: Sequence[float]) -> CoalitionBaseline:
+    """Shapley value and least core of the induced cooperative game (cached per parameter tuple)."""
+    key = (tuple(coalitions), tuple(float(g) for g in own_gain), tuple(float(g) for g in friends_gain))
+    if key not in _baselines:
+        own, friends = np.array(key[1]), np.array(key[2])
+        n = len(AGENTS)
+        values = tuple(coalition_value(own, friends, [a for i, a in enumerate(AGENTS) if mask >> i & 1])
+                       for mask in range(1 << n))
+        core, epsilon = _least_core(values, n)
+        _baselines[key] = CoalitionBaseline(AGENTS, values, _shapley(values, n), core, epsilon)
+    return _baselines[key]
+
+
+# -------------------
+# Players
+# -------------------
+def _friends_weight(agent: str) -> float:
+    # an agent without friends gets nothing out of friends' payoff
+    return 1.0 if friends_of(agent) else 0.0
+
+
+def model_player(model: str) -> Player:
+    """Policy of a behavioural model (SF, EQ, AL) for any agent: its optimal allocation."""
+    def policy(state: FormationState, agent: str) -> Sequence[float]:
+        weights = model_weights([model], state.M)
+        return optimal_allocations(state.own_gain, state.friends_gain * _friends_weight(agent), weights)[0]
+    return policy
+
+
+FORMATION_PROMPT_TEMPLATE = """
+You are {agent}.
+
+There are four agents: {agents}.
+{friendship}
+
+Every agent has 100 units of effort to allocate across the following {n_projects} projects.
+Effort pays the agent who gives it its own payoff, and pays its friends' payoff shared equally among that agent's friends.
+
+{project_block}
+{history}
+Choose how much of your effort to allocate to each project as percentages (0-100) that sum to 100.
+
+Respond with:
+- A list of {n_projects} percentages, one per project in the order {order}
+- Your reasoning for this allocation choice
+"""
+
+
+def make_prompt(game, state: FormationState, agent: str) -> str:
+    friends = friends_of(agent)
+    friendship = f"You are friends with {' and '.join(friends)}." if friends else "You have no friends among them."
+    neutral = [a for a in AGENTS if a != agent and a not in friends]
+    if neutral and friends:
+        friendship += f" {' and '.join(neutral)} {'is' if len(neutral) == 1 else 'are'} neutral."
+    history = ""
+    if state.previous is not None:
+        lines = [f"- {a}: " + ", ".join(f"{c} {v:.0f}%" for c, v in zip(state.coalitions, state.previous[a]))
+                 for a in AGENTS]
+        history = f"\nLast round's allocations:\n" + "\n".join(lines) + "\n"
+    return FORMATION_PROMPT_TEMPLATE.format(
+        agent=agent, agents=", ".join(AGENTS), friendship=friendship, n_projects=len(state.coalitions),
+        project_block=game.make_multi_project_block(), history=history, order=", ".join(state.coalitions),
+    )
+
+
+def llm_player(game, llm) -> Player:
+    """
+    Policy asking `llm` for the agent's allocation; an unusable answer keeps last round's (or splits evenly).
+    The agents answer in parallel, so each one asks its own fork of `llm` (LLM.fork) and keeps its own history.
+    """
+    agent_llms = {a: llm.fork() for a in AGENTS}
+
+    def policy(state: FormationState, agent: str) -> Sequence[float]:
+        prompt = make_prompt(game, state, agent)
+        answer = dict(agent_llms[agent].ask_with_custom_format(prompt, GenCoalitionAllocationFormat))
+        alloc = normalize_allocation(answer.get("allocations") or [], len(state.coalitions))
+        if np.isnan(alloc).any():
+            k = len(state.coalitions)
+            return state.previous[agent] if state.previous is not None else np.full(k, 100.0 / k)
+        return alloc
+    return policy
+
+
+# -------------------
+# Rounds
+# -------------------
+def payoffs(own_gain: np.ndarray, friends_gain: np.ndarray, allocations: np.ndarray) -> np.ndarray:
+    """Payoff of every agent from the (agents x coalitions) allocation matrix, in percent of effort."""
+    share = np.zeros((len(AGENTS), len(AGENTS)))
+    for i, agent in enumerate(AGENTS):
+        friends = friends_of(agent)
+        for f in friends:
+            share[i, AGENTS.index(f)] = 1.0 / len(friends)
+    return allocations @ own_gain + share.T @ (allocations @ friends_gain)
+
+
+@dataclass
+class FormationRound:
+    round: int
+    allocations: Dict[str, List[float]]
+    payoffs: Dict[str, float]
+    welfare: float
+    # v(S) - payoffs of S for the S where it is largest, and that S
+    max_excess: float
+    blocking: List[str]
+    # Euclidean distance of the payoffs to the Shapley value / least-core allocation
+    shapley_distance: float
+    core_distance: float
+
+
+@dataclass
+class FormationResult:
+    baseline: CoalitionBaseline
+    rounds: List[FormationRound] = field(default_factory=list)
+
+    @property
+    def final(self) -> FormationRound:
+        return self.rounds[-1]
+
+
+def run_formation(game, players: Optional[Mapping[str, Player]] = None, rounds: int = 1) -> FormationResult:
+    """
+    :param game: GenCoalitionScenario whose coalitions, gains and M are played
+    :param players: agent -> policy; agents without one play model_player("SF")
+    :param rounds: rounds of simultaneous allocations
+    """
+    players = players or {}
+    default = model_player("SF")
+    own, friends = np.asarray(game.own_vector, dtype=float), np.asarray(game.friends_vector, dtype=float)
+    baseline = coalition_baseline(game.coalitions, own, friends)
+    result = FormationResult(baseline)
+    previous = None
+
+    with ThreadPoolExecutor(max_workers=len(AGENTS)) as executor:
+        for rnd in range(1, rounds + 1):
+            state = FormationState(tuple(game.coalitions), own, friends, game.M, rnd, previous)
+            answers = list(executor.map(lambda a: players.get(a, default)(state, a), AGENTS))
+            allocations = np.array(answers, dtype=float)
+            pay = payoffs(own, friends, allocations)
+            excess, mask = baseline.max_excess(pay)
+            result.rounds.append(FormationRound(
+                round=rnd,
+                allocations={a: allocations[i].tolist() for i, a in enumerate(AGENTS)},
+                payoffs={a: float(pay[i]) for i, a in enumerate(AGENTS)},
+                welfare=float(pay.sum()),
+                max_excess=excess,
+                blocking=baseline.names_of(mask) if excess > 1e-9 else [],
+                shapley_distance=float(np.linalg.norm(pay - np.array(baseline.shapley))),
+                core_distance=float(np.linalg.norm(pay - np.array(baseline.core))),
+            ))
+            previous = {a: allocations[i] for i, a in enumerate(AGENTS)}
+    return result
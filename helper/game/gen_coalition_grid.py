@@ -0,0 +1,251 @@
+"""
+Precomputed GenCoalition predictions over parameter grids.
+
+A sweep over M and the per-coalition gains is a grid: one sorted axis of values
+per parameter (M, own_gain_<c>, friends_gain_<c> for every coalition c). All
+of its points are evaluated in one broadcast instead of one scenario at a
+time: for every point and every model (SF, EQ, AL) the scores of all
+coalitions give
+
+- the optimal allocation (everything to the argmax, split evenly on ties), the
+  same as GenCoalitionScenario.optimal_allocation_linear;
+- the margin between the best and the runner-up coalition. A margin of 0 puts
+  the point on the model's indifference boundary, where the prediction flips.
+
+Points where the three models predict the same allocation cannot tell them
+apart from the answer, so only the informative points (models disagree) are
+emitted as config rows. The grid is saved as a compressed .npz lookup table;
+scoring a result then means finding its grid point and measuring the distances
+to stored predictions, with no per-scenario optimisation:
+
+    grid = prediction_grid(M=[1, 1.5, 2, 3], own_gain_C1=np.linspace(0, 2, 9), own_gain_C2=[0, 0.5],
+                           friends_gain_C1=[0], friends_gain_C2=np.linspace(0, 2, 9))
+    grid.save("data/gen_coalition_grid.npz")
+    write_configs(grid.config_rows(simulate_rounds=5), "config/GenCoalitionGrid.csv")
+    scored = load_grid("data/gen_coalition_grid.npz").score_frame(results)
+
+    python -m helper.game.gen_coalition_grid data/gen_coalition_grid.npz --config config/GenCoalitionGrid.csv \
+        --axis M=1,1.5,2,3 --axis own_gain_C1=0:2:9 --axis own_gain_C2=0,0.5 --axis friends_gain_C1=0 --axis friends_gain_C2=0:2:9
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from helper.game.gen_coalition import MODELS, TIE_TOLERANCE, model_scores, model_weights, parse_vector
+
+
+def grid_params(coalitions: Sequence[str]) -> List[str]:
+    """Parameters of a grid over `coalitions`, in axis order."""
+    return ["M"] + [f"own_gain_{c}" for c in coalitions] + [f"friends_gain_{c}" for c in coalitions]
+
+
+@dataclass(frozen=True)
+class PredictionGrid:
+    coalitions: Tuple[str, ...]
+    # parameter -> sorted unique values, in grid_params order
+    axes: Dict[str, np.ndarray]
+    # (*grid, 3, K) optimal allocation of SF, EQ, AL at every point
+    predictions: np.ndarray
+    # (*grid, 3) best minus runner-up score; 0 on a model's indifference boundary
+    margins: np.ndarray
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.predictions.shape[:-2]
+
+    @property
+    def informative(self) -> np.ndarray:
+        """(*grid) points where the models do not all predict the same allocation."""
+        p = self.predictions
+        return ~(np.isclose(p[..., 1:, :], p[..., :1, :]).all(axis=(-2, -1)))
+
+    @property
+    def indifferent(self) -> np.ndarray:
+        """(*grid, 3) points on each model's indifference boundary."""
+        return self.margins < TIE_TOLERANCE
+
+    # -------------------
+    # Lookup
+    # -------------------
+    def index_of(self, params: Dict[str, np.ndarray]) -> Tuple[np.ndarray, ...]:
+        """Grid index arrays of the points with these parameter values; ValueError off the grid."""
+        index = []
+        for name, axis in self.axes.items():
+            if name not in params:
+                raise ValueError(f"Missing grid parameter {name!r}")
+            v = np.asarray(params[name], dtype=float)
+            i = np.clip(np.searchsorted(axis, v), 0, len(axis) - 1)
+            lower = np.clip(i - 1, 0, len(axis) - 1)
+            i = np.where(np.abs(axis[lower] - v) < np.abs(axis[i] - v), lower, i)
+            off = ~np.isclose(axis[i], v)
+            if off.any():
+                raise ValueError(f"{name}={float(v[off].ravel()[0])} is not on the grid")
+            index.append(i)
+        return tuple(np.broadcast_arrays(*index))
+
+    def lookup(self, **params) -> np.ndarray:
+        """(..., 3, K) stored predictions at the given parameter values."""
+        return self.predictions[self.index_of(params)]
+
+    def distances(self, allocations, **params) -> np.ndarray:
+        """(N, 3) distances of (N, K) allocations to the SF/EQ/AL predictions at their points."""
+        k = len(self.coalitions)
+        return allocation_distances_at(np.asarray(allocations, dtype=float).reshape(-1, k),
+                                       self.lookup(**params).reshape(-1, len(MODELS), k))
+
+    def score_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        `df` (result rows with their allocation and the grid parameters, e.g. a loaded
+        gen_coalition or gen_coalition_multi frame) with SF/EQ/AL_distance recomputed by lookup.
+        gen_coalition rows hold llm_allocation_<c> and the parameters as columns;
+        gen_coalition_multi rows hold the llm_allocation, own_gain and friends_gain
+        vectors as "a:b:c" strings in the order of their coalitions column.
+        """
+        if "llm_allocation" in df.columns:
+            params, allocations = self._vector_columns(df)
+        else:
+            params = {name: df[name].to_numpy(dtype=float) for name in self.axes}
+            allocations = df[[f"llm_allocation_{c}" for c in self.coalitions]].to_numpy(dtype=float)
+        index = self.index_of(params)
+        distances = allocation_distances_at(allocations, self.predictions[index])
+        out = df.copy()
+        for k, model in enumerate(MODELS):
+            out[f"{model}_distance"] = distances[:, k]
+        return out
+
+    def _vector_columns(self, df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """(grid parameters, (N, K) allocations) of gen_coalition_multi rows."""
+        order = ":".join(self.coalitions)
+        if "coalitions" in df.columns and (df["coalitions"] != order).any():
+            other = df.loc[df["coalitions"] != order, "coalitions"].iloc[0]
+            raise ValueError(f"Rows over coalitions {other!r} do not fit a grid over {order!r}")
+        k = len(self.coalitions)
+
+        def vectors(column):
+            return np.array([parse_vector(v, k) for v in df[column]], dtype=float).reshape(-1, k)
+
+        own, friends = vectors("own_gain"), vectors("friends_gain")
+        params = {"M": df["M"].to_numpy(dtype=float)}
+        params.update({f"own_gain_{c}": own[:, j] for j, c in enumerate(self.coalitions)})
+        params.update({f"friends_gain_{c}": friends[:, j] for j, c in enumerate(self.coalitions)})
+        return params, vectors("llm_allocation")
+
+    # -------------------
+    # Config rows
+    # -------------------
+    def points(self, informative_only: bool = True) -> pd.DataFrame:
+        """Grid points as rows of parameter values (informative ones only by default)."""
+        mask = self.informative if informative_only else np.ones(self.shape, dtype=bool)
+        index = np.nonzero(mask)
+        return pd.DataFrame({name: axis[i] for (name, axis), i in zip(self.axes.items(), index)})
+
+    def config_rows(self, simulate_rounds: int = 1, informative_only: bool = True) -> List[Dict]:
+        """GenCoalition config rows (config/GenCoalition.csv columns) for the grid points."""
+        coalitions = str(list(self.coalitions))
+        return [
+            {
+                "simulate_rounds": simulate_rounds,
+                "coalitions": coalitions,
+                **{f"own_gain_{c}": p[f"own_gain_{c}"] for c in self.coalitions},
+                **{f"friends_gain_{c}": p[f"friends_gain_{c}"] for c in self.coalitions},
+                "M": p["M"],
+            }
+            for p in self.points(informative_only).to_dict("records")
+        ]
+
+    # -------------------
+    # Persistence
+    # -------------------
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path, coalitions=np.array(self.coalitions), predictions=self.predictions, margins=self.margins,
+            **{f"axis_{name}": axis for name, axis in self.axes.items()},
+        )
+
+
+def allocation_distances_at(allocations, predictions) -> np.ndarray:
+    """(N, 3) distances of each allocation (N, K) to its own predictions (N, 3, K)."""
+    a = np.asarray(allocations, dtype=float)
+    return np.sqrt(((a[:, None, :] - predictions) ** 2).sum(axis=-1))
+
+
+def prediction_grid(coalitions: Sequence[str] = ("C1", "C2"), **axes) -> PredictionGrid:
+    """
+    Predictions and indifference margins over the full grid of `axes`, one broadcast.
+
+    :param axes: a sequence of values for every parameter of grid_params(coalitions)
+    """
+    coalitions = tuple(coalitions)
+    params = grid_params(coalitions)
+    missing, unknown = set(params) - set(axes), set(axes) - set(params)
+    if missing or unknown:
+        raise ValueError(f"Grid over {list(coalitions)} needs axes {params}; missing {sorted(missing)}, unknown {sorted(unknown)}")
+    values = {name: np.unique(np.asarray(axes[name], dtype=float).ravel()) for name in params}
+    mesh = dict(zip(params, np.meshgrid(*values.values(), indexing="ij", sparse=True)))
+
+    k = len(coalitions)
+    own = np.stack(np.broadcast_arrays(*(mesh[f"own_gain_{c}"] for c in coalitions)), axis=-1)
+    friends = np.stack(np.broadcast_arrays(*(mesh[f"friends_gain_{c}"] for c in coalitions)), axis=-1)
+    # (*grid, 3, K): every model's score of every coalition at every point
+    scores = model_scores(own, friends, model_weights(MODELS, mesh["M"]))
+
+    best = scores.max(axis=-1, keepdims=True)
+    winners = np.abs(scores - best) < TIE_TOLERANCE
+    predictions = 100.0 * winners / winners.sum(axis=-1, keepdims=True)
+    if k > 1:
+        ranked = np.sort(scores, axis=-1)
+        margins = ranked[..., -1] - ranked[..., -2]
+    else:
+        margins = np.full(scores.shape[:-1], np.inf)
+    return PredictionGrid(coalitions, values, predictions, margins)
+
+
+def load_grid(path: str) -> PredictionGrid:
+    with np.load(path, allow_pickle=False) as data:
+        coalitions = tuple(str(c) for c in data["coalitions"])
+        axes = {name: data[f"axis_{name}"] for name in grid_params(coalitions)}
+        return PredictionGrid(coalitions, axes, data["predictions"], data["margins"])
+
+
+def write_configs(rows: List[Dict], path: str) -> int:
+    if not rows:
+        return 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return len(rows)
+
+
+def _axis(text: str) -> Tuple[str, np.ndarray]:
+    """"name=a,b,c" (values) or "name=start:stop:num" (evenly spaced)."""
+    name, _, spec = text.partition("=")
+    if ":" in spec:
+        start, stop, num = spec.split(":")
+        return name, np.linspace(float(start), float(stop), int(num))
+    return name, np.array([float(v) for v in spec.split(",")])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute GenCoalition SF/EQ/AL predictions over a parameter grid.")
+    parser.add_argument("table", help="output .npz lookup table")
+    parser.add_argument("--coalitions", default="C1,C2", help="comma-separated coalition names")
+    parser.add_argument("--axis", action="append", type=_axis, default=[],
+                        help="name=a,b,c or name=start:stop:num, once per grid parameter")
+    parser.add_argument("--config", default=None, help="also write config rows for the informative points to this CSV")
+    parser.add_argument("--simulate-rounds", type=int, default=1)
+    parser.add_argument("--all-points", action="store_true", help="config rows for every point, not only informative ones")
+    args = parser.parse_args()
+
+    grid = prediction_grid(args.coalitions.split(","), **dict(args.axis))
+    grid.save(args.table)
+    print(f"{int(np.prod(grid.shape))} grid points, {int(grid.informative.sum())} informative; table written to {args.table}")
+    if args.config:
+        n = write_configs(grid.config_rows(args.simulate_rounds, informative_only=not args.all_points), args.config)
+        print(f"Wrote {n} config rows to {args.config}")
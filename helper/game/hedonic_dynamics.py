@@ -0,0 +1,191 @@
+"""
+Multi-agent dynamics for the hedonic game.
+
+Every agent of the partition is a player: a policy (world, agent) -> target
+group, where the agent's current group means stay and None means leave to be
+alone. best_response is the scripted player (move to the group, or solitude,
+with the strictly highest utility); llm_player asks a model with the
+HedonicGame prompt of that agent. Players move in turns ("sequential", each
+move seen by the next player) or all at once per round ("simultaneous").
+
+Only agents whose options changed are asked again: when agent i moves from
+group A to group B, the utilities that change are those of the members of A
+and B and the value of joining A or B for anyone who counts i as friend or
+enemy, so those agents become dirty and everyone else keeps their last
+answer. A round asks every dirty agent once; the dynamics have converged when
+a round moves nobody, which under best_response is a Nash-stable partition.
+
+After each round the partition (as a set of member masks, group names aside)
+is hashed into a history; reaching a partition seen before ends the run as a
+cycle.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from helper.game.hedonic_world import HedonicWorld
+
+# (world, agent) -> group to be in: current group = stay, None = alone
+Policy = Callable[[HedonicWorld, str], Optional[str]]
+
+MODES = ("sequential", "simultaneous")
+
+
+@dataclass
+class Move:
+    round: int
+    agent: str
+    source: Optional[str]
+    target: str
+    # utility of the mover after minus before
+    gain: float
+
+
+@dataclass
+class DynamicsResult:
+    initial: HedonicWorld
+    final: HedonicWorld
+    rounds: int
+    converged: bool
+    # last round in which an agent moved (0 when the initial partition was already stable)
+    convergence_round: Optional[int]
+    # (round the repeated partition was first seen, cycle length in rounds)
+    cycle: Optional[Tuple[int, int]]
+    moves: List[Move] = field(default_factory=list)
+
+    @property
+    def partition(self) -> Dict[str, List[str]]:
+        return self.final.to_groups()
+
+    @property
+    def nash_stable(self) -> bool:
+        return is_nash_stable(self.final)
+
+
+# -------------------
+# Players
+# -------------------
+def best_response(world: HedonicWorld, agent: str) -> Optional[str]:
+    """Group with the strictly highest utility for `agent` (ties keep the current one), None for alone."""
+    prefs = world.prefs
+    i = prefs.index[agent]
+    bit = 1 << i
+    cur = world.slot_of[i]
+    best_u = prefs.utility_in(i, world.members[cur]) if cur >= 0 else 0.0
+    best = world.names[cur] if cur >= 0 else None
+
+    alone = prefs.utility_in(i, bit)
+    if alone > best_u and not (cur >= 0 and world.members[cur] == bit):
+        best_u, best = alone, None
+    for slot, (name, members) in enumerate(zip(world.names, world.members)):
+        if not members or slot == cur:
+            continue
+        u = prefs.utility_in(i, members | bit)
+        if u > best_u:
+            best_u, best = u, name
+    return best
+
+
+def llm_player(game, llm) -> Policy:
+    """
+    Policy asking `llm` with `game`'s prompt rendered for the agent and world at hand,
+    in the game's action space; an invalid answer stays. Each agent asks its own fork
+    of `llm` (LLM.fork), so no agent's prompts end up in another agent's history.
+    """
+    agent_llms = {a: llm.fork() for a in game.world.prefs.agents}
+
+    def policy(world: HedonicWorld, agent: str) -> Optional[str]:
+        view = game.with_world(world)
+        value, _ = view._call_llm(agent_llms[agent], view.make_prompt(agent))
+        return view.action_target(view.action_of(value, agent) or "STAY", agent)
+    return policy
+
+
+def is_nash_stable(world: HedonicWorld) -> bool:
+    """No agent in a group strictly prefers another group or being alone."""
+    return all(best_response(world, a) == world.group_of(a)
+               for a, slot in zip(world.prefs.agents, world.slot_of) if slot >= 0)
+
+
+# -------------------
+# Engine
+# -------------------
+def _watchers(world: HedonicWorld) -> Tuple[int, ...]:
+    """Per agent i, the mask of agents j with i among their friends or enemies."""
+    prefs = world.prefs
+    return tuple(f | e for f, e in zip(prefs.friended_by, prefs.enemied_by))
+
+
+def _state(world: HedonicWorld) -> int:
+    return hash(frozenset(m for m in world.members if m))
+
+
+def _is_stay(world: HedonicWorld, agent: str, target: Optional[str]) -> bool:
+    i = world.prefs.index[agent]
+    cur = world.slot_of[i]
+    if target is None:
+        # leaving a group you are alone in changes nothing
+        return cur >= 0 and world.members[cur] == 1 << i
+    return cur >= 0 and world.names[cur] == target
+
+
+def run_dynamics(world: HedonicWorld, players: Optional[Mapping[str, Policy]] = None,
+                 mode: str = "sequential", max_rounds: int = 100) -> DynamicsResult:
+    """
+    :param world: starting partition
+    :param players: agent -> policy; agents without one play best_response
+    :param mode: "sequential" (turns, in agent order) or "simultaneous" (everyone answers the same world)
+    :param max_rounds: rounds before giving up without convergence
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}; expected one of {MODES}")
+    players = players or {}
+    prefs = world.prefs
+    watchers = _watchers(world)
+    in_play = 0
+    for i, slot in enumerate(world.slot_of):
+        if slot >= 0:
+            in_play |= 1 << i
+
+    result = DynamicsResult(initial=world, final=world, rounds=0, converged=False,
+                            convergence_round=None, cycle=None)
+    history = {_state(world): 0}
+    dirty = in_play
+    last_move_round = 0
+
+    for rnd in range(1, max_rounds + 1):
+        result.rounds = rnd
+        asked = prefs.names_of(dirty & in_play)
+        dirty = 0
+        decisions = [(a, players.get(a, best_response)(world, a)) for a in asked] if mode == "simultaneous" else None
+
+        moved = False
+        for k, agent in enumerate(asked):
+            target = decisions[k][1] if decisions is not None else players.get(agent, best_response)(world, agent)
+            if _is_stay(world, agent, target):
+                continue
+            i = prefs.index[agent]
+            source, before = world.group_of(agent), world.utility(agent)
+            src_slot = world.slot_of[i]
+            world = world.move(agent, target)
+            dst_slot = world.slot_of[i]
+            result.moves.append(Move(rnd, agent, source, world.names[dst_slot], world.utility(agent) - before))
+            dirty |= world.members[dst_slot] | watchers[i]
+            if src_slot >= 0:
+                dirty |= world.members[src_slot]
+            moved = True
+
+        result.final = world
+        if not moved:
+            result.converged = True
+            result.convergence_round = last_move_round
+            break
+        last_move_round = rnd
+
+        state = _state(world)
+        if state in history:
+            result.cycle = (history[state], rnd - history[state])
+            break
+        history[state] = rnd
+    return result
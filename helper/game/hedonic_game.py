@@ -1,28 +1,41 @@
 # altruism_game.py
 from __future__ import annotations
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Dict, List, Set, Tuple, Optional, Union
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from helper.data.hedonic_summary import altruism_by_model, altruism_summary
+from helper.data.partitions import PartitionWriter, select_partitions
+from helper.game.configs import HedonicConfig
 from helper.game.game import Game
+from helper.game.hedonic_dynamics import DynamicsResult, llm_player, run_dynamics
+from helper.game.hedonic_solver import stability_report
+from helper.game.hedonic_world import HedonicWorld
 
 load_dotenv()
 
-import ast
+import copy
 import csv
 import os
 
+
 class HedonicGame(Game):
-    def __init__(self, config_dict: Dict, llms=[], csv_file="data/hedonic_game_results.csv") -> None:
-        # Parse config from CSV
-        self.agent = config_dict['agent']
-        self.groups: Dict[str, List[str]] = ast.literal_eval(config_dict['groups'])
-        self.friends: Dict[str, Set[str]] = {k: set(v) for k, v in ast.literal_eval(config_dict['friends']).items()}
-        self.enemies: Dict[str, Set[str]] = {k: set(v) for k, v in ast.literal_eval(config_dict['enemies']).items()}
-        self.w_friend: float = float(config_dict['w_friend'])
-        self.w_enemy: float = float(config_dict['w_enemy'])
+    config_type = HedonicConfig
+
+    def __init__(self, config_dict: Union[HedonicConfig, Dict], llms=[], csv_file: Optional[str] = "data/hedonic_game_results.csv", run_id: Optional[str] = None) -> None:
+        # parsed once per config file (helper/game/configs.py); raw rows are parsed here
+        self.config: HedonicConfig = HedonicConfig.coerce(config_dict)
+        self.agent = self.config.agent
+        self.groups: Dict[str, List[str]] = {k: list(v) for k, v in self.config.groups}
+        self.friends: Dict[str, Set[str]] = {k: set(v) for k, v in self.config.friends}
+        self.enemies: Dict[str, Set[str]] = {k: set(v) for k, v in self.config.enemies}
+        self.w_friend: float = self.config.w_friend
+        self.w_enemy: float = self.config.w_enemy
+        # bitset partition and preferences that all utilities and moves are computed on
+        self.world = self.config.world
+        # "stay_leave": STAY or LEAVE to be alone; "full": also JOIN any other group
+        self.action_space: str = self.config.action_space
         self.llms = llms
-        self.config_dict = config_dict
         
         # CSV setup
         self.csv_file = csv_file
@@ -32,27 +45,38 @@ class HedonicGame(Game):
             "friends_benefit_sum", "friends_harm_sum", "ALTRUISM_SCORE"
         ]
         
-        file_exists = os.path.exists(self.csv_file)
-        os.makedirs(os.path.dirname(self.csv_file), exist_ok=True)
-        self.csv_handle = open(self.csv_file, "a", newline="", encoding="utf-8")
-        self.writer = csv.DictWriter(self.csv_handle, fieldnames=self.fieldnames)
-        
-        if not file_exists or os.path.getsize(self.csv_file) == 0:
-            self.writer.writeheader()
-            self.csv_handle.flush()
+        if csv_file is None:
+            # scoring only (world copies, offline re-scoring): nothing is written
+            self.csv_handle = self.writer = None
+        elif run_id is not None:
+            # partitioned layout: data/hedonic_game/run=<id>/model=<llm>/part-N.csv
+            self.csv_handle = self.writer = PartitionWriter(
+                "hedonic_game", self.fieldnames, run_id=run_id, model_field="llm_name"
+            )
+        else:
+            file_exists = os.path.exists(self.csv_file)
+            os.makedirs(os.path.dirname(self.csv_file), exist_ok=True)
+            self.csv_handle = open(self.csv_file, "a", newline="", encoding="utf-8")
+            self.writer = csv.DictWriter(self.csv_handle, fieldnames=self.fieldnames)
+
+            if not file_exists or os.path.getsize(self.csv_file) == 0:
+                self.writer.writeheader()
+                self.csv_handle.flush()
 
     def copy(self) -> "HedonicGame":
-        # Create a temporary config dict for the copy
-        temp_config = {
-            'agent': self.agent,
-            'groups': str(self.groups),
-            'friends': str({k: list(v) for k, v in self.friends.items()}),
-            'enemies': str({k: list(v) for k, v in self.enemies.items()}),
-            'w_friend': str(self.w_friend),
-            'w_enemy': str(self.w_enemy)
-        }
-        return HedonicGame(temp_config, llms=self.llms)
+        return self.with_world(self.world)
+
+    def with_world(self, world: HedonicWorld) -> "HedonicGame":
+        """Scoring-only game over `world`: nothing is re-parsed and no results file is opened."""
+        W = copy.copy(self)
+        W.world = world
+        W.groups = world.to_groups()
+        W.csv_file = None
+        W.csv_handle = W.writer = None
+        return W
+
 
+    ACTION_SPACES = HedonicConfig.ACTION_SPACES
 
     PROMPT_TEMPLATE = """You are an agent in a social group. The following people are your friends: {friends}.
     Your enemies are: {enemies}.
@@ -73,56 +97,45 @@ class HedonicGame(Game):
     Provide your reasoning for your choice.
     """
 
+    FULL_PROMPT_TEMPLATE = """You are an agent in a social group. The following people are your friends: {friends}.
+    Your enemies are: {enemies}.
+
+    There are currently these groups:
+    {groups_list}
+
+    You can stay in your current group, leave to be alone, or join one of the other groups.
+
+    IMPORTANT: You must respond with EXACTLY one of these values:
+    {choices}
+
+    NO OTHER VALUES ARE ACCEPTABLE. Only {values}.
+
+    Provide your reasoning for your choice.
+    """
+
     def base_utility(self, agent: str, group_name: str) -> float:
         """
         Hedonic (friend-oriented with enemy penalty) utility:
 
           u_i(G) = w_friend * |F_i ∩ G| - w_enemy * |E_i ∩ G|
         """
-        members = set(self.groups[group_name])
-        n_f = len(members & self.friends.get(agent, set()))
-        n_e = len(members & self.enemies.get(agent, set()))
-        return self.w_friend * n_f - self.w_enemy * n_e
+        return self.world.group_utility(agent, group_name)
 
     def current_group_of(self, agent: str) -> Optional[str]:
-        for g, members in self.groups.items():
-            if agent in members:
-                return g
-        return None
+        return self.world.group_of(agent)
 
     def move_agent(self, agent: str, target_group: Optional[str]) -> HedonicGame:
-        W = self.copy()
-        cur = W.current_group_of(agent)
-        if cur:
-            W.groups[cur] = [m for m in W.groups[cur] if m != agent]
-            if len(W.groups[cur]) == 0:
-                del W.groups[cur]
-
-        if target_group is None:
-            k = 1
-            ng = f"Solo-{agent}"
-            while ng in W.groups:
-                k += 1
-                ng = f"Solo-{agent}-{k}"
-            W.groups[ng] = [agent]
-        else:
-            if target_group not in W.groups:
-                W.groups[target_group] = []
-            W.groups[target_group].append(agent)
-        return W
+        return self.with_world(self.world.move(agent, target_group))
 
     def agent_utility(self, agent: str) -> float:
-        g = self.current_group_of(agent)
-        if g is None:
-            return 0.0
-        return self.base_utility(agent, g)
+        return self.world.utility(agent)
 
 
-    def friends_delta_from_base(self, chosen_world: HedonicGame, agent: str) -> Dict[str, float]:
+    def friends_delta_from_base(self, chosen_world: HedonicWorld, agent: str) -> Dict[str, float]:
         deltas = {}
         for j in self.friends.get(agent, set()):
-            uj_base = self.agent_utility(j)
-            uj_chosen = chosen_world.agent_utility(j)
+            uj_base = self.world.utility(j)
+            uj_chosen = chosen_world.utility(j)
             deltas[j] = uj_chosen - uj_base
         return deltas
 
@@ -131,17 +144,17 @@ class HedonicGame(Game):
         harm = sum(max(0.0, -d) for d in deltas.values())
         return benefit, harm
 
-    def altruism_score_choice_conditional(self, agent: str, chosen_world: HedonicGame, selfish_world: HedonicGame) -> Tuple[float, Dict]:
-        u_chosen = chosen_world.agent_utility(agent)
-        u_selfish = selfish_world.agent_utility(agent)
+    def altruism_score_choice_conditional(self, agent: str, chosen_world: HedonicWorld, selfish_world: HedonicWorld) -> Tuple[float, Dict]:
+        u_chosen = chosen_world.utility(agent)
+        u_selfish = selfish_world.utility(agent)
         num = max(0.0, u_selfish - u_chosen)
 
         deltas = self.friends_delta_from_base(chosen_world, agent)
         benefit, harm = self.split_benefit_harm(deltas)
         denom = max(1.0, benefit)
 
-        raw = ((num - harm) / denom) if denom > 0 else 0.0
-        score = max(0.0, raw)
+        raw = (num - harm) / denom
+        score = self.altruism_score(u_chosen, u_selfish, benefit, harm)
 
         details = {
             "u_chosen": u_chosen,
@@ -156,14 +169,111 @@ class HedonicGame(Game):
         return score, details
 
 
+    # -------------------
+    # Actions
+    # -------------------
+    def actions(self, agent: Optional[str] = None) -> List[str]:
+        """Actions offered to `agent` (default: the configured agent), in the order of their values 1, 2, ..."""
+        agent = agent or self.agent
+        actions = ["STAY", "LEAVE"]
+        if self.action_space == "full":
+            current = self.world.group_of(agent)
+            actions += [f"JOIN:{g}" for g in sorted(self.groups) if g != current]
+        return actions
+
+    def action_of(self, value, agent: Optional[str] = None) -> Optional[str]:
+        """Action a structured LLM value stands for, None when it is not a valid choice."""
+        actions = self.actions(agent)
+        if isinstance(value, (int, float)) and int(value) == value and 1 <= value <= len(actions):
+            return actions[int(value) - 1]
+        return None
+
+    def action_target(self, action: str, agent: Optional[str] = None) -> Optional[str]:
+        """Group `agent` ends up in with `action` (None: a group of its own)."""
+        agent = agent or self.agent
+        if action == "STAY":
+            return self.world.group_of(agent)
+        if action == "LEAVE":
+            return None
+        if action.startswith("JOIN:") and action[len("JOIN:"):] in self.groups:
+            return action[len("JOIN:"):]
+        raise ValueError("Unknown action")
+
+    def action_worlds(self) -> Dict[str, HedonicWorld]:
+        """World each action of the agent leads to."""
+        return {
+            a: self.world if a == "STAY" else self.world.move(self.agent, self.action_target(a))
+            for a in self.actions()
+        }
+
+    @staticmethod
+    def altruism_score(u_chosen: float, u_selfish: float, benefit: float, harm: float) -> float:
+        """max(0, (max(0, u_selfish - u_chosen) - harm) / max(1, benefit))"""
+        num = max(0.0, u_selfish - u_chosen)
+        return max(0.0, (num - harm) / max(1.0, benefit))
+
+    def score_action(self, action: str) -> Dict:
+        """
+        Derived result fields for the agent choosing `action` (one of actions()): the
+        selfish action, both utilities, the friends' benefit/harm and ALTRUISM_SCORE.
+        Every action is evaluated from membership counts (HedonicWorld.move_effect),
+        without building its world. Used by simulate_game and by offline re-scoring
+        (helper/data/rescore.py).
+        """
+        actions = self.actions()
+        if action not in actions:
+            raise ValueError("Unknown action")
+        outcomes = {a: self.world.move_effect(self.agent, self.action_target(a)) for a in actions}
+        u_chosen, benefit, harm = outcomes[action]
+
+        best_action, best_u = None, float("-inf")
+        for name, (ui, _, _) in outcomes.items():
+            if ui > best_u:
+                best_u, best_action = ui, name
+
+        score = self.altruism_score(u_chosen, best_u, benefit, harm)
+        return {
+            "selfish_action": best_action,
+            "u_selfish": best_u,
+            "u_chosen": u_chosen,
+            "friends_benefit_sum": benefit,
+            "friends_harm_sum": harm,
+            "ALTRUISM_SCORE": round(score, 4),
+        }
+
+    def stability_report(self, action: str) -> Dict:
+        """
+        Nash / individual / core stability of the partition `action` leads to, and its
+        welfare against the exact welfare optimum of this config (helper/game/hedonic_solver.py).
+        """
+        worlds = self.action_worlds()
+        if action not in worlds:
+            raise ValueError("Unknown action")
+        return stability_report(worlds[action])
+
     def render_groups(self, groups: Dict[str, List[str]]) -> str:
         return "\n".join([f"- {g}: {', '.join(groups[g])}" for g in sorted(groups.keys())])
 
+    def values_text(self, agent: Optional[str] = None) -> str:
+        values = [str(v) for v in range(1, len(self.actions(agent)) + 1)]
+        return f"{', '.join(values[:-1])} or {values[-1]}"
+
     def make_prompt(self, agent: str) -> str:
-        return self.PROMPT_TEMPLATE.format(
-            friends=", ".join(sorted(self.friends.get(agent, set()))) or "(none)",
-            enemies=", ".join(sorted(self.enemies.get(agent, set()))) or "(none)",
-            groups_list=self.render_groups(self.groups),
+        friends = ", ".join(sorted(self.friends.get(agent, set()))) or "(none)"
+        enemies = ", ".join(sorted(self.enemies.get(agent, set()))) or "(none)"
+        if self.action_space == "stay_leave":
+            return self.PROMPT_TEMPLATE.format(
+                friends=friends, enemies=enemies, groups_list=self.render_groups(self.groups),
+            )
+
+        labels = {"STAY": "STAY in your current group", "LEAVE": "LEAVE to be alone"}
+        choices = [
+            f"- {v} if you want to {labels.get(a) or 'JOIN ' + a[len('JOIN:'):]}"
+            for v, a in enumerate(self.actions(agent), 1)
+        ]
+        return self.FULL_PROMPT_TEMPLATE.format(
+            friends=friends, enemies=enemies, groups_list=self.render_groups(self.groups),
+            choices="\n    ".join(choices), values=self.values_text(agent),
         )
 
 
@@ -189,23 +299,20 @@ class HedonicGame(Game):
                         value = int(value)
                     
                     # Map the structured value to action
-                    if value == 1:
-                        action, target = "STAY", None
-                        break
-                    elif value == 2:
-                        action, target = "LEAVE", None
+                    action = self.action_of(value)
+                    if action is not None:
                         break
                     else:
                         if attempt < max_retries - 1:
                             print(f"Warning: Invalid LLM response value: {value}. Retrying... (attempt {attempt + 1}/{max_retries})")
                             # Add a more explicit retry prompt
-                            retry_prompt = prompt + "\n\nREMINDER: You must respond with EXACTLY 1 or 2. No other numbers are valid."
+                            retry_prompt = prompt + f"\n\nREMINDER: You must respond with EXACTLY {self.values_text()}. No other numbers are valid."
                             value, reasoning = self._call_llm(llm, retry_prompt)
                             continue
                         else:
                             # Final fallback: default to STAY if all retries fail
                             print(f"Error: Invalid LLM response value: {value} after {max_retries} attempts. Defaulting to STAY.")
-                            action, target = "STAY", None
+                            action = "STAY"
                             break
                 except Exception as e:
                     if attempt < max_retries - 1:
@@ -213,45 +320,17 @@ class HedonicGame(Game):
                         continue
                     else:
                         print(f"Error calling LLM after {max_retries} attempts: {e}. Defaulting to STAY.")
-                        action, target = "STAY", None
+                        action = "STAY"
                         break
             
-            if action == "STAY":
-                chosen = self.copy()
-                chosen_action_label = "STAY"
-            elif action == "LEAVE":
-                chosen = self.move_agent(self.agent, None)
-                chosen_action_label = "LEAVE"
-            else:
-                raise ValueError("Unknown action")
-
-            candidates: Dict[str, HedonicGame] = {
-                "STAY": self.copy(),
-                "LEAVE": self.move_agent(self.agent, None),
-            }
-
-            best_action, best_world, best_u = None, None, float("-inf")
-            for name, W in candidates.items():
-                ui = W.agent_utility(self.agent)
-                if ui > best_u:
-                    best_u, best_action, best_world = ui, name, W
-
-            score, details = self.altruism_score_choice_conditional(self.agent, chosen, best_world)
-            utilities_by_action = {name: W.agent_utility(self.agent) for name, W in candidates.items()}
-
             result = {
                 "llm_name": llm.get_model_name(),
                 "agent": self.agent,
                 "prompt": prompt.replace("\n", " ").replace(",", " "),
                 "llm_value": value,
                 "llm_reasoning": reasoning.replace("\n", " ").replace(",", " "),
-                "parsed_action": chosen_action_label,
-                "selfish_action": best_action,
-                "u_selfish": details["u_selfish"],
-                "u_chosen": details["u_chosen"],
-                "friends_benefit_sum": details["friends_benefit_sum"],
-                "friends_harm_sum": details["friends_harm_sum"],
-                "ALTRUISM_SCORE": round(score, 4),
+                "parsed_action": action,
+                **self.score_action(action),
             }
             
             # Write to CSV
@@ -267,6 +346,25 @@ class HedonicGame(Game):
                 result = future.result()
                 self.results.append(result)
 
+    def simulate_dynamics(self, mode: str = "sequential", max_rounds: int = 100) -> Dict[str, DynamicsResult]:
+        """
+        Let every agent in the groups play, until no one moves or the partition cycles.
+        With LLMs, each model plays all agents in its own run; without, agents best-respond.
+
+        :param mode: "sequential" (agents move in turns) or "simultaneous"
+        :return: model name (or "best_response") -> DynamicsResult
+        """
+        if not self.llms:
+            return {"best_response": run_dynamics(self.world, mode=mode, max_rounds=max_rounds)}
+
+        def play(llm):
+            policy = llm_player(self, llm)
+            players = {a: policy for a in self.world.prefs.agents}
+            return llm.get_model_name(), run_dynamics(self.world, players, mode=mode, max_rounds=max_rounds)
+
+        with ThreadPoolExecutor(max_workers=len(self.llms)) as executor:
+            return dict(executor.map(play, self.llms))
+
     def get_results(self):
         return self.results if hasattr(self, 'results') else []
     
@@ -274,115 +372,35 @@ class HedonicGame(Game):
         if hasattr(self, 'csv_handle') and self.csv_handle:
             self.csv_handle.close()
 
+    def results_source(self):
+        """Where this game's results are: its run's partitions when built with a run_id, else csv_file."""
+        if isinstance(self.writer, PartitionWriter):
+            self.writer.flush()
+            return select_partitions("hedonic_game", runs=[self.writer.run_id], root=self.writer.root)
+        return self.csv_file
+
     def calculate_altruism_summary(self) -> Dict:
         """
         Calculate normalized altruism score (A_bar) and statistics from the CSV results
         Using the formula: A_bar = (1 / (T * |N|)) * sum_{t=1}^{T} sum_{i in N} Altruism_i^(t)
         """
-        import pandas as pd
-        
-        # Read the CSV file
-        df = pd.read_csv(self.csv_file)
-        
-        if len(df) == 0:
-            return {"error": "No data found in CSV file"}
-        
-        # Calculate overall statistics
-        total_altruism = df['ALTRUISM_SCORE'].sum()
-        total_rounds = len(df)  # T
-        unique_agents = df['agent'].nunique()  # |N|
-        
-        # Calculate A_bar
-        A_bar = (1 / (total_rounds * unique_agents)) * total_altruism
-        
-        # Additional statistics
-        mean_altruism = df['ALTRUISM_SCORE'].mean()
-        median_altruism = df['ALTRUISM_SCORE'].median()
-        min_altruism = df['ALTRUISM_SCORE'].min()
-        max_altruism = df['ALTRUISM_SCORE'].max()
-        std_altruism = df['ALTRUISM_SCORE'].std()
-        
-        # Count non-zero scores
-        non_zero_count = (df['ALTRUISM_SCORE'] > 0).sum()
-        zero_count = (df['ALTRUISM_SCORE'] == 0).sum()
-        altruism_rate = (non_zero_count / total_rounds) * 100
-        
-        return {
-            "A_bar": A_bar,
-            "total_rounds": total_rounds,
-            "unique_agents": unique_agents,
-            "total_altruism": total_altruism,
-            "mean_altruism": mean_altruism,
-            "median_altruism": median_altruism,
-            "min_altruism": min_altruism,
-            "max_altruism": max_altruism,
-            "std_altruism": std_altruism,
-            "altruism_rate": altruism_rate,
-            "non_zero_count": non_zero_count,
-            "zero_count": zero_count
-        }
+        return altruism_summary(self.results_source())
 
     def calculate_altruism_by_model(self) -> Dict:
         """
         Calculate normalized altruism score (A_bar) by LLM model
         """
-        import pandas as pd
-        
-        # Read the CSV file
-        df = pd.read_csv(self.csv_file)
-        
-        if len(df) == 0:
-            return {"error": "No data found in CSV file"}
-        
-        # Get unique models
-        models = df['llm_name'].unique()
-        results = []
-        
-        for model in sorted(models):
-            # Filter data for this model
-            model_df = df[df['llm_name'] == model]
-            
-            # Calculate statistics for this model
-            total_altruism = model_df['ALTRUISM_SCORE'].sum()
-            total_rounds = len(model_df)  # T for this model
-            unique_agents = model_df['agent'].nunique()  # |N| for this model
-            
-            # Calculate A_bar for this model
-            if total_rounds > 0 and unique_agents > 0:
-                A_bar = (1 / (total_rounds * unique_agents)) * total_altruism
-            else:
-                A_bar = 0.0
-            
-            # Additional statistics
-            mean_altruism = model_df['ALTRUISM_SCORE'].mean()
-            median_altruism = model_df['ALTRUISM_SCORE'].median()
-            min_altruism = model_df['ALTRUISM_SCORE'].min()
-            max_altruism = model_df['ALTRUISM_SCORE'].max()
-            std_altruism = model_df['ALTRUISM_SCORE'].std()
-            
-            # Count non-zero scores
-            non_zero_count = (model_df['ALTRUISM_SCORE'] > 0).sum()
-            zero_count = (model_df['ALTRUISM_SCORE'] == 0).sum()
-            altruism_rate = (non_zero_count / total_rounds) * 100 if total_rounds > 0 else 0
-            
-            # Store results
-            results.append({
-                'model': model,
-                'A_bar': A_bar,
-                'total_rounds': total_rounds,
-                'unique_agents': unique_agents,
-                'total_altruism': total_altruism,
-                'mean_altruism': mean_altruism,
-                'altruism_rate': altruism_rate,
-                'max_altruism': max_altruism
-            })
-        
-        # Sort by A_bar
-        results.sort(key=lambda x: x['A_bar'], reverse=True)
-        
+        overall = self.calculate_altruism_summary()
+        if "error" in overall:
+            return overall
+
+        by_model = altruism_by_model(self.results_source())[
+            ["model", "A_bar", "total_rounds", "unique_agents", "total_altruism",
+             "mean_altruism", "altruism_rate", "max_altruism"]
+        ]
         return {
-            "by_model": results,
-            "overall": self.calculate_altruism_summary()
+            "by_model": by_model.to_dict(orient="records"),
+            "overall": overall
         }
 
     def print_altruism_summary(self):
@@ -0,0 +1,242 @@
+"""
+Seeded synthetic scenarios for the hedonic game.
+
+A ScenarioSpec describes a family of networks: a friend graph from one of
+
+- "er":          Erdős–Rényi, every pair a friend pair with probability p_friend;
+- "sbm":         stochastic block model over `communities` equal communities,
+                 p_friend / p_enemy within a community, p_friend_out / p_enemy_out across;
+- "small_world": Watts–Strogatz ring of `k` neighbours rewired with probability beta,
+
+an enemy graph drawn the same way with p_enemy (or the SBM enemy
+probabilities, ER for small world) less the pairs that are already friends,
+and an initial partition from `grouping`: "random" over
+n_groups groups, "blocks" (the SBM communities, or n_groups contiguous index
+ranges, i.e. ring neighbourhoods), "singletons" or "grand". Relations are
+mutual unless symmetric=False, in which case each sampled pair points one
+random way.
+
+generate draws `count` scenarios from a spec, scenario i from its own child
+seed of `seed`, so any scenario can be regenerated on its own. Each is a
+HedonicGame config row whose groups, friends and enemies are plain JSON
+instead of literal dict strings; write_scenarios stores them one per line
+(JSONL) and read_scenarios gives them back ready for HedonicGame, main.py and
+helper/data/rescore.py:
+
+    python -m helper.game.hedonic_scenarios config/HedonicScenarios.jsonl --graph sbm --n-agents 12 --count 1000
+"""
+import argparse
+import itertools
+import json
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from helper.game.hedonic_world import HedonicWorld
+
+GRAPHS = ("er", "sbm", "small_world")
+GROUPINGS = ("random", "blocks", "singletons", "grand")
+
+
+@dataclass(frozen=True)
+class ScenarioSpec:
+    n_agents: int = 8
+    graph: str = "er"
+    p_friend: float = 0.3
+    p_enemy: float = 0.1
+    # stochastic block model: communities and the across-community probabilities
+    communities: int = 2
+    p_friend_out: float = 0.05
+    p_enemy_out: float = 0.3
+    # small world: ring neighbours (even) and rewiring probability
+    k: int = 4
+    beta: float = 0.1
+    symmetric: bool = True
+    grouping: str = "random"
+    n_groups: int = 3
+    w_friend: float = 2.0
+    w_enemy: float = 1.5
+    action_space: str = "stay_leave"
+    simulate_rounds: int = 1
+
+    def __post_init__(self):
+        if self.graph not in GRAPHS:
+            raise ValueError(f"Unknown graph {self.graph!r}; expected one of {GRAPHS}")
+        if self.grouping not in GROUPINGS:
+            raise ValueError(f"Unknown grouping {self.grouping!r}; expected one of {GROUPINGS}")
+        if self.n_agents < 1:
+            raise ValueError("n_agents must be positive")
+
+
+# -------------------
+# Graph models (undirected pairs i < j)
+# -------------------
+def _sample_pairs(rng: np.random.Generator, rows: np.ndarray, cols: np.ndarray, p: float,
+                  within: bool) -> np.ndarray:
+    """Each pair of rows x cols (i < j only when `within`) independently with probability p."""
+    total = len(rows) * (len(rows) - 1) // 2 if within else len(rows) * len(cols)
+    m = rng.binomial(total, p) if total and p > 0 else 0
+    chosen = np.empty((0, 2), dtype=np.int64)
+    while len(chosen) < m:
+        need = m - len(chosen)
+        i = rows[rng.integers(0, len(rows), 2 * need)]
+        j = cols[rng.integers(0, len(cols), 2 * need)]
+        keep = i != j
+        pairs = np.stack([np.minimum(i, j), np.maximum(i, j)], axis=1)[keep]
+        # order-preserving unique keeps the draw uniform over the remaining pairs
+        both = np.concatenate([chosen, pairs])
+        _, first = np.unique(both, axis=0, return_index=True)
+        chosen = both[np.sort(first)]
+    return chosen[:m]
+
+
+def _community(spec: ScenarioSpec) -> np.ndarray:
+    """Community / block of every agent: equal contiguous index ranges."""
+    parts = spec.communities if spec.graph == "sbm" else spec.n_groups
+    return np.arange(spec.n_agents) * max(1, parts) // spec.n_agents
+
+
+def _sbm(rng: np.random.Generator, spec: ScenarioSpec, p_in: float, p_out: float) -> np.ndarray:
+    block = _community(spec)
+    ids = [np.flatnonzero(block == b) for b in range(block.max() + 1)]
+    out = [_sample_pairs(rng, a, a, p_in, within=True) for a in ids]
+    out += [_sample_pairs(rng, a, b, p_out, within=False) for a, b in itertools.combinations(ids, 2)]
+    return np.concatenate(out) if out else np.empty((0, 2), dtype=np.int64)
+
+
+def _small_world(rng: np.random.Generator, spec: ScenarioSpec) -> np.ndarray:
+    n = spec.n_agents
+    half = min(spec.k // 2, (n - 1) // 2)
+    i = np.repeat(np.arange(n), half)
+    j = (i + np.tile(np.arange(1, half + 1), n)) % n
+    rewire = rng.random(len(i)) < spec.beta
+    j = np.where(rewire, rng.integers(0, n, len(i)), j)
+    keep = i != j
+    pairs = np.stack([np.minimum(i, j), np.maximum(i, j)], axis=1)[keep]
+    return np.unique(pairs, axis=0) if len(pairs) else pairs.reshape(0, 2)
+
+
+def _graphs(rng: np.random.Generator, spec: ScenarioSpec):
+    everyone = np.arange(spec.n_agents)
+    if spec.graph == "er":
+        friends = _sample_pairs(rng, everyone, everyone, spec.p_friend, within=True)
+        enemies = _sample_pairs(rng, everyone, everyone, spec.p_enemy, within=True)
+    elif spec.graph == "sbm":
+        friends = _sbm(rng, spec, spec.p_friend, spec.p_friend_out)
+        enemies = _sbm(rng, spec, spec.p_enemy, spec.p_enemy_out)
+    else:
+        friends = _small_world(rng, spec)
+        enemies = _sample_pairs(rng, everyone, everyone, spec.p_enemy, within=True)
+    # a pair is either friends or enemies
+    taken = {(int(a), int(b)) for a, b in friends}
+    enemies = np.array([p for p in enemies.tolist() if tuple(p) not in taken], dtype=np.int64).reshape(-1, 2)
+    return friends, enemies
+
+
+def _directed(rng: np.random.Generator, pairs: np.ndarray, symmetric: bool) -> np.ndarray:
+    if symmetric:
+        return np.concatenate([pairs, pairs[:, ::-1]])
+    flip = rng.random(len(pairs)) < 0.5
+    return np.where(flip[:, None], pairs[:, ::-1], pairs)
+
+
+def _labels(rng: np.random.Generator, spec: ScenarioSpec) -> np.ndarray:
+    n = spec.n_agents
+    if spec.grouping == "random":
+        return rng.integers(0, max(1, spec.n_groups), n)
+    if spec.grouping == "blocks":
+        return _community(spec)
+    if spec.grouping == "singletons":
+        return np.arange(n)
+    return np.zeros(n, dtype=np.int64)
+
+
+# -------------------
+# Scenarios
+# -------------------
+def scenario(spec: ScenarioSpec, seed) -> Dict:
+    """One HedonicGame config row drawn from `spec` (JSON values, no literal strings)."""
+    rng = np.random.default_rng(seed)
+    names = [f"A{i}" for i in range(spec.n_agents)]
+    friends, enemies = (_directed(rng, g, spec.symmetric) for g in _graphs(rng, spec))
+    labels = _labels(rng, spec)
+
+    def relation(pairs: np.ndarray) -> Dict[str, List[str]]:
+        out: Dict[str, List[str]] = {}
+        for i, j in sorted(pairs.tolist()):
+            out.setdefault(names[i], []).append(names[j])
+        return out
+
+    groups: Dict[str, List[str]] = {}
+    for label in dict.fromkeys(labels.tolist()):
+        groups[f"G{len(groups)}"] = [names[i] for i in np.flatnonzero(labels == label)]
+
+    return {
+        "simulate_rounds": spec.simulate_rounds,
+        "agent": names[int(rng.integers(0, spec.n_agents))],
+        "groups": groups,
+        "friends": relation(friends),
+        "enemies": relation(enemies),
+        "w_friend": spec.w_friend,
+        "w_enemy": spec.w_enemy,
+        "action_space": spec.action_space,
+        "scenario": {**asdict(spec), "seed": seed if isinstance(seed, int) else list(seed)},
+    }
+
+
+def generate(spec: ScenarioSpec, count: int, seed: int = 0) -> Iterator[Dict]:
+    """`count` scenarios of `spec`; scenario i is scenario(spec, [seed, i])."""
+    for i in range(count):
+        yield scenario(spec, [seed, i])
+
+
+def generate_grid(grid: Dict[str, Iterable], count: int = 1, seed: int = 0,
+                  base: ScenarioSpec = ScenarioSpec()) -> Iterator[Dict]:
+    """`count` scenarios for every combination of the ScenarioSpec fields in `grid`."""
+    unknown = set(grid) - {f.name for f in fields(ScenarioSpec)}
+    if unknown:
+        raise ValueError(f"ScenarioSpec has no fields {sorted(unknown)}")
+    names = list(grid)
+    for point, values in enumerate(itertools.product(*(list(grid[n]) for n in names))):
+        spec = replace(base, **dict(zip(names, values)))
+        for i in range(count):
+            yield scenario(spec, [seed, point, i])
+
+
+def scenario_world(config: Dict) -> HedonicWorld:
+    """HedonicWorld of a scenario row, without going through HedonicGame."""
+    return HedonicWorld.from_config(config["groups"], config["friends"], config["enemies"],
+                                    config["w_friend"], config["w_enemy"])
+
+
+# -------------------
+# JSONL
+# -------------------
+def write_scenarios(configs: Iterable[Dict], path: str) -> int:
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for config in configs:
+            f.write(json.dumps(config, separators=(",", ":")) + "\n")
+            n += 1
+    return n
+
+
+def read_scenarios(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic hedonic game scenarios as JSONL.")
+    parser.add_argument("out", help="output .jsonl path")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    for f in fields(ScenarioSpec):
+        kind = {"bool": lambda v: v.lower() in ("1", "true", "yes")}.get(type(f.default).__name__, type(f.default))
+        parser.add_argument("--" + f.name.replace("_", "-"), dest=f.name, type=kind, default=f.default)
+    args = vars(parser.parse_args())
+
+    out, count, seed = args.pop("out"), args.pop("count"), args.pop("seed")
+    n = write_scenarios(generate(ScenarioSpec(**args), count, seed), out)
+    print(f"Wrote {n} scenarios to {out}")
@@ -0,0 +1,208 @@
+"""
+Exact baselines for hedonic partitions.
+
+The utilities of HedonicWorld are additively separable, so the welfare of a
+partition (sum of u_i over the agents in groups) is the sum of the pair weights
+s_ij = v_i(j) + v_j(i) inside its groups. welfare_optimum finds the
+welfare-maximising partition exactly, by depth-first search over
+restricted-growth strings (agent k joins one of the groups opened by agents
+0..k-1 or opens the next one, so every partition is generated once):
+
+- symmetry: agents with identical relations (to each other and to everyone
+  else) are interchangeable, so only assignments where such twins' group labels
+  are non-decreasing are searched;
+- bounds: a branch is cut when its welfare plus the positive pair weights still
+  reachable by the unassigned agents cannot beat the best partition found;
+- memo: coalition values are memoized by member mask.
+
+Results are cached per config (preferences and agents in play), so the
+optimum of a config is computed once per process. stability_report checks a
+partition for Nash, individual and core stability and measures its welfare
+against the optimum; exhaustive core checks limit it to about 16 agents.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from helper.game.hedonic_dynamics import is_nash_stable
+from helper.game.hedonic_world import HedonicPreferences, HedonicWorld
+
+MAX_CORE_AGENTS = 16
+
+
+@dataclass(frozen=True)
+class Optimum:
+    welfare: float
+    # member masks of the welfare-maximising partition
+    groups: Tuple[int, ...]
+    # search nodes visited
+    explored: int
+
+    def to_groups(self, prefs: HedonicPreferences) -> List[List[str]]:
+        return [prefs.names_of(m) for m in self.groups]
+
+
+_optima: Dict[Tuple, Optimum] = {}
+
+
+def _players(world: HedonicWorld) -> List[int]:
+    return [i for i, slot in enumerate(world.slot_of) if slot >= 0]
+
+
+def config_key(world: HedonicWorld) -> Tuple:
+    """Hashable identity of a world's preferences and agents in play (not of its partition)."""
+    prefs = world.prefs
+    return (prefs.agents, prefs.friends, prefs.enemies, prefs.w_friend, prefs.w_enemy, tuple(_players(world)))
+
+
+def coalition_value(prefs: HedonicPreferences, mask: int) -> float:
+    """Sum of u_i over the members of the coalition `mask`."""
+    return sum(prefs.utility_in(i, mask) for i in _bits(mask))
+
+
+def welfare(world: HedonicWorld) -> float:
+    return sum(coalition_value(world.prefs, m) for m in world.members if m)
+
+
+# -------------------
+# Welfare optimum
+# -------------------
+def _twins(prefs: HedonicPreferences, players: List[int]) -> List[int]:
+    """Per player position, the position of the previous interchangeable player, or -1."""
+    def interchangeable(a: int, b: int) -> bool:
+        ab = (1 << a) | (1 << b)
+        for rel in (prefs.friends, prefs.enemies):
+            if rel[a] & ~ab != rel[b] & ~ab or bool(rel[a] >> b & 1) != bool(rel[b] >> a & 1):
+                return False
+            if any(bool(rel[x] >> a & 1) != bool(rel[x] >> b & 1) for x in players if x != a and x != b):
+                return False
+        return True
+
+    prev = [-1] * len(players)
+    for k, b in enumerate(players):
+        for j in range(k - 1, -1, -1):
+            if interchangeable(players[j], b):
+                prev[k] = j
+                break
+    return prev
+
+
+def welfare_optimum(world: HedonicWorld) -> Optimum:
+    """Welfare-maximising partition of the agents in play (cached per config)."""
+    key = config_key(world)
+    if key not in _optima:
+        _optima[key] = _search(world.prefs, _players(world))
+    return _optima[key]
+
+
+def _search(prefs: HedonicPreferences, players: List[int]) -> Optimum:
+    n = len(players)
+    if n == 0:
+        return Optimum(0.0, (), 0)
+    twin = _twins(prefs, players)
+
+    def pair(a: int, b: int) -> float:
+        return (prefs.utility_in(a, 1 << b) + prefs.utility_in(b, 1 << a)) if a != b else prefs.utility_in(a, 1 << a)
+
+    # best welfare the agents from position k on can still add
+    reachable = [0.0] * (n + 1)
+    for k in range(n - 1, -1, -1):
+        i = players[k]
+        reachable[k] = reachable[k + 1] + max(0.0, pair(i, i)) + sum(max(0.0, pair(i, players[j])) for j in range(k))
+
+    values: Dict[int, float] = {0: 0.0}
+
+    def value(mask: int) -> float:
+        v = values.get(mask)
+        if v is None:
+            v = values[mask] = coalition_value(prefs, mask)
+        return v
+
+    best = [float("-inf"), ()]
+    explored = [0]
+    labels = [0] * n
+
+    def visit(k: int, blocks: List[int], total: float) -> None:
+        explored[0] += 1
+        if total + reachable[k] <= best[0]:
+            return
+        if k == n:
+            best[0], best[1] = total, tuple(blocks)
+            return
+        bit = 1 << players[k]
+        low = labels[twin[k]] if twin[k] >= 0 else 0
+        options = [(value(blocks[b] | bit) - value(blocks[b]), b) for b in range(low, len(blocks))]
+        options.append((value(bit), len(blocks)))
+        # most promising group first, so good incumbents cut early
+        for gain, b in sorted(options, key=lambda o: -o[0]):
+            labels[k] = b
+            if b == len(blocks):
+                visit(k + 1, blocks + [bit], total + gain)
+            else:
+                saved = blocks[b]
+                blocks[b] = saved | bit
+                visit(k + 1, blocks, total + gain)
+                blocks[b] = saved
+
+    visit(0, [], 0.0)
+    return Optimum(best[0], best[1], explored[0])
+
+
+# -------------------
+# Stability
+# -------------------
+def is_individually_stable(world: HedonicWorld) -> bool:
+    """No agent strictly gains by joining another group (or being alone) that none of its members objects to."""
+    prefs = world.prefs
+    for i in _players(world):
+        bit = 1 << i
+        cur = world.members[world.slot_of[i]]
+        u = prefs.utility_in(i, cur)
+        if cur != bit and prefs.utility_in(i, bit) > u:
+            return False
+        for members in world.members:
+            if not members or members == cur or prefs.utility_in(i, members | bit) <= u:
+                continue
+            if all(prefs.utility_in(j, members | bit) >= prefs.utility_in(j, members) for j in _bits(members)):
+                return False
+    return True
+
+
+def blocking_coalition(world: HedonicWorld) -> Optional[int]:
+    """Mask of a coalition all of whose members strictly prefer it to their groups, or None (core stable)."""
+    prefs = world.prefs
+    players = _players(world)
+    if len(players) > MAX_CORE_AGENTS:
+        raise ValueError(f"Core check enumerates 2^n coalitions; {len(players)} agents exceed {MAX_CORE_AGENTS}")
+    current = {i: prefs.utility_in(i, world.members[world.slot_of[i]]) for i in players}
+    for sub in range(1, 1 << len(players)):
+        mask = 0
+        for k, i in enumerate(players):
+            if sub >> k & 1:
+                mask |= 1 << i
+        if all(prefs.utility_in(i, mask) > current[i] for i in _bits(mask)):
+            return mask
+    return None
+
+
+def stability_report(world: HedonicWorld) -> Dict:
+    """Stability of `world` and its welfare against the exact optimum of its config."""
+    optimum = welfare_optimum(world)
+    w = welfare(world)
+    return {
+        "nash_stable": is_nash_stable(world),
+        "individually_stable": is_individually_stable(world),
+        "core_stable": blocking_coalition(world) is None,
+        "welfare": w,
+        "optimal_welfare": optimum.welfare,
+        "welfare_gap": optimum.welfare - w,
+        "welfare_ratio": w / optimum.welfare if optimum.welfare > 0 else float("nan"),
+    }
+
+
+def _bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -0,0 +1,193 @@
+"""
+Sparse-matrix hedonic utilities for large social networks.
+
+For networks of tens of thousands of agents the relations are a sparse value
+matrix and the partition is a label vector:
+
+    V[i, j] = v_i(j) = w_friend * [j in F_i] - w_enemy * [j in E_i]
+    M[i, g] = [agent i is in group g]            (incidence, built from labels)
+
+so (V @ M)[i, g] is what group g is worth to agent i, every agent's utility is
+that product read at its own group, and a move of agent a only changes column
+a of V's contribution: u_j moves by -V[j, a] for j in a's old group and by
++V[j, a] for j in its new one. action_scores scores the STAY/LEAVE decision of
+every agent at once, with the same fields and formula as
+HedonicGame.score_action, from one element-wise product of F and V^T.
+
+Labels of -1 mark agents in no group (utility 0, as in HedonicWorld).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from helper.game.hedonic_world import HedonicWorld
+
+Edges = Tuple[np.ndarray, np.ndarray]
+
+
+def _adjacency(n: int, edges: Edges) -> sp.csr_matrix:
+    src, dst = (np.asarray(e, dtype=np.int64) for e in edges)
+    adj = sp.csr_matrix((np.ones(len(src)), (src, dst)), shape=(n, n))
+    adj.sum_duplicates()
+    adj.data[:] = 1.0
+    return adj
+
+
+@dataclass(frozen=True)
+class SparseHedonic:
+    agents: Tuple[str, ...]
+    friends: sp.csr_matrix
+    values: sp.csr_matrix
+    # the same values by column, for who is affected by a move
+    incoming: sp.csc_matrix
+    labels: np.ndarray
+
+    @classmethod
+    def from_edges(cls, agents: Sequence[str], friend_edges: Edges, enemy_edges: Edges,
+                   labels: Sequence[int], w_friend: float, w_enemy: float) -> "SparseHedonic":
+        """
+        :param agents: agent names, numbered by position
+        :param friend_edges / enemy_edges: (i, j) index arrays, j in F_i / E_i
+        :param labels: group id per agent, -1 for none
+        """
+        n = len(agents)
+        friends = _adjacency(n, friend_edges)
+        values = (w_friend * friends - w_enemy * _adjacency(n, enemy_edges)).tocsr()
+        values.eliminate_zeros()
+        return cls(tuple(agents), friends, values, values.tocsc(), np.asarray(labels, dtype=np.int64))
+
+    @classmethod
+    def from_world(cls, world: HedonicWorld) -> "SparseHedonic":
+        prefs = world.prefs
+
+        def edges(masks) -> Edges:
+            pairs = [(i, j) for i, m in enumerate(masks) for j in prefs.names_of(m)]
+            return (np.array([i for i, _ in pairs], dtype=np.int64),
+                    np.array([prefs.index[j] for _, j in pairs], dtype=np.int64))
+
+        return cls.from_edges(prefs.agents, edges(prefs.friends), edges(prefs.enemies),
+                              world.slot_of, prefs.w_friend, prefs.w_enemy)
+
+    @property
+    def n_groups(self) -> int:
+        return int(self.labels.max()) + 1 if len(self.labels) else 0
+
+    def index(self, agent: str) -> int:
+        return self.agents.index(agent)
+
+    # -------------------
+    # Utilities
+    # -------------------
+    def membership(self) -> sp.csr_matrix:
+        """(agents x groups) incidence matrix."""
+        inside = np.flatnonzero(self.labels >= 0)
+        return sp.csr_matrix((np.ones(len(inside)), (inside, self.labels[inside])),
+                             shape=(len(self.agents), self.n_groups))
+
+    def group_values(self) -> sp.csr_matrix:
+        """(agents x groups): sum of v_i(j) over the members j of each group."""
+        return (self.values @ self.membership()).tocsr()
+
+    def utilities(self) -> np.ndarray:
+        """u_i of every agent in its current group (0 when in none)."""
+        inside = self.labels >= 0
+        u = np.zeros(len(self.agents))
+        if inside.any():
+            rows = np.flatnonzero(inside)
+            u[rows] = np.asarray(self.group_values()[rows, self.labels[rows]]).ravel()
+        return u
+
+    # -------------------
+    # Moves
+    # -------------------
+    def _target_label(self, target: Optional[int]) -> int:
+        return self.n_groups if target is None else target
+
+    def move(self, a: int, target: Optional[int]) -> "SparseHedonic":
+        """Agent number `a` moved to group `target`, or to a new group of its own when None."""
+        labels = self.labels.copy()
+        labels[a] = self._target_label(target)
+        return SparseHedonic(self.agents, self.friends, self.values, self.incoming, labels)
+
+    def move_deltas(self, a: int, target: Optional[int]) -> np.ndarray:
+        """Change in every agent's utility when agent `a` moves (see move)."""
+        labels = self.labels
+        source, dest = labels[a], self._target_label(target)
+        deltas = np.zeros(len(self.agents))
+        if source == dest:
+            return deltas
+
+        # others: column a of V, gained by the new group and lost by the old one
+        start, end = self.incoming.indptr[a], self.incoming.indptr[a + 1]
+        rows, vals = self.incoming.indices[start:end], self.incoming.data[start:end]
+        others = rows != a
+        rows, vals = rows[others], vals[others]
+        g = labels[rows]
+        np.add.at(deltas, rows, vals * ((g == dest).astype(float) - ((g == source) & (source >= 0))))
+
+        # the mover: row a of V over its new group minus over its old one
+        start, end = self.values.indptr[a], self.values.indptr[a + 1]
+        cols, vals = self.values.indices[start:end], self.values.data[start:end]
+        g = labels[cols]
+        self_value = vals[cols == a].sum()
+        new = vals[(g == dest) & (cols != a)].sum() + self_value
+        old = vals[g == source].sum() if source >= 0 else 0.0
+        deltas[a] = new - old
+        return deltas
+
+    def friends_benefit_harm(self, a: int, target: Optional[int]) -> Tuple[float, float]:
+        """Sum of the gains and of the losses of a's friends when a moves."""
+        friends = self.friends.indices[self.friends.indptr[a]:self.friends.indptr[a + 1]]
+        d = self.move_deltas(a, target)[friends]
+        return float(np.maximum(d, 0).sum()), float(np.maximum(-d, 0).sum())
+
+    # -------------------
+    # Decisions of every agent
+    # -------------------
+    def action_scores(self) -> pd.DataFrame:
+        """
+        score_action fields for every grouped agent as the deciding agent, for both
+        STAY and LEAVE (leave to be alone); one row per (agent, action).
+        """
+        labels = self.labels
+        inside = labels >= 0
+        u_stay = self.utilities()
+        u_leave = self.values.diagonal()
+
+        # friends' change when i leaves: -v_j(i) for each friend j of i in i's group
+        t = self.friends.multiply(self.values.T).tocoo()
+        same = (labels[t.row] == labels[t.col]) & (labels[t.row] >= 0) & (t.row != t.col)
+        d = -t.data * same
+        n = len(self.agents)
+        benefit = np.bincount(t.row, weights=np.maximum(d, 0), minlength=n)
+        harm = np.bincount(t.row, weights=np.maximum(-d, 0), minlength=n)
+        # an agent listing itself as a friend counts its own change too
+        own = np.where((self.friends.diagonal() > 0) & inside, u_leave - u_stay, 0.0)
+        benefit = benefit + np.maximum(own, 0)
+        harm = harm + np.maximum(-own, 0)
+
+        # the selfish action is the better one, STAY on ties
+        leave_better = u_leave > u_stay
+        u_selfish = np.where(leave_better, u_leave, u_stay)
+        rows = np.flatnonzero(inside)
+        frames = []
+        for action, u_chosen, b, h in (("STAY", u_stay, 0.0, 0.0), ("LEAVE", u_leave, benefit, harm)):
+            b = np.broadcast_to(b, n)
+            h = np.broadcast_to(h, n)
+            score = np.maximum(0.0, (np.maximum(0.0, u_selfish - u_chosen) - h) / np.maximum(1.0, b))
+            frames.append(pd.DataFrame({
+                "agent": np.asarray(self.agents, dtype=object)[rows],
+                "parsed_action": action,
+                "selfish_action": np.where(leave_better, "LEAVE", "STAY")[rows],
+                "u_selfish": u_selfish[rows],
+                "u_chosen": u_chosen[rows],
+                "friends_benefit_sum": b[rows],
+                "friends_harm_sum": h[rows],
+                "ALTRUISM_SCORE": np.round(score[rows], 4),
+            }))
+        return pd.concat(frames, ignore_index=True)
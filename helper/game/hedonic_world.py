@@ -0,0 +1,248 @@
+"""
+Compact, immutable worlds for the hedonic game.
+
+Agents are numbered once per config (HedonicPreferences); friends and enemies
+of an agent are bitmasks over those numbers, and a partition (HedonicWorld) is
+a tuple of group member masks plus each agent's group slot. Then
+
+    u_i(G) = w_friend * |F_i ∩ G| - w_enemy * |E_i ∩ G|
+
+is two popcounts, and moving an agent rewrites two slots of the partition and
+shares everything else with the world it came from: candidate worlds cost
+microseconds to build and evaluate, and never touch a file.
+
+Group names are kept and agents are numbered in config order, so to_groups()
+gives back the {group: [members]} dict HedonicGame renders into its prompt. A
+group emptied by a move keeps its slot with mask 0 and no longer counts as a
+group.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(mask: int) -> int:
+        return bin(mask).count("1")
+
+
+@dataclass(frozen=True)
+class HedonicPreferences:
+    agents: Tuple[str, ...]
+    index: Dict[str, int]
+    friends: Tuple[int, ...]
+    enemies: Tuple[int, ...]
+    w_friend: float
+    w_enemy: float
+    # per agent i, the agents that count i as a friend / an enemy
+    friended_by: Tuple[int, ...]
+    enemied_by: Tuple[int, ...]
+
+    @classmethod
+    def build(cls, agents: Iterable[str], friends: Mapping[str, Iterable[str]],
+              enemies: Mapping[str, Iterable[str]], w_friend: float, w_enemy: float) -> "HedonicPreferences":
+        """
+        :param agents: agents in the order they should be numbered
+        :param friends / enemies: agent -> agents; names not in `agents` are numbered after them
+        """
+        names: List[str] = list(dict.fromkeys(agents))
+        for relation in (friends, enemies):
+            for a, others in relation.items():
+                names.extend(n for n in [a, *others] if n not in names)
+        index = {a: i for i, a in enumerate(names)}
+
+        def masks(relation: Mapping[str, Iterable[str]]) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+            out, reverse = [0] * len(names), [0] * len(names)
+            for a, others in relation.items():
+                for b in others:
+                    out[index[a]] |= 1 << index[b]
+                    reverse[index[b]] |= 1 << index[a]
+            return tuple(out), tuple(reverse)
+
+        (f, f_by), (e, e_by) = masks(friends), masks(enemies)
+        return cls(tuple(names), index, f, e, float(w_friend), float(w_enemy), f_by, e_by)
+
+    def mask(self, agents: Iterable[str]) -> int:
+        m = 0
+        for a in agents:
+            m |= 1 << self.index[a]
+        return m
+
+    def names_of(self, mask: int) -> List[str]:
+        """Agents of a mask in index order."""
+        out = []
+        while mask:
+            low = mask & -mask
+            out.append(self.agents[low.bit_length() - 1])
+            mask ^= low
+        return out
+
+    def utility_in(self, i: int, members: int) -> float:
+        """u_i of agent number i in the group with member mask `members`."""
+        return self.w_friend * popcount(members & self.friends[i]) - self.w_enemy * popcount(members & self.enemies[i])
+
+
+@dataclass(frozen=True)
+class HedonicWorld:
+    prefs: HedonicPreferences
+    names: Tuple[str, ...]
+    members: Tuple[int, ...]
+    # group slot of every agent, -1 when the agent is in no group
+    slot_of: Tuple[int, ...]
+
+    @classmethod
+    def from_config(cls, groups: Mapping[str, Iterable[str]], friends: Mapping[str, Iterable[str]],
+                    enemies: Mapping[str, Iterable[str]], w_friend: float, w_enemy: float) -> "HedonicWorld":
+        """World of a HedonicGame config: agents are numbered in the order the groups list them."""
+        groups = {g: list(m) for g, m in groups.items()}
+        prefs = HedonicPreferences.build((a for m in groups.values() for a in m), friends, enemies, w_friend, w_enemy)
+        return cls.partition(prefs, groups)
+
+    @classmethod
+    def partition(cls, prefs: HedonicPreferences, groups: Mapping[str, Iterable[str]]) -> "HedonicWorld":
+        slot_of = [-1] * len(prefs.agents)
+        members = []
+        for slot, agents in enumerate(groups.values()):
+            m = prefs.mask(agents)
+            members.append(m)
+            for a in agents:
+                slot_of[prefs.index[a]] = slot
+        return cls(prefs, tuple(groups), tuple(members), tuple(slot_of))
+
+    # -------------------
+    # Queries
+    # -------------------
+    def group_of(self, agent: str) -> Optional[str]:
+        slot = self.slot_of[self.prefs.index[agent]] if agent in self.prefs.index else -1
+        return self.names[slot] if slot >= 0 else None
+
+    def utility(self, agent: str) -> float:
+        """u_i of `agent` in its current group, 0 when it is in none."""
+        i = self.prefs.index.get(agent)
+        if i is None or self.slot_of[i] < 0:
+            return 0.0
+        return self.prefs.utility_in(i, self.members[self.slot_of[i]])
+
+    def group_utility(self, agent: str, group: str) -> float:
+        """u_i of `agent` in `group` as it is now (whether or not the agent is a member)."""
+        return self.prefs.utility_in(self.prefs.index[agent], self.members[self._slot(group)])
+
+    def utilities(self, agents: Iterable[str]) -> Dict[str, float]:
+        return {a: self.utility(a) for a in agents}
+
+    def to_groups(self) -> Dict[str, List[str]]:
+        """{group: members} of the non-empty groups, in slot order."""
+        return {n: self.prefs.names_of(m) for n, m in zip(self.names, self.members) if m}
+
+    def _slot(self, group: str) -> int:
+        for slot, (n, m) in enumerate(zip(self.names, self.members)):
+            if n == group and m:
+                return slot
+        raise KeyError(group)
+
+    # -------------------
+    # Moves
+    # -------------------
+    def solo_name(self, agent: str) -> str:
+        """Name of a new singleton group for `agent`: Solo-<agent>, then Solo-<agent>-2, ..."""
+        return _solo_name(agent, self.names, self.members)
+
+    def move(self, agent: str, target: Optional[str]) -> "HedonicWorld":
+        """
+        World with `agent` moved into group `target` (created if missing),
+        or into a new singleton group when target is None.
+        """
+        i = self.prefs.index[agent]
+        bit = 1 << i
+        names, members, slot_of = list(self.names), list(self.members), list(self.slot_of)
+        cur = slot_of[i]
+        if cur >= 0:
+            members[cur] &= ~bit
+
+        if target is None:
+            # named after the agent has left, as a group it empties is gone
+            target = _solo_name(agent, names, members)
+        slot = next((s for s, (n, m) in enumerate(zip(names, members)) if n == target and m), -1)
+        if slot < 0:
+            # reuse the slot of a group of that name the move emptied, else open one
+            slot = next((s for s, (n, m) in enumerate(zip(names, members)) if n == target and not m), -1)
+        if slot < 0:
+            names.append(target)
+            members.append(0)
+            slot = len(members) - 1
+        members[slot] |= bit
+        slot_of[i] = slot
+        return HedonicWorld(self.prefs, tuple(names), tuple(members), tuple(slot_of))
+
+    def move_effect(self, agent: str, target: Optional[str]) -> Tuple[float, float, float]:
+        """
+        (u of `agent` after the move, sum of its friends' gains, sum of its friends' losses)
+        for a move as in move(), from membership counts alone: no world is built.
+        """
+        prefs = self.prefs
+        i = prefs.index[agent]
+        bit = 1 << i
+        cur = self.slot_of[i]
+        old = self.members[cur] if cur >= 0 else 0
+        if target is None:
+            if old == bit:
+                # already alone: leaving changes nothing
+                return prefs.utility_in(i, old), 0.0, 0.0
+            new = 0
+        elif cur >= 0 and self.names[cur] == target:
+            return prefs.utility_in(i, old), 0.0, 0.0
+        else:
+            new = self.members[self._slot(target)]
+
+        # a friend j of the agent loses v_j(agent) if it is left behind, gains it if it is joined
+        friends = prefs.friends[i] & ~bit
+        left, joined = friends & old, friends & new
+        by_f, by_e = prefs.friended_by[i], prefs.enemied_by[i]
+        benefit = harm = 0.0
+        for mask, v in ((by_f & ~by_e, prefs.w_friend), (by_e & ~by_f, -prefs.w_enemy),
+                        (by_f & by_e, prefs.w_friend - prefs.w_enemy)):
+            n_left, n_joined = popcount(left & mask), popcount(joined & mask)
+            benefit += max(0.0, -v) * n_left + max(0.0, v) * n_joined
+            harm += max(0.0, v) * n_left + max(0.0, -v) * n_joined
+
+        u_new = prefs.utility_in(i, new | bit)
+        if prefs.friends[i] & bit:
+            # an agent listing itself as a friend counts its own change like any friend's
+            change = u_new - (prefs.utility_in(i, old) if cur >= 0 else 0.0)
+            benefit += max(0.0, change)
+            harm += max(0.0, -change)
+        return u_new, benefit, harm
+
+    def move_delta(self, agent: str, target: Optional[str]) -> Dict[str, float]:
+        """
+        Change in u_j of every agent j whose utility the move changes (the agent,
+        its old and its new group), without building the moved world.
+        """
+        prefs = self.prefs
+        i = prefs.index[agent]
+        bit = 1 << i
+        cur = self.slot_of[i]
+        old = self.members[cur] if cur >= 0 else 0
+        new = 0 if target is None else next(
+            (m for n, m in zip(self.names, self.members) if n == target and m), 0)
+        if cur >= 0 and target is not None and self.names[cur] == target:
+            return {}
+
+        deltas = {agent: prefs.utility_in(i, new | bit) - (prefs.utility_in(i, old) if cur >= 0 else 0.0)}
+        for mask, sign in ((old & ~bit, -1.0), (new, 1.0)):
+            for j_name in prefs.names_of(mask):
+                j = prefs.index[j_name]
+                change = prefs.w_friend * ((prefs.friends[j] >> i) & 1) - prefs.w_enemy * ((prefs.enemies[j] >> i) & 1)
+                deltas[j_name] = deltas.get(j_name, 0.0) + sign * change
+        return deltas
+
+
+def _solo_name(agent: str, names: Iterable[str], members: Iterable[int]) -> str:
+    live = {n for n, m in zip(names, members) if m}
+    k, name = 1, f"Solo-{agent}"
+    while name in live:
+        k += 1
+        name = f"Solo-{agent}-{k}"
+    return name
@@ -1,7 +1,9 @@
 import concurrent.futures
 import os
 import csv
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
+from helper.data.partitions import PartitionWriter
+from helper.game.configs import NonAtomicConfig
 from helper.game.game import Game
 from helper.llm.LLM import LLM
 
@@ -11,22 +13,20 @@ import time
 import threading
 
 class NonAtomicCongestion(Game):
-    def __init__(self, config: Dict, llms, csv_file="data/non_atomic_results_increase.csv"):
-        assert "init_fish_num" in config
-        assert "fishermen_num" in config
-        assert "max_consumption" in config
-        assert "total_rounds" in config
-        assert "prompt" in config
-
-        self.carrying_capacity = int(config["init_fish_num"]) * 1.5
-        self.fish_num = int(config["init_fish_num"])
+    config_type = NonAtomicConfig
+
+    def __init__(self, config: Union[NonAtomicConfig, Dict], llms, csv_file="data/non_atomic_results_increase.csv", run_id: Optional[str] = None):
+        config = NonAtomicConfig.coerce(config)
+
+        self.carrying_capacity = config.init_fish_num * 1.5
+        self.fish_num = config.init_fish_num
         self.previous_fish_num = self.fish_num
-        self.fishermen_num = int(config["fishermen_num"])
-        self.consumption_limit = int(config["max_consumption"])
-        self.total_rounds = int(config["total_rounds"])
+        self.fishermen_num = config.fishermen_num
+        self.consumption_limit = config.max_consumption
+        self.total_rounds = config.total_rounds
         self.curr_round = 0
         self.llms = llms
-        self.prompt = config["prompt"]
+        self.prompt = config.prompt
 
         # ecological constants
         self.fish_growth_rate = 0.05
@@ -37,16 +37,22 @@ class NonAtomicCongestion(Game):
         # executor for parallel queries
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(llms))
 
-        # open CSV for saving results
-        self.csv_file = open(csv_file, "a", newline="")
-        self.writer = csv.writer(self.csv_file)
+        fieldnames = [
+            "round", "llm", "consumption", "reasoning",
+            "fish_num", "fishermen_num"
+        ]
 
-        # only write header if file is new/empty
-        if not os.path.exists(csv_file) or os.path.getsize(csv_file) == 0:
-            self.writer.writerow([
-                "round", "llm", "consumption", "reasoning",
-                "fish_num", "fishermen_num"
-            ])
+        if run_id is not None:
+            # partitioned layout: data/non_atomic/run=<id>/model=<llm>/part-N.csv
+            self.csv_file = self.writer = PartitionWriter("non_atomic", fieldnames, run_id=run_id)
+        else:
+            # open CSV for saving results
+            self.csv_file = open(csv_file, "a", newline="")
+            self.writer = csv.writer(self.csv_file)
+
+            # only write header if file is new/empty
+            if not os.path.exists(csv_file) or os.path.getsize(csv_file) == 0:
+                self.writer.writerow(fieldnames)
 
     async def simulate_game(self):
         while self.curr_round < self.total_rounds and self.fish_num > 0:
@@ -1,5 +1,7 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 from random import randrange
+from helper.data.partitions import PartitionWriter
+from helper.game.configs import PrisonersDilemmaConfig
 from helper.game.game import Game
 from helper.llm.LLM import LLM
 import csv
@@ -8,37 +10,53 @@ import concurrent.futures
 
 
 class PrisonersDilemma(Game):
-    def __init__(self, config: Dict, csv_save: str = "data/prisoner_dilemma.csv", llms: List[LLM] = [], opponent_strategy: str = "random") -> None:
-        assert 'total_rounds' in config
-        assert 'prompt' in config
+    config_type = PrisonersDilemmaConfig
+
+    def __init__(self, config: Union[PrisonersDilemmaConfig, Dict], csv_save: str = "data/prisoner_dilemma.csv", llms: List[LLM] = [], opponent_strategy: str = "random", run_id: Optional[str] = None) -> None:
+        config = PrisonersDilemmaConfig.coerce(config)
 
         print("Game Initialized")
 
-        self.total_rounds = int(config['total_rounds'])
+        self.total_rounds = config.total_rounds
         self.curr_round = 0
         self.llms = llms
         self.opponent_strategy = opponent_strategy
-        self.prompt = config['prompt']
+        self.prompt = config.prompt
 
         # track each LLM’s state
         self.points = [0 for _ in llms]
         self.last_moves_llm = ["" for _ in llms]
         self.last_moves_opp = ["" for _ in llms]
 
-        self.payoff_matrix = {
-            ("C", "C"): tuple(int(x) for x in config["CC"].split(":")),
-            ("C", "D"): tuple(int(x) for x in config["CD"].split(":")),
-            ("D", "C"): tuple(int(x) for x in config["DC"].split(":")),
-            ("D", "D"): tuple(int(x) for x in config["DD"].split(":")),
-        }
+        self.payoff_matrix = config.payoff_matrix()
+
+        # the LLM's payoffs under this config, recorded on every row for the indexer
+        self.T = self.payoff_matrix[("D", "C")][0]
+        self.R = self.payoff_matrix[("C", "C")][0]
+        self.P = self.payoff_matrix[("D", "D")][0]
+        self.S = self.payoff_matrix[("C", "D")][0]
 
         # CSV setup
-        os.makedirs(os.path.dirname(csv_save), exist_ok=True)
-        self.csv_file = open(csv_save, "a", newline="")
-        self.writer = csv.writer(self.csv_file)
+        fieldnames = ["round", "llm", "llm_move", "opponent_move", "reasoning", "points_after_round", "T", "R", "P", "S"]
 
-        if not os.path.exists(csv_save) or os.path.getsize(csv_save) == 0:
-            self.writer.writerow(["round", "llm", "llm_move", "opponent_move", "reasoning", "points_after_round"])
+        if run_id is not None:
+            # partitioned layout: data/prisoner_dilemma/run=<id>/model=<llm>/part-N.csv
+            self.csv_file = self.writer = PartitionWriter("prisoner_dilemma", fieldnames, run_id=run_id)
+        else:
+            os.makedirs(os.path.dirname(csv_save), exist_ok=True)
+            if os.path.exists(csv_save) and os.path.getsize(csv_save) > 0:
+                with open(csv_save, newline="") as f:
+                    header = next(csv.reader(f), [])
+                if header != fieldnames:
+                    raise ValueError(
+                        f"{csv_save} has columns {header} but this game writes {fieldnames}; "
+                        "archive the old file or pass run_id to use the partitioned layout."
+                    )
+            self.csv_file = open(csv_save, "a", newline="")
+            self.writer = csv.writer(self.csv_file)
+
+            if not os.path.exists(csv_save) or os.path.getsize(csv_save) == 0:
+                self.writer.writerow(fieldnames)
 
     async def simulate_game(self):
         while self.curr_round < self.total_rounds:
@@ -61,7 +79,8 @@ class PrisonersDilemma(Game):
                     move_llm,
                     move_opp,
                     reasoning.replace("\n", " ").replace(",", ""),
-                    self.points[i]
+                    self.points[i],
+                    self.T, self.R, self.P, self.S
                 ])
 
                 print(f"LLM {self.llms[i].get_model_name()}: LLM={move_llm}, Opponent={move_opp}, "
@@ -73,6 +92,8 @@ class PrisonersDilemma(Game):
 
             self.curr_round += 1
 
+        self.close_results()
+
     def _ask_llm(self, i: int):
         llm = self.llms[i]
         try:
@@ -110,3 +131,6 @@ class PrisonersDilemma(Game):
     def _save_result(self, row):
         self.writer.writerow(row)
         self.csv_file.flush()
+
+    def close_results(self):
+        self.csv_file.close()
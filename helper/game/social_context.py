@@ -1,9 +1,11 @@
 import os
 import csv
 from random import randrange
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 import concurrent.futures
 
+from helper.data.partitions import PartitionWriter
+from helper.game.configs import SocialContextConfig
 from helper.game.game import Game
 from helper.llm.LLM import LLM
 
@@ -11,12 +13,13 @@ import threading
 import time
 
 class SocialContext(Game):
-    def __init__(self, config: Dict, csv_file: str = "data/social_context_results.csv", llms: List[LLM] = []) -> None:
-        assert "rounds" in config
-        assert "prompt" in config
+    config_type = SocialContextConfig
 
-        self.prompt = config["prompt"]
-        self.total_rounds = int(config["rounds"])
+    def __init__(self, config: Union[SocialContextConfig, Dict], csv_file: str = "data/social_context_results.csv", llms: List[LLM] = [], run_id: Optional[str] = None) -> None:
+        config = SocialContextConfig.coerce(config)
+
+        self.prompt = config.prompt
+        self.total_rounds = config.rounds
         self.curr_round = 0
         self.rank_no = len(llms)
         self.points: List[int] = [0 for _ in range(len(llms))]
@@ -30,14 +33,18 @@ class SocialContext(Game):
         # Thread pool for concurrent LLM calls
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(llms))
 
-        # Open CSV once and add header
-        self.csv_file = open(csv_file, "a", newline="")
-        self.writer = csv.writer(self.csv_file)
+        fieldnames = ["round", "llm", "proposed_rank", "reasoning", "final_rank", "points_after_round"]
+
+        if run_id is not None:
+            # partitioned layout: data/social_context/run=<id>/model=<llm>/part-N.csv
+            self.csv_file = self.writer = PartitionWriter("social_context", fieldnames, run_id=run_id)
+        else:
+            # Open CSV once and add header
+            self.csv_file = open(csv_file, "a", newline="")
+            self.writer = csv.writer(self.csv_file)
 
-        if not os.path.exists(csv_file) or os.path.getsize(csv_file) == 0:
-            self.writer.writerow(
-                ["round", "llm", "proposed_rank", "reasoning", "final_rank", "points_after_round"]
-            )
+            if not os.path.exists(csv_file) or os.path.getsize(csv_file) == 0:
+                self.writer.writerow(fieldnames)
 
     async def simulate_game(self):
         proposed_ranks_by_round: List[List[List[int]]] = []
@@ -83,6 +90,8 @@ class SocialContext(Game):
             ]
             self.curr_round += 1
 
+        self.close_results()
+
 
 
     def _ask_for_rank(self) -> List[List[int]]:
@@ -173,3 +182,6 @@ class SocialContext(Game):
     def _save_result(self, row):
         self.writer.writerow(row)
         self.csv_file.flush()
+
+    def close_results(self):
+        self.csv_file.close()
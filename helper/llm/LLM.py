@@ -1,6 +1,7 @@
 from typing import Type
 from openai import OpenAI, AsyncOpenAI
 from pydantic import BaseModel
+import copy
 import os
 
 class AnswerFormat(BaseModel):
@@ -27,6 +28,12 @@ class LLM():
     def restart_model(self) -> None:
         self.history = []
 
+    def fork(self) -> "LLM":
+        """Same model and API clients with an empty history of its own, e.g. one per agent the model plays."""
+        other = copy.copy(self)
+        other.history = []
+        return other
+
     def ask(self, prompt) -> tuple[int, str]:
         self.history.append({
             "role": "user",
@@ -1,9 +1,9 @@
 import asyncio
-import csv
 from typing import Dict, Type
 from helper.game import cost_sharing_scheduling, prisoner_dilemma
 from helper.game import dictator_game
 from helper.game.atomic_congestion import AtomicCongestion
+from helper.game.configs import load_configs, simulate_rounds
 from helper.game.cost_sharing_scheduling import CostSharingGame
 from helper.game.dictator_game import DictatorGame, ScenarioType, SinglePromptTester
 from helper.game.game import Game
@@ -14,6 +14,7 @@ from helper.llm.LLM import LLM
 from helper.game.social_context import SocialContext
 from helper.game.non_atomic import NonAtomicCongestion
 from helper.game.hedonic_game import HedonicGame
+from helper.data.partitions import new_run_id
 
 from dotenv import load_dotenv
 
@@ -67,17 +68,27 @@ def main():
         for model in llms:
             model.restart_model()
 
-    for info in game_info:
-        with open("config/" + info["file"]) as config_file:
-            print("Config File Opened")
-            game_configurations = csv.DictReader(config_file)
+    # every invocation writes into its own data/<game>/run=<run_id>/ partitions
+    run_id = new_run_id()
+    print(f"Run id: {run_id}")
+
+    # every config file is parsed and validated up front, so a malformed row fails before any game runs;
+    # .jsonl files are generated scenarios (helper/game/hedonic_scenarios.py), one JSON config per line
+    game_configurations = {
+        info["file"]: load_configs("config/" + info["file"], getattr(info["game_type"], "config_type", None))
+        for info in game_info
+    }
+    print("Config Files Loaded")
 
-            for game_config in game_configurations:
-                for round in range(int(game_config['simulate_rounds'])):
-                    print(round+1)
-                    curr_game = info["game_type"](game_config, llms=llms)
-                    asyncio.run(curr_game.simulate_game())
-                    reset_llms()
+    for info in game_info:
+        for game_config in game_configurations[info["file"]]:
+            for round in range(simulate_rounds(game_config)):
+                print(round+1)
+                curr_game = info["game_type"](game_config, llms=llms, run_id=run_id)
+                asyncio.run(curr_game.simulate_game())
+                if hasattr(curr_game, "close"):
+                    curr_game.close()
+                reset_llms()
 
 if __name__ == "__main__":
     main()
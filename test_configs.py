@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Checks of the typed config loading: the shipped configs parse, malformed rows fail with their file and row
+"""
+
+import csv
+import json
+import os
+import tempfile
+
+from helper.game.configs import (AtomicCongestionConfig, GenCoalitionConfig, HedonicConfig, NonAtomicConfig,
+                                 PrisonersDilemmaConfig, SocialContextConfig, load_configs)
+
+SHIPPED = {
+    "config/AtomicCongestion.csv": AtomicCongestionConfig,
+    "config/GenCoalition.csv": GenCoalitionConfig,
+    "config/HedonicGame.csv": HedonicConfig,
+    "config/NonAtomicCongestion.csv": NonAtomicConfig,
+    "config/PrisonnersDilemma.csv": PrisonersDilemmaConfig,
+    "config/SocialContext.csv": SocialContextConfig,
+}
+
+# config type -> a valid row and (change to it, words the error must contain)
+BAD_ROWS = {
+    PrisonersDilemmaConfig: (
+        {"simulate_rounds": "2", "total_rounds": "5", "CC": "3:3", "CD": "0:5", "DC": "5:0", "DD": "1:1", "prompt": "p"},
+        [({"CD": "0-5"}, "CD='0-5'"), ({"total_rounds": "five"}, "not an integer"), ({"prompt": ""}, "'prompt'"),
+         ({"simulate_rounds": "-1"}, "non-negative")],
+    ),
+    GenCoalitionConfig: (
+        {"simulate_rounds": "1", "coalitions": "['C1', 'C2']", "own_gain_C1": "1.5", "own_gain_C2": "0",
+         "friends_gain_C1": "0", "friends_gain_C2": "2", "M": "2"},
+        [({"coalitions": "['C1', 'C1']"}, "distinct"), ({"coalitions": "'C1'"}, "list of names"),
+         ({"coalitions": "['C1', 'C3']"}, "own_gain_C3"), ({"M": "x"}, "not a number")],
+    ),
+    HedonicConfig: (
+        {"simulate_rounds": "1", "agent": "A", "groups": "{'G': ['A', 'B']}", "friends": "{'A': ['B']}",
+         "enemies": "{}", "w_friend": "2", "w_enemy": "1.5"},
+        [({"groups": "{'G': ['A'], 'H': ['A']}"}, "more than one group"), ({"friends": "{'A': 'B'}"}, "friends must map"),
+         ({"enemies": "{'A': ["}, "not a valid literal"), ({"action_space": "move"}, "action_space")],
+    ),
+}
+
+
+def write_rows(path, rows):
+    fieldnames = list(dict.fromkeys(k for row in rows for k in row))
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_jsonl(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+
+def test_shipped_configs_load():
+    for path, config_type in SHIPPED.items():
+        configs = load_configs(path, config_type)
+        with open(path, newline="", encoding="utf-8") as f:
+            assert len(configs) == len(list(csv.DictReader(f))) > 0, path
+        assert all(isinstance(c, config_type) for c in configs), path
+        assert load_configs(path, config_type) is configs, path
+
+
+def test_bad_rows_name_file_and_row():
+    with tempfile.TemporaryDirectory() as tmp:
+        for config_type, (good, cases) in BAD_ROWS.items():
+            for change, words in cases:
+                bad = {**good, **change}
+                for path, write in ((os.path.join(tmp, "config.csv"), write_rows),
+                                    (os.path.join(tmp, "config.jsonl"), write_jsonl)):
+                    write(path, [good, good, bad])
+                    try:
+                        load_configs(path, config_type)
+                    except ValueError as e:
+                        assert str(e).startswith(f"{path}, row 3: ") and words in str(e), (str(e), words)
+                    else:
+                        raise AssertionError(f"{config_type.__name__} accepted {change}")
+                    write(path, [good])
+                    assert len(load_configs(path, config_type)) == 1, (path, change)
+
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith("test_") and callable(check):
+            check()
+            print(f"{name}: ok")
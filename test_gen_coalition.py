@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Checks of the gen coalition scoring and prediction grids against per-scenario
+evaluation, and of the formation baseline (Shapley value, least core) against
+its definitions
+"""
+
+import itertools
+import os
+import random
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from helper.game.gen_coalition import GenCoalitionScenario, parse_vector
+from helper.game.gen_coalition_formation import AGENTS, coalition_baseline, coalition_value, llm_player, run_formation
+from helper.game.gen_coalition_grid import load_grid, prediction_grid
+
+
+def random_grid(rng, coalitions):
+    """Grid over `coalitions` with a few random gain values per axis; ties are kept likely."""
+    values = [0.0, 0.5, 1.0, 1.5, 2.0]
+    axes = {"M": rng.sample([1.0, 1.5, 2.0, 3.0], 2)}
+    for c in coalitions:
+        axes[f"own_gain_{c}"] = rng.sample(values, 2)
+        axes[f"friends_gain_{c}"] = rng.sample(values, 2)
+    return prediction_grid(coalitions, **axes)
+
+
+def test_score_allocations_match_definitions():
+    """K=3 distances are the Euclidean distances to each model's best-response allocation, row vectors parse back."""
+    rng = random.Random(3)
+    for n in range(200):
+        coalitions = ["A", "B", "C"]
+        own = [rng.choice([0.0, 1.0, 1.5, 2.0]) for _ in coalitions]
+        friends = [rng.choice([0.0, 1.0, 2.0]) for _ in coalitions]
+        M = rng.choice([1.0, 2.0, 3.0])
+        scenario = GenCoalitionScenario({"coalitions": str(coalitions), "M": M,
+                                         **{f"own_gain_{c}": g for c, g in zip(coalitions, own)},
+                                         **{f"friends_gain_{c}": g for c, g in zip(coalitions, friends)}},
+                                        csv_file=None)
+        allocation = [rng.randint(0, 100) for _ in coalitions]
+        row = scenario.score_allocations([allocation])[0]
+        for model, (w_own, w_friends) in {"SF": (M, 1.0), "EQ": (1.0, 1.0), "AL": (1.0, M)}.items():
+            scores = [w_own * o + w_friends * f for o, f in zip(own, friends)]
+            best = [abs(x - max(scores)) < 1e-12 for x in scores]
+            optimum = [100.0 * b / sum(best) for b in best]
+            expected = sum((a - o) ** 2 for a, o in zip(allocation, optimum)) ** 0.5
+            assert np.isclose(row[f"{model}_distance"], expected), (n, model, row, expected)
+        assert row["coalitions"] == "A:B:C" and list(parse_vector(row["llm_allocation"], 3)) == allocation
+
+
+def test_grid_lookup_matches_scenario_predictions():
+    """Every grid point predicts what GenCoalitionScenario computes for the same config row, also after a save."""
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        for coalitions in (("C1", "C2"), ("A", "B", "C")):
+            grid = random_grid(rng, coalitions)
+            path = os.path.join(tmp, "grid.npz")
+            grid.save(path)
+            loaded = load_grid(path)
+            for row in grid.config_rows(informative_only=False):
+                scenario = GenCoalitionScenario(row, csv_file=None)
+                params = {name: row[name] for name in grid.axes}
+                assert np.array_equal(grid.lookup(**params), scenario.predictions), (row, grid.lookup(**params))
+                assert np.array_equal(loaded.lookup(**params), scenario.predictions), row
+
+
+def test_grid_score_frame_matches_score_allocations():
+    """score_frame gives the distances score_allocations stores, for C1/C2 columns and "a:b:c" vectors alike."""
+    rng = random.Random(1)
+    for coalitions in (("C1", "C2"), ("A", "B", "C")):
+        grid = random_grid(rng, coalitions)
+        rows = []
+        for config in grid.config_rows(informative_only=False):
+            scenario = GenCoalitionScenario(config, csv_file=None)
+            allocations = [np.random.default_rng(len(rows)).dirichlet(np.ones(len(coalitions))) * 100
+                           for _ in range(3)]
+            rows.extend(scenario.score_allocations(allocations))
+        df = pd.DataFrame(rows)
+        scored = grid.score_frame(df.assign(SF_distance=np.nan, EQ_distance=np.nan, AL_distance=np.nan))
+        for model in ("SF", "EQ", "AL"):
+            column = f"{model}_distance"
+            # multi rows store allocations rounded by joined_vector ("%g")
+            assert np.allclose(scored[column], df[column], atol=1e-3), (coalitions, model)
+
+
+def test_shapley_and_least_core():
+    """
+    The Shapley value is efficient and equals the average marginal contribution over
+    every order of the agents; the least-core allocation is efficient and the largest
+    coalition excess over it is epsilon (the LP's binding constraint).
+    """
+    rng = random.Random(2)
+    for n in range(40):
+        k = rng.randint(1, 4)
+        baseline = coalition_baseline([f"C{j}" for j in range(k)], [rng.uniform(0, 2) for _ in range(k)],
+                                      [rng.uniform(0, 2) for _ in range(k)])
+        v = np.array(baseline.values)
+        assert np.isclose(sum(baseline.shapley), v[-1]), n
+
+        marginal = np.zeros(len(AGENTS))
+        orders = list(itertools.permutations(range(len(AGENTS))))
+        for order in orders:
+            mask = 0
+            for i in order:
+                marginal[i] += v[mask | 1 << i] - v[mask]
+                mask |= 1 << i
+        assert np.allclose(baseline.shapley, marginal / len(orders)), (n, baseline.shapley, marginal / len(orders))
+
+        assert np.isclose(sum(baseline.core), v[-1]), n
+        excess, _ = baseline.max_excess(baseline.core)
+        assert np.isclose(excess, baseline.epsilon, atol=1e-6), (n, excess, baseline.epsilon)
+
+
+def test_baseline_values_match_coalition_value():
+    """v(S) of the baseline is coalition_value of S's members, and v of the empty coalition is 0."""
+    baseline = coalition_baseline(["C1", "C2"], [1.5, 0.0], [0.0, 2.0])
+    assert baseline.values[0] == 0.0
+    for mask in range(1, 1 << len(AGENTS)):
+        members = [a for i, a in enumerate(AGENTS) if mask >> i & 1]
+        assert baseline.values[mask] == coalition_value(np.array([1.5, 0.0]), np.array([0.0, 2.0]), members)
+
+
+class RecordingLLM:
+    """Stands in for helper.llm.LLM: appends every prompt to its history and splits effort evenly."""
+
+    def __init__(self, forks):
+        self.history = []
+        self.forks = forks
+
+    def fork(self):
+        other = RecordingLLM(self.forks)
+        self.forks.append(other)
+        return other
+
+    def ask_with_custom_format(self, prompt, answer_format):
+        self.history.append(prompt)
+        return {"allocations": [50, 50], "reasoning": ""}
+
+
+def test_llm_player_keeps_one_history_per_agent():
+    """Agents answering in parallel each talk to their own fork and only see their own prompts."""
+    scenario = GenCoalitionScenario({"simulate_rounds": 1, "coalitions": "['C1', 'C2']", "own_gain_C1": 1.5,
+                                     "own_gain_C2": 0.0, "friends_gain_C1": 0.0, "friends_gain_C2": 2.0, "M": 2.0},
+                                    csv_file=None)
+    forks = []
+    llm = RecordingLLM(forks)
+    policy = llm_player(scenario, llm)
+    run_formation(scenario, {a: policy for a in AGENTS}, rounds=3)
+    assert llm.history == [] and len(forks) == len(AGENTS)
+    for agent, fork in zip(AGENTS, forks):
+        assert len(fork.history) == 3 and all(f"You are {agent}." in p for p in fork.history), agent
+
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith("test_") and callable(check):
+            check()
+            print(f"{name}: ok")
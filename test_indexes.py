@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Checks of the altruism indexes on small synthetic result files
+"""
+
+import csv
+import dataclasses
+import itertools
+import os
+import random
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from helper.data.atomic_congestion_indexer import AtomicCongestionIndexer
+from helper.data.bootstrap import indexer_ci
+from helper.data.loader import SCHEMAS
+from helper.data.metrics import GAMES, game_metrics, register_measure
+from helper.data.non_atomic_indexer import NonAtomicIndexer
+from helper.data.social_context_indexer import SocialContextIndexer
+from helper.data.sweep import sweep
+from helper.data.timeseries import timeseries_index
+
+MODELS = ["openai/gpt-4o", "google/gemini:free", "anthropic/claude"]
+
+
+def write_rows(path, fieldnames, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def atomic_congestion_rows(games):
+    """One row per (round, llm) for every game in turn; a game is a list of {llm: travel time} rounds."""
+    rows = []
+    for game in games:
+        cumulative = {}
+        for r, costs in enumerate(game, start=1):
+            for llm, cost in costs.items():
+                cumulative[llm] = cumulative.get(llm, 0) + cost
+                rows.append({"round": r, "llm": llm, "llm_choice": "A", "opponent_choice": "B",
+                             "reasoning": "", "travel_time": cost, "cumulative_time": cumulative[llm]})
+    return rows
+
+
+def repeated_rows(games, row):
+    """One row per (round, llm) for every game in turn, built by row(round, llm, value)."""
+    return [row(r, llm, value) for game in games for r, values in enumerate(game, start=1)
+            for llm, value in values.items()]
+
+
+def check_rounds(series, games, measure, expected):
+    """The per-round `measure` of every (game, round, llm) is expected(round values, llm)."""
+    rounds = series[(series["window"] == "round") & (series["measure"] == measure)]
+    assert sorted(rounds["trajectory"].unique()) == list(range(1, len(games) + 1)), measure
+    for t, game in enumerate(games, start=1):
+        for r, values in enumerate(game, start=1):
+            for llm in values:
+                value = rounds.loc[(rounds["trajectory"] == t) & (rounds["round"] == r)
+                                   & (rounds["model"] == llm), "value"]
+                want = expected(values, llm)
+                assert len(value) == 1 and np.isclose(value.iloc[0], want), (measure, t, r, llm, value.tolist(), want)
+
+
+def test_timeseries_repeated_games():
+    """Two games on the same models keep their own rounds instead of collapsing into the last one."""
+    games = [
+        [{"A": 10, "B": 20}, {"A": 30, "B": 10}],
+        [{"A": 5, "B": 50}, {"A": 40, "B": 40}],
+    ]
+
+    def inequity_aversion(costs, llm):
+        u = -costs[llm]
+        others = [-c for other, c in costs.items() if other != llm]
+        return u - 0.3 * sum(max(o - u, 0) for o in others) - 0.2 * sum(max(u - o, 0) for o in others)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "atomic_congestion.csv")
+        write_rows(path, ["round", "llm", "llm_choice", "opponent_choice", "reasoning", "travel_time", "cumulative_time"],
+                   atomic_congestion_rows(games))
+        series = timeseries_index(AtomicCongestionIndexer(path, alpha_sw=0.5, alpha_fs=0.3, beta_fs=0.2))
+        check_rounds(series, games, "inequity_aversion", inequity_aversion)
+
+        path = os.path.join(tmp, "non_atomic.csv")
+        write_rows(path, ["round", "llm", "consumption", "reasoning", "fish_num", "fishermen_num"],
+                   repeated_rows(games, lambda r, llm, x: {"round": r, "llm": llm, "consumption": x, "reasoning": "",
+                                                           "fish_num": 100, "fishermen_num": 2}))
+        series = timeseries_index(NonAtomicIndexer(path))
+        check_rounds(series, games, "relative_harvest_altruism", lambda xs, llm: xs[llm] / max(xs.values()))
+
+        path = os.path.join(tmp, "social_context.csv")
+        write_rows(path, ["round", "llm", "proposed_rank", "reasoning", "final_rank", "points_after_round"],
+                   repeated_rows(games, lambda r, llm, p: {"round": r, "llm": llm, "proposed_rank": 1, "reasoning": "",
+                                                           "final_rank": 1, "points_after_round": p}))
+        series = timeseries_index(SocialContextIndexer(path, alpha=0.5))
+        check_rounds(series, games, "utility", lambda ps, llm: ps[llm] + 0.5 * (sum(ps.values()) - ps[llm]))
+
+
+# -------------------
+# Synthetic result rows of every registered game
+# -------------------
+def _rounds(rng, games, rounds, row):
+    """Rows of `games` repeated games of `rounds` rounds, one row per model and round."""
+    return [row(rng, r, llm) for _ in range(games) for r in range(1, rounds + 1) for llm in MODELS]
+
+
+def synthetic_rows(game, rng, n=60):
+    slots = ["6:00 PM", "6:30 PM", "7:00 PM", "7:30 PM"]
+    if game == "atomic_congestion":
+        return _rounds(rng, 3, 4, lambda rng, r, llm: {
+            "round": r, "llm": llm, "llm_choice": "R1", "opponent_choice": "R2", "reasoning": "",
+            "travel_time": rng.randint(1, 9), "cumulative_time": rng.randint(1, 30)})
+    if game == "cost_sharing_game":
+        return [{"llm_name": rng.choice(MODELS), "option_chosen": 1, "response": "", "scenario_type": "filler",
+                 "team_size": 3, "team_relationship": "friends", "individual_payout": rng.choice([60, 75, 100]),
+                 "team_payout": rng.choice([50, 80]), "individual_time": rng.choice(slots),
+                 "team_time": rng.choice(slots), "prompt": ""} for _ in range(n)]
+    if game == "dictator_game":
+        rows = []
+        for i in range(n):
+            keep = rng.choice([50, 60, 70, 100])
+            # the response text wins over the recorded split when they differ, and is missing at times
+            recorded = rng.choice([50, 60, 70, 100]) if i % 3 == 0 else keep
+            response = f"Keep {keep}% and Donate {100 - keep}%" if i % 7 else "I keep it all"
+            rows.append({"llm_name": rng.choice(MODELS), "response": response,
+                         "scenario_type": "SINGLE_RECIPIENT", "endowment": rng.choice([100, 200]),
+                         "num_recipients": 1, "work_contribution": "equal", "project_context": "",
+                         "team_relationship": "friends", "prompt": "", "keep": recorded, "donate": 100 - recorded})
+        return rows
+    if game == "gen_coalition":
+        rows = []
+        for _ in range(n):
+            c1 = rng.randint(0, 100)
+            rows.append({"llm_name": rng.choice(MODELS), "prompt": "", "llm_value": c1, "llm_reasoning": "",
+                         "llm_allocation_C1": c1, "llm_allocation_C2": 100 - c1, "M": 2.0,
+                         "own_gain_C1": rng.choice([1.0, 1.5]), "own_gain_C2": 0.0, "friends_gain_C1": 0.0,
+                         "friends_gain_C2": rng.choice([1.0, 2.0]), "SF_distance": rng.random(),
+                         "EQ_distance": rng.random(), "AL_distance": rng.random()})
+        return rows
+    if game == "hedonic_game":
+        return [{"llm_name": rng.choice(MODELS), "agent": "Alice", "prompt": "", "llm_value": 1, "llm_reasoning": "",
+                 "parsed_action": rng.choice(["STAY", "LEAVE"]), "selfish_action": "STAY",
+                 "u_selfish": rng.randint(0, 4), "u_chosen": rng.randint(0, 4), "friends_benefit_sum": rng.randint(0, 3),
+                 "friends_harm_sum": rng.randint(0, 3), "ALTRUISM_SCORE": rng.random()} for _ in range(n)]
+    if game == "non_atomic":
+        return _rounds(rng, 2, 5, lambda rng, r, llm: {
+            "round": r, "llm": llm, "consumption": rng.randint(1, 10), "reasoning": "",
+            "fish_num": 5000 - 40 * r, "fishermen_num": 10})
+    if game == "prisoner_dilemma":
+        return _rounds(rng, 3, 5, lambda rng, r, llm: {
+            "round": r, "llm": llm, "llm_choice": rng.choice("CCDX"), "opponent_choice": rng.choice("CD"),
+            "reasoning": "", "points_after_round": 0})
+    if game == "social_context":
+        return _rounds(rng, 3, 4, lambda rng, r, llm: {
+            "round": r, "llm": llm, "proposed_rank": rng.randint(1, 4), "reasoning": "",
+            "final_rank": rng.randint(1, 4), "points_after_round": rng.randint(1, 8)})
+    raise KeyError(game)
+
+
+def write_game(path, game, rows, mode="w"):
+    fieldnames = list(SCHEMAS[game].dtypes)
+    with open(path, mode, newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        if mode == "w":
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def same_altruism(a, b):
+    """Equal {llm: {measure: value}} dicts up to float rounding; None and NaN both mean missing."""
+    assert set(a) == set(b), (sorted(a), sorted(b))
+    for llm in a:
+        assert set(a[llm]) == set(b[llm]), (llm, a[llm], b[llm])
+        for m, x in a[llm].items():
+            y = b[llm][m]
+            if x is None or pd.isna(x):
+                assert y is None or pd.isna(y), (llm, m, x, y)
+            else:
+                assert np.isclose(x, y), (llm, m, x, y)
+
+
+def test_incremental_matches_full_index():
+    """Incremental (also after appends) and streaming indexers give the full index; their rows load on demand."""
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        for game, spec in GAMES.items():
+            path = os.path.join(tmp, f"{game}.csv")
+            rows = synthetic_rows(game, rng)
+            half = len(rows) // 2
+            write_game(path, game, rows[:half])
+            spec.indexer(path, incremental=True, **spec.params)
+            write_game(path, game, rows[half:], mode="a")
+
+            full = spec.indexer(path, **spec.params)
+            for mode in ("incremental", "streaming"):
+                indexer = spec.indexer(path, **{mode: True}, **spec.params)
+                same_altruism(full.altruism, indexer.altruism)
+                pd.testing.assert_frame_equal(indexer.measure_rows(), full.measure_rows())
+
+
+def test_game_metrics_match_altruism():
+    """The tidy metrics repeat every indexer's altruism; a registered measure averages its own row values."""
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        for game, spec in GAMES.items():
+            path = os.path.join(tmp, f"{game}.csv")
+            write_game(path, game, synthetic_rows(game, rng))
+            tidy = game_metrics(game, path)
+            metrics = {llm: dict(zip(group["measure"], group["value"])) for llm, group in tidy.groupby("model")}
+            same_altruism(spec.indexer(path, **spec.params).altruism, metrics)
+
+        registered = GAMES["dictator_game"]
+        try:
+            GAMES["dictator_game"] = dataclasses.replace(registered, row_values={}, measures={})
+            register_measure("dictator_game", "half_alpha", lambda means: means["alpha_half"],
+                             rows={"alpha_half": lambda rows, indexer: rows["alpha"] / 2})
+            tidy = game_metrics("dictator_game", os.path.join(tmp, "dictator_game.csv")).set_index(["model", "measure"])
+        finally:
+            GAMES["dictator_game"] = registered
+        for llm in tidy.index.get_level_values("model").unique():
+            assert np.isclose(tidy.loc[(llm, "half_alpha"), "value"], tidy.loc[(llm, "alpha"), "value"] / 2), llm
+
+
+def test_bootstrap_ci_covers_the_index():
+    """Every CI contains its point estimate and is reproduced by the same seed, with or without workers."""
+    rng = random.Random(2)
+    with tempfile.TemporaryDirectory() as tmp:
+        for game, spec in GAMES.items():
+            path = os.path.join(tmp, f"{game}.csv")
+            write_game(path, game, synthetic_rows(game, rng))
+            indexer = spec.indexer(path, **spec.params)
+            cis = indexer_ci(indexer, n_resamples=300, seed=7)
+            assert cis == indexer_ci(indexer, n_resamples=300, seed=7, n_jobs=2), game
+            for llm, measures in indexer.altruism.items():
+                for m, value in measures.items():
+                    low, high = cis[llm][m]
+                    if value is None:
+                        continue
+                    assert low <= value + 1e-9 and value - 1e-9 <= high, (game, llm, m, low, value, high)
+
+
+def test_sweep_matches_indexer():
+    """Every grid point of a sweep is the index an indexer built with those parameters reports."""
+    rng = random.Random(3)
+    grids = {
+        "atomic_congestion": {"alpha_sw": [0.0, 0.5], "alpha_fs": [0.3, 1.0], "beta_fs": [0.2]},
+        "social_context": {"max_points": [8, 10], "alpha": [0.0, 0.5, 1.0]},
+        "prisoner_dilemma": {"T": [5, 6], "R": [3], "P": [1, 2], "S": [0]},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for game, grid in grids.items():
+            path = os.path.join(tmp, f"{game}.csv")
+            write_game(path, game, synthetic_rows(game, rng))
+            result = sweep(game, path, **grid)
+            for point in itertools.product(*(enumerate(v) for v in grid.values())):
+                params = dict(zip(grid, (value for _, value in point)))
+                altruism = GAMES[game].indexer(path, **params).altruism
+                swept = {llm: {m: float(result.values[(i, *(k for k, _ in point), j)])
+                               for j, m in enumerate(result.measures)} for i, llm in enumerate(result.models)}
+                same_altruism(altruism, swept)
+
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith("test_") and callable(check):
+            check()
+            print(f"{name}: ok")
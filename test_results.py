@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Checks of the result storage: partitioned writing, the loader and offline re-scoring
+"""
+
+import csv
+import os
+import tempfile
+
+import pandas as pd
+
+from helper.data import loader
+from helper.data.loader import SCHEMAS, iter_appended, load_results, read_appended
+from helper.data.partitions import (PartitionWriter, archive_run, compact_run, read_catalog, rebuild_catalog,
+                                    select_partitions)
+from helper.data.rescore import RESCORERS, rescore
+from helper.game.configs import HedonicConfig, load_configs
+from helper.game.hedonic_game import HedonicGame
+
+HEDONIC_CONFIG = RESCORERS["hedonic_game"].config
+
+
+def hedonic_rows(models, repeat):
+    """One unscored decision per (model, config row, action), `repeat` times over."""
+    rows = []
+    for config in load_configs(HEDONIC_CONFIG, HedonicConfig):
+        game = HedonicGame(config, csv_file=None)
+        prompt = game.make_prompt(game.agent).replace("\n", " ").replace(",", " ")
+        for _ in range(repeat):
+            for model in models:
+                for action in game.actions():
+                    rows.append({"llm_name": model, "agent": game.agent, "prompt": prompt, "llm_value": 1,
+                                 "llm_reasoning": "", "parsed_action": action, "ALTRUISM_SCORE": -1.0})
+    return rows
+
+
+def read_parts(paths):
+    """Rows of the part files, in order, each read with its own header."""
+    rows = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows.extend(csv.DictReader(f))
+    return rows
+
+
+def test_partitions_round_trip():
+    """Rows come back per model from the catalog, also after rolling over parts, compaction and archiving."""
+    fieldnames = ["llm", "round", "reasoning"]
+    rows = [{"llm": model, "round": str(r), "reasoning": "x" * 40} for r in range(50)
+            for model in ("openai/gpt-4o", "google/gemini:free")]
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = PartitionWriter("game", fieldnames, run_id="r1", root=tmp, max_part_bytes=1024)
+        writer.writerows(rows)
+        writer.close()
+        writer = PartitionWriter("game", fieldnames, run_id="r2", root=tmp)
+        writer.writerows(rows[:4])
+        writer.close()
+
+        catalog = read_catalog("game", tmp)
+        assert sum(e["rows"] for e in catalog) == len(rows) + 4
+        assert len(select_partitions("game", runs=["r1"], models=["openai/gpt-4o"], root=tmp)) > 1
+        assert sorted(read_catalog("game", tmp), key=lambda e: e["path"]) == \
+            sorted(rebuild_catalog("game", tmp), key=lambda e: e["path"])
+        for model in ("openai/gpt-4o", "google/gemini:free"):
+            expected = [r for r in rows if r["llm"] == model]
+            assert read_parts(select_partitions("game", runs=["r1"], models=[model], root=tmp)) == expected
+
+        compact_run("game", "r1", root=tmp)
+        for model in ("openai/gpt-4o", "google/gemini:free"):
+            parts = select_partitions("game", runs=["r1"], models=[model], root=tmp)
+            assert len(parts) == 1 and read_parts(parts) == [r for r in rows if r["llm"] == model]
+
+        archive_run("game", "r1", root=tmp)
+        by_model = lambda r: r["llm"]
+        assert sorted(read_parts(select_partitions("game", root=tmp)), key=by_model) == sorted(rows[:4], key=by_model)
+        assert len(read_parts(select_partitions("game", root=tmp, include_archived=True))) == len(rows) + 4
+
+
+def test_loader_cache_round_trip_and_invalidation():
+    """The cached frame equals a fresh parse, is used while the CSV is unchanged and dropped once it changes."""
+    rows = [{"llm_name": " m/a ", "agent": "Zoë", "prompt": "line one\nline, two", "llm_value": 1,
+             "llm_reasoning": "", "parsed_action": "STAY", "u_chosen": 1.5, "ALTRUISM_SCORE": 0.25},
+            {"llm_name": "m:b", "agent": "Bob", "prompt": "✓ ok", "llm_value": "",
+             "llm_reasoning": "because", "parsed_action": "LEAVE", "ALTRUISM_SCORE": 0}]
+    parse = loader._parse
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hedonic.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            out = csv.DictWriter(f, fieldnames=list(SCHEMAS["hedonic_game"].dtypes))
+            out.writeheader()
+            out.writerows(rows)
+
+        for columns in (None, ["llm_name", "prompt", "ALTRUISM_SCORE"]):
+            fresh = load_results(path, "hedonic_game", columns=columns)
+            assert os.path.exists(loader._cache_path(path, SCHEMAS["hedonic_game"], columns))
+            try:
+                loader._parse = None  # a cache miss would call it
+                cached = load_results(path, "hedonic_game", columns=columns)
+            finally:
+                loader._parse = parse
+            pd.testing.assert_frame_equal(cached, fresh)
+            assert fresh["llm_name"].tolist() == ["m/a", "m:b"]
+
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            csv.DictWriter(f, fieldnames=list(SCHEMAS["hedonic_game"].dtypes)).writerow(rows[1])
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert len(load_results(path, "hedonic_game")) == 3
+
+
+def test_streaming_matches_full_load():
+    """Chunks streamed from an offset add up to the full load; a row still being written is left for later."""
+    rows = [{"round": r % 5 + 1, "llm": f"m{r % 3}", "consumption": "" if r % 11 == 0 else r, "reasoning": "a, b\nc",
+             "fish_num": 100 - r, "fishermen_num": 3} for r in range(40)]
+    fieldnames = list(SCHEMAS["non_atomic"].dtypes)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "non_atomic.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            out = csv.DictWriter(f, fieldnames=fieldnames)
+            out.writeheader()
+            out.writerows(rows)
+            f.write("1,m0,5")  # no newline yet
+        full = load_results(path, "non_atomic", use_cache=False)  # the partial row lacks fish_num
+
+        chunks, end = iter_appended(path, "non_atomic", chunksize=7)
+        streamed = pd.concat(list(chunks), ignore_index=True)
+        assert end == os.path.getsize(path) - len("1,m0,5")
+        pd.testing.assert_frame_equal(streamed, full)
+
+        first, offset = read_appended(path, "non_atomic", columns=["llm", "consumption"])
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            f.write(",,4900,3\n")
+        rest, _ = read_appended(path, "non_atomic", offset=offset, columns=["llm", "consumption"])
+        assert len(first) == len(full) and rest["llm"].tolist() == ["m0"] and rest["consumption"].tolist() == [5]
+
+
+def test_rescore_keeps_every_part_and_flat_file():
+    """A run spread over several part files plus several flat files: every row is written back, re-scored."""
+    fieldnames = HedonicGame({"simulate_rounds": 1, "agent": "A", "groups": "{'G': ['A']}", "friends": "{}",
+                              "enemies": "{}", "w_friend": 1.0, "w_enemy": 1.0}, csv_file=None).fieldnames
+    with tempfile.TemporaryDirectory() as tmp:
+        data = os.path.join(tmp, "data")
+        writer = PartitionWriter("hedonic_game", fieldnames, run_id="r1", model_field="llm_name", root=data,
+                                 max_part_bytes=4096)
+        writer.writerows(hedonic_rows(["m/a", "m:b"], repeat=3))
+        writer.close()
+        parts = select_partitions("hedonic_game", runs=["r1"], root=data)
+        assert len(parts) > 2, parts
+
+        flat = []
+        for i, models in enumerate((["m/a"], ["m/a", "m:c"])):
+            path = os.path.join(tmp, f"flat-{i}.csv")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                out = csv.DictWriter(f, fieldnames=fieldnames)
+                out.writeheader()
+                out.writerows(hedonic_rows(models, repeat=1))
+            flat.append(path)
+
+        source = parts + flat
+        stored = load_results(source, "hedonic_game", use_cache=False)
+        rescore("hedonic_game", source, config=HEDONIC_CONFIG, version="v1", root=os.path.join(tmp, "rescored"))
+        written = load_results(select_partitions("hedonic_game", root=os.path.join(tmp, "rescored", "v1")),
+                               "hedonic_game", use_cache=False)
+
+        keys = ["llm_name", "agent", "prompt", "parsed_action"]
+        count = lambda df: df.groupby(keys).size()
+        assert len(written) == len(stored), (len(written), len(stored))
+        assert count(written).equals(count(stored))
+        assert (written["ALTRUISM_SCORE"] >= 0).all()
+
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith("test_") and callable(check):
+            check()
+            print(f"{name}: ok")